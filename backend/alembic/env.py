@@ -25,7 +25,11 @@ target_metadata = Base.metadata
 
 
 def get_url():
-    """Get database URL from environment variables"""
+    """Get database URL from environment variables, or from `-x url=...`
+    (e.g. to migrate each url_mappings shard)"""
+    url = context.get_x_argument(as_dictionary=True).get("url")
+    if url:
+        return url
     user = os.getenv("POSTGRES_USER", "user")
     password = os.getenv("POSTGRES_PASSWORD", "password")
     server = os.getenv("POSTGRES_SERVER", "db")
@@ -0,0 +1,38 @@
+"""Add url_mappings.expires_at
+
+Revision ID: 2c7f3a9e5d60
+Revises: 9a4d6e2b8f15
+Create Date: 2026-10-18 16:02:47.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7f3a9e5d60'
+down_revision = '9a4d6e2b8f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without a default, so PostgreSQL does not rewrite the table.
+    op.add_column('url_mappings', sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_url_mappings_expires_at', 'url_mappings', ['expires_at'],
+            postgresql_where=sa.text('expires_at IS NOT NULL'),
+            sqlite_where=sa.text('expires_at IS NOT NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_url_mappings_expires_at', table_name='url_mappings',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('url_mappings', 'expires_at')
@@ -0,0 +1,27 @@
+"""Add short code block sequence
+
+Revision ID: 3b9d2c7e8a41
+Revises: f54e5f9565b6
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9d2c7e8a41'
+down_revision = 'f54e5f9565b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only the sequence allocator uses it, which needs PostgreSQL.
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.CreateSequence(sa.Sequence('short_code_block_seq')))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.schema.DropSequence(sa.Sequence('short_code_block_seq')))
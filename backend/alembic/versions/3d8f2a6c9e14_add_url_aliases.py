@@ -0,0 +1,30 @@
+"""Add url_aliases table
+
+Revision ID: 3d8f2a6c9e14
+Revises: 7b3e9c1f4a26
+Create Date: 2026-10-18 20:11:37.604218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8f2a6c9e14'
+down_revision = '7b3e9c1f4a26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('url_aliases',
+    sa.Column('short_url', sa.String(length=10), nullable=False),
+    sa.Column('target_short_url', sa.String(length=10), nullable=False),
+    sa.PrimaryKeyConstraint('short_url')
+    )
+    op.create_index(op.f('ix_url_aliases_target_short_url'), 'url_aliases', ['target_short_url'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_url_aliases_target_short_url'), table_name='url_aliases')
+    op.drop_table('url_aliases')
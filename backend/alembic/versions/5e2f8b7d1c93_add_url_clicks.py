@@ -0,0 +1,29 @@
+"""Add url_clicks table
+
+Revision ID: 5e2f8b7d1c93
+Revises: c47a9e13b6f2
+Create Date: 2026-10-18 12:41:19.530662
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2f8b7d1c93'
+down_revision = 'c47a9e13b6f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('url_clicks',
+    sa.Column('short_url', sa.String(length=10), nullable=False),
+    sa.Column('click_count', sa.BigInteger(), nullable=False),
+    sa.Column('last_accessed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('short_url')
+    )
+
+
+def downgrade():
+    op.drop_table('url_clicks')
@@ -0,0 +1,30 @@
+"""Add url_mappings redirect policy columns
+
+Revision ID: 5e8b1d4c7a92
+Revises: 2c7f3a9e5d60
+Create Date: 2026-10-18 18:24:09.512730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b1d4c7a92'
+down_revision = '2c7f3a9e5d60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without defaults, so PostgreSQL does not rewrite the table;
+    # NULL means the link follows the REDIRECT_* settings.
+    op.add_column('url_mappings', sa.Column('redirect_status', sa.SmallInteger(), nullable=True))
+    op.add_column('url_mappings', sa.Column('cache_max_age', sa.Integer(), nullable=True))
+    op.add_column('url_mappings', sa.Column('cache_stale_while_revalidate', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('url_mappings', 'cache_stale_while_revalidate')
+    op.drop_column('url_mappings', 'cache_max_age')
+    op.drop_column('url_mappings', 'redirect_status')
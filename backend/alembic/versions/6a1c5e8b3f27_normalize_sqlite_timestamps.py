@@ -0,0 +1,31 @@
+"""Normalize url_mappings timestamps written by CURRENT_TIMESTAMP on SQLite
+
+Revision ID: 6a1c5e8b3f27
+Revises: 3d8f2a6c9e14
+Create Date: 2026-10-18 21:02:18.730412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1c5e8b3f27'
+down_revision = '3d8f2a6c9e14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Values without a fraction never compare equal to bound datetimes, which
+    # breaks keyset pagination; other dialects store real timestamps.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for column in ('created_at', 'updated_at'):
+        op.execute(sa.text(
+            f"UPDATE url_mappings SET {column} = {column} || '.000000' WHERE length({column}) = 19"
+        ))
+
+
+def downgrade():
+    pass
@@ -0,0 +1,74 @@
+"""Add url_mappings original_url_host and listing indexes
+
+Revision ID: 7b3e9c1f4a26
+Revises: 5e8b1d4c7a92
+Create Date: 2026-10-18 19:02:41.208315
+
+"""
+from urllib.parse import urlsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e9c1f4a26'
+down_revision = '5e8b1d4c7a92'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def url_host(url):
+    # Must match URLUtils.url_host.
+    try:
+        return urlsplit(url).hostname
+    except ValueError:
+        return None
+
+
+def backfill(connection):
+    """Fill original_url_host in id-range batches, each in its own transaction."""
+    max_id = connection.execute(sa.text("SELECT coalesce(max(id), 0) FROM url_mappings")).scalar()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        rows = connection.execute(sa.text(
+            "SELECT id, original_url FROM url_mappings "
+            "WHERE id >= :start AND id < :end AND original_url_host IS NULL"
+        ), {"start": start, "end": start + BATCH_SIZE}).all()
+        updates = [
+            {"row_id": row_id, "host": url_host(original_url)}
+            for row_id, original_url in rows
+            if original_url and url_host(original_url)
+        ]
+        if updates:
+            connection.execute(
+                sa.text("UPDATE url_mappings SET original_url_host = :host WHERE id = :row_id"), updates
+            )
+
+
+def upgrade():
+    op.add_column('url_mappings', sa.Column('original_url_host', sa.String(length=255), nullable=True))
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        backfill(connection)
+        op.create_index(
+            'ix_url_mappings_created_at_id', 'url_mappings', ['created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_url_mappings_host_created_at_id', 'url_mappings', ['original_url_host', 'created_at', 'id'],
+            postgresql_concurrently=True,
+        )
+        # Rows written by the previous release while the indexes were building.
+        backfill(connection)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_url_mappings_host_created_at_id', table_name='url_mappings', postgresql_concurrently=True
+        )
+        op.drop_index('ix_url_mappings_created_at_id', table_name='url_mappings', postgresql_concurrently=True)
+    op.drop_column('url_mappings', 'original_url_host')
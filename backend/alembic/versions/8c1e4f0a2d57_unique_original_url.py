@@ -0,0 +1,37 @@
+"""Make original_url unique for upsert deduplication
+
+Revision ID: 8c1e4f0a2d57
+Revises: 3b9d2c7e8a41
+Create Date: 2026-10-18 10:03:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e4f0a2d57'
+down_revision = '3b9d2c7e8a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The create path relies on INSERT ... ON CONFLICT DO NOTHING, which needs
+    # a unique index on original_url to arbitrate duplicate URLs.
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT count(*) FROM (SELECT original_url FROM url_mappings "
+        "GROUP BY original_url HAVING count(*) > 1) AS d"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} original URLs are stored more than once; "
+            "merge them before applying this migration"
+        )
+    op.drop_index(op.f('ix_url_mappings_original_url'), table_name='url_mappings')
+    op.create_index(op.f('ix_url_mappings_original_url'), 'url_mappings', ['original_url'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_url_mappings_original_url'), table_name='url_mappings')
+    op.create_index(op.f('ix_url_mappings_original_url'), 'url_mappings', ['original_url'], unique=False)
@@ -0,0 +1,29 @@
+"""Add shard_buckets table
+
+Revision ID: 9a4d6e2b8f15
+Revises: 5e2f8b7d1c93
+Create Date: 2026-10-18 15:07:42.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d6e2b8f15'
+down_revision = '5e2f8b7d1c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('shard_buckets',
+    sa.Column('bucket', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('previous_shard', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('shard_buckets')
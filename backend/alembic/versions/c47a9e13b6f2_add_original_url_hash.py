@@ -0,0 +1,91 @@
+"""Deduplicate on a fixed-width original_url digest
+
+Revision ID: c47a9e13b6f2
+Revises: 8c1e4f0a2d57
+Create Date: 2026-10-18 11:26:05.774930
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a9e13b6f2'
+down_revision = '8c1e4f0a2d57'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+# Must match URLUtils.url_digest.
+DIGEST_SQL = "substring(sha256(convert_to(original_url, 'UTF8')) from 1 for 16)"
+
+
+def backfill(connection):
+    """Fill original_url_hash in id-range batches, each in its own transaction."""
+    max_id = connection.execute(sa.text("SELECT coalesce(max(id), 0) FROM url_mappings")).scalar()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        connection.execute(sa.text(
+            f"UPDATE url_mappings SET original_url_hash = {DIGEST_SQL} "
+            "WHERE id >= :start AND id < :end AND original_url_hash IS NULL"
+        ), {"start": start, "end": start + BATCH_SIZE})
+
+
+def backfill_sqlite(connection):
+    """SQLite has no sha256, so digest the rows in Python."""
+    rows = connection.execute(sa.text(
+        "SELECT id, original_url FROM url_mappings WHERE original_url_hash IS NULL"
+    )).all()
+    if rows:
+        connection.execute(
+            sa.text("UPDATE url_mappings SET original_url_hash = :digest WHERE id = :id"),
+            [{"id": row.id, "digest": hashlib.sha256(row.original_url.encode("utf-8")).digest()[:16]}
+             for row in rows],
+        )
+
+
+def upgrade():
+    op.add_column('url_mappings', sa.Column('original_url_hash', sa.LargeBinary(length=16), nullable=True))
+
+    if op.get_bind().dialect.name != 'postgresql':
+        backfill_sqlite(op.get_bind())
+        op.create_index(
+            op.f('ix_url_mappings_original_url_hash'), 'url_mappings', ['original_url_hash'], unique=True
+        )
+        op.drop_index(op.f('ix_url_mappings_original_url'), table_name='url_mappings')
+        return
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        backfill(connection)
+        op.create_index(
+            op.f('ix_url_mappings_original_url_hash'), 'url_mappings', ['original_url_hash'],
+            unique=True, postgresql_concurrently=True,
+        )
+        # Rows written by the previous release while the index was building.
+        backfill(connection)
+        op.drop_index(
+            op.f('ix_url_mappings_original_url'), table_name='url_mappings',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index(op.f('ix_url_mappings_original_url'), 'url_mappings', ['original_url'], unique=True)
+        op.drop_index(op.f('ix_url_mappings_original_url_hash'), table_name='url_mappings')
+        with op.batch_alter_table('url_mappings') as batch_op:
+            batch_op.drop_column('original_url_hash')
+        return
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_url_mappings_original_url'), 'url_mappings', ['original_url'],
+            unique=True, postgresql_concurrently=True,
+        )
+        op.drop_index(
+            op.f('ix_url_mappings_original_url_hash'), table_name='url_mappings',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('url_mappings', 'original_url_hash')
@@ -0,0 +1,77 @@
+"""Make original_url_hash NOT NULL
+
+Revision ID: e81b4f6d2a39
+Revises: 6a1c5e8b3f27
+Create Date: 2026-10-18 23:14:52.208731
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e81b4f6d2a39'
+down_revision = '6a1c5e8b3f27'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+# Must match URLUtils.url_digest; rows whose URL has another canonical form
+# are rekeyed by app.services.canonicalize.
+DIGEST_SQL = "substring(sha256(convert_to(original_url, 'UTF8')) from 1 for 16)"
+
+
+def backfill_postgresql(connection):
+    """Fill rows left without a digest, e.g. written by the release before
+    c47a9e13b6f2 while it ran, in id-range batches."""
+    max_id = connection.execute(sa.text("SELECT coalesce(max(id), 0) FROM url_mappings")).scalar()
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        connection.execute(sa.text(
+            f"UPDATE url_mappings SET original_url_hash = {DIGEST_SQL} "
+            "WHERE id >= :start AND id < :end AND original_url_hash IS NULL"
+        ), {"start": start, "end": start + BATCH_SIZE})
+
+
+def backfill_sqlite(connection):
+    """SQLite has no sha256, so digest the rows left in Python."""
+    rows = connection.execute(sa.text(
+        "SELECT id, original_url FROM url_mappings WHERE original_url_hash IS NULL"
+    )).all()
+    if rows:
+        connection.execute(
+            sa.text("UPDATE url_mappings SET original_url_hash = :digest WHERE id = :id"),
+            [{"id": row.id, "digest": hashlib.sha256(row.original_url.encode("utf-8")).digest()[:16]}
+             for row in rows],
+        )
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        backfill_sqlite(connection)
+        with op.batch_alter_table('url_mappings') as batch_op:
+            batch_op.alter_column('original_url_hash', existing_type=sa.LargeBinary(length=16), nullable=False)
+        return
+
+    with op.get_context().autocommit_block():
+        backfill_postgresql(connection)
+        # SET NOT NULL skips its full-table scan, under an exclusive lock, when a
+        # validated CHECK already proves it; validating only takes a share lock.
+        op.execute(
+            "ALTER TABLE url_mappings ADD CONSTRAINT ck_url_mappings_original_url_hash_not_null "
+            "CHECK (original_url_hash IS NOT NULL) NOT VALID"
+        )
+        op.execute("ALTER TABLE url_mappings VALIDATE CONSTRAINT ck_url_mappings_original_url_hash_not_null")
+        op.alter_column('url_mappings', 'original_url_hash', existing_type=sa.LargeBinary(length=16), nullable=False)
+        op.drop_constraint('ck_url_mappings_original_url_hash_not_null', 'url_mappings', type_='check')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('url_mappings') as batch_op:
+            batch_op.alter_column('original_url_hash', existing_type=sa.LargeBinary(length=16), nullable=True)
+        return
+    op.alter_column('url_mappings', 'original_url_hash', existing_type=sa.LargeBinary(length=16), nullable=True)
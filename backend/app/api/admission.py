@@ -0,0 +1,92 @@
+import json
+import math
+from typing import FrozenSet, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.api.fast_redirect import reserved_paths
+from app.core.config import settings
+from app.core.metrics import admission_shed_total
+from app.error_code.common_errors import CommonErrorCatalog, CommonErrorCode
+from app.services.admission import CREATE, REDIRECT, admission_controller, create_rate_limiter
+
+
+def _error_body(error_code: int) -> bytes:
+    # Same body an `error_manager` HTTPException is rendered to.
+    return json.dumps(
+        {"detail": [CommonErrorCatalog.error_mapping[error_code]]},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+_OVERLOADED_BODY = _error_body(CommonErrorCode.SERVICE_OVERLOADED)
+_RATE_LIMITED_BODY = _error_body(CommonErrorCode.RATE_LIMITED)
+
+
+async def _send_error(send: Send, status: int, body: bytes, retry_after: int) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": (
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware, outermost in the stack, that admits redirects
+    (`GET /<code>`) and creates (`POST .../generate` and `.../generate/batch`)
+    through the `admission_controller`, and rate limits creates per client
+    address when `CREATE_RATE_LIMIT_PER_SECOND` is set.
+
+    Shed requests are answered at once: 503 when the worker is saturated,
+    429 when the client is over its rate, both with `Retry-After` and an
+    error body from the catalog. Every other request passes through.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._create_paths = frozenset(
+            f"{settings.API_V1_STR}{path}" for path in ("/generate", "/generate/batch")
+        )
+        self._reserved: Optional[FrozenSet[str]] = None
+
+    def _request_class(self, scope: Scope) -> Optional[str]:
+        if scope["type"] != "http":
+            return None
+        method, path = scope["method"], scope["path"]
+        if method == "POST" and path in self._create_paths:
+            return CREATE
+        if method != "GET" or len(path) < 2 or "/" in path[1:]:
+            return None
+        if self._reserved is None:
+            # Read on first use, after every route has been registered.
+            self._reserved = reserved_paths(scope)
+        return None if path in self._reserved else REDIRECT
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_class = self._request_class(scope)
+        if request_class is None:
+            await self.app(scope, receive, send)
+            return
+        if request_class == CREATE and create_rate_limiter is not None:
+            client = scope.get("client")
+            wait = create_rate_limiter.take(client[0] if client else "")
+            if wait:
+                admission_shed_total.inc(request_class, "rate_limited")
+                await _send_error(send, 429, _RATE_LIMITED_BODY, math.ceil(wait))
+                return
+        reason = await admission_controller.acquire(request_class)
+        if reason is not None:
+            admission_shed_total.inc(request_class, reason)
+            await _send_error(send, 503, _OVERLOADED_BODY, settings.ADMISSION_RETRY_AFTER_SECONDS)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release(request_class)
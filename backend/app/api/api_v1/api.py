@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from app.api.api_v1.endpoints import urls
 from app.api.api_v1.endpoints import redirect
+from app.api.api_v1.endpoints import admin
 
 url_shortener_router = APIRouter()
 redirect_router = APIRouter()
@@ -9,6 +10,10 @@ url_shortener_router.include_router(urls.router,
                           prefix="",
                           tags=["url-shortener"])
 
+url_shortener_router.include_router(admin.router,
+                          prefix="",
+                          tags=["admin"])
+
 redirect_router.include_router(redirect.router, 
                           prefix="",
                           tags=["redirect"])
\ No newline at end of file
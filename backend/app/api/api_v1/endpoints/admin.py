@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import require_admin_token
+from app.cache.hot_keys import hot_key_tracker
+from app.core.config import settings
+from app.crud.url import UrlListFilter
+from app.error_code.common_errors import CommonErrorCode
+from app.error_code.error_manager import error_manager
+from app.models.url import UrlType
+from app.schemas.url import HotKey, HotKeysResponse, URLListResponse
+from app.services.listing import UrlListServices
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored timestamps are naive UTC.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def url_list_filter(
+    url_type: Optional[UrlType] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    domain: Optional[str] = Query(default=None, max_length=255),
+    include_expired: bool = False,
+) -> UrlListFilter:
+    return UrlListFilter(
+        url_type=url_type,
+        created_after=_utc(created_after),
+        created_before=_utc(created_before),
+        host=domain.lower() if domain else None,
+        include_expired=include_expired,
+    )
+
+
+@router.get("/urls", response_model=URLListResponse)
+def list_urls(
+    filters: UrlListFilter = Depends(url_list_filter),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> URLListResponse:
+    """
+    Lists short URLs newest first, one page at a time.
+
+    Filters by URL type, a creation date range (`created_after` inclusive,
+    `created_before` exclusive, UTC unless an offset is given) and the
+    original URL's domain. Pass `next_cursor` back as `cursor` for the next
+    page.
+    """
+    try:
+        return UrlListServices.list_urls(filters=filters, limit=limit, cursor=cursor)
+    except ValueError:
+        raise error_manager.error_responder(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_code=CommonErrorCode.INVALID_CURSOR,
+        )
+
+
+@router.get("/urls/export", response_class=StreamingResponse)
+def export_urls(filters: UrlListFilter = Depends(url_list_filter)) -> StreamingResponse:
+    """
+    Streams every short URL matching the filters of `GET /admin/urls` as
+    newline-delimited JSON, newest first.
+    """
+    return StreamingResponse(UrlListServices.stream_urls(filters=filters), media_type="application/x-ndjson")
+
+
+@router.get("/hot-keys", response_model=HotKeysResponse)
+def get_hot_keys(limit: int = Query(default=100, ge=1, le=10000)) -> HotKeysResponse:
+    """
+    The most redirected short codes seen by this worker, hottest first,
+    with their estimated counts.
+    """
+    keys = hot_key_tracker.top(limit) if settings.HOT_KEYS_ENABLED else []
+    return HotKeysResponse(
+        enabled=settings.HOT_KEYS_ENABLED,
+        keys=[HotKey(short_url=short_url, count=count) for short_url, count in keys],
+    )
@@ -1,26 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
-from app.crud.url import CRUDUrl
+from app.cache.hot_keys import hot_key_tracker
+from app.core.config import settings
 from app.error_code.common_errors import CommonErrorCode
 from app.error_code.error_manager import error_manager
-
-crud_url = CRUDUrl()
+from app.services.clicks import click_buffer
+from app.services.redirect_policy import Redirect
+from app.services.urls import UrlServices
+from app.services.urls_async import AsyncUrlServices
 
 router = APIRouter()
 
 
-@router.get("/{short_code}", response_class=RedirectResponse, status_code=307)
-def redirect_to_url(short_code: str, db: Session = Depends(get_db)) -> RedirectResponse:
-    """
-    Redirect to the original URL based on the short code.
-    """
-    url_obj = crud_url.get_url_by_short_url(db=db, short_url=short_code)
-    if not url_obj:
+def _redirect_response(short_code: str, redirect: Optional[Redirect]) -> RedirectResponse:
+    if redirect is None:
         raise error_manager.error_responder(
             status_code=404,
             error_code=CommonErrorCode.SHORT_URL_NOT_FOUND,
         )
-    return RedirectResponse(url=url_obj.original_url, status_code=307)
+    if settings.CLICK_TRACKING_ENABLED:
+        click_buffer.record(short_code)
+    if settings.HOT_KEYS_ENABLED:
+        hot_key_tracker.record(short_code)
+    headers = {"cache-control": redirect.cache_control} if redirect.cache_control else None
+    return RedirectResponse(url=redirect.url, status_code=redirect.status_code, headers=headers)
+
+
+if settings.DB_ASYNC_ENABLED:
+    @router.get("/{short_code}", response_class=RedirectResponse)
+    async def redirect_to_url(short_code: str) -> RedirectResponse:
+        """
+        Redirect to the original URL based on the short code.
+
+        Served from the cache tiers when possible; a database session is
+        only opened on a cache miss.
+        """
+        redirect = await AsyncUrlServices.resolve_redirect(short_url=short_code)
+        return _redirect_response(short_code, redirect)
+else:
+    @router.get("/{short_code}", response_class=RedirectResponse)
+    def redirect_to_url(short_code: str) -> RedirectResponse:
+        """
+        Redirect to the original URL based on the short code.
+
+        Served from the cache tiers when possible; a database session is
+        only opened on a cache miss.
+        """
+        redirect = UrlServices.resolve_redirect(short_url=short_code)
+        return _redirect_response(short_code, redirect)
@@ -1,37 +1,115 @@
+import logging
+
 from fastapi import APIRouter, Depends, status, HTTPException
-from typing import Dict
+from typing import Dict, List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db
-from app.schemas.url import URLCreate, URLResponse
+from app.api.deps import get_async_db, get_db
+from app.schemas.url import URLBatchResponse, URLCreate, URLResponse
 from app.error_code.common_errors import CommonErrorCode
 from app.error_code.error_manager import error_manager
 from app.services.urls import UrlServices
+from app.services.urls_async import AsyncUrlServices
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
-@router.post("/generate", response_model=URLResponse, status_code=status.HTTP_201_CREATED)
-def create_url(
-    *,
-    db: Session = Depends(get_db),
-    url_in: URLCreate
-) -> Dict[str, str]:
-    """
-    Generates a shortened URL for the provided original URL.
-
-    Accepts an original URL and an optional custom short URL or URL type.
-    """
-    try:
-        url = UrlServices.create_url_mapping(db=db, url_in=url_in)
-        return url
-    except HTTPException as exc:
-        raise exc
-    except Exception as exc:
-        print(f"An unexpected error occurred: {exc}")
+def _unexpected_error(exc: Exception) -> HTTPException:
+    logger.exception("An unexpected error occurred: %s", exc)
+    return error_manager.error_responder(
+        status_code=500,
+        error_code=CommonErrorCode.INTERNAL_SERVER_ERROR,
+        error_message=f"An unexpected error occurred: {exc}"
+    )
+
+
+def _check_batch_size(url_in: List[URLCreate]) -> None:
+    if len(url_in) > settings.URL_BATCH_MAX_SIZE:
         raise error_manager.error_responder(
-            status_code=500,
-            error_code=CommonErrorCode.INTERNAL_SERVER_ERROR,
-            error_message=f"An unexpected error occurred: {exc}"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            error_code=CommonErrorCode.BATCH_TOO_LARGE,
+            error_message=f"A batch can contain at most {settings.URL_BATCH_MAX_SIZE} URLs",
         )
+
+
+if settings.DB_ASYNC_ENABLED:
+    @router.post("/generate", response_model=URLResponse, status_code=status.HTTP_201_CREATED)
+    async def create_url(
+        *,
+        db: AsyncSession = Depends(get_async_db),
+        url_in: URLCreate
+    ) -> Dict[str, str]:
+        """
+        Generates a shortened URL for the provided original URL.
+
+        Accepts an original URL and an optional custom short URL or URL type.
+        """
+        try:
+            return await AsyncUrlServices.create_url_mapping(db=db, url_in=url_in)
+        except HTTPException as exc:
+            raise exc
+        except Exception as exc:
+            raise _unexpected_error(exc)
+
+    @router.post("/generate/batch", response_model=URLBatchResponse, status_code=status.HTTP_200_OK)
+    async def create_urls(
+        *,
+        db: AsyncSession = Depends(get_async_db),
+        url_in: List[URLCreate]
+    ) -> URLBatchResponse:
+        """
+        Generates shortened URLs for a batch of original URLs.
+
+        Results are returned in input order; invalid items are reported
+        individually without failing the batch.
+        """
+        _check_batch_size(url_in)
+        try:
+            return await AsyncUrlServices.create_url_mappings(db=db, items=url_in)
+        except HTTPException as exc:
+            raise exc
+        except Exception as exc:
+            raise _unexpected_error(exc)
+else:
+    @router.post("/generate", response_model=URLResponse, status_code=status.HTTP_201_CREATED)
+    def create_url(
+        *,
+        db: Session = Depends(get_db),
+        url_in: URLCreate
+    ) -> Dict[str, str]:
+        """
+        Generates a shortened URL for the provided original URL.
+
+        Accepts an original URL and an optional custom short URL or URL type.
+        """
+        try:
+            url = UrlServices.create_url_mapping(db=db, url_in=url_in)
+            return url
+        except HTTPException as exc:
+            raise exc
+        except Exception as exc:
+            raise _unexpected_error(exc)
+
+    @router.post("/generate/batch", response_model=URLBatchResponse, status_code=status.HTTP_200_OK)
+    def create_urls(
+        *,
+        db: Session = Depends(get_db),
+        url_in: List[URLCreate]
+    ) -> URLBatchResponse:
+        """
+        Generates shortened URLs for a batch of original URLs.
+
+        Results are returned in input order; invalid items are reported
+        individually without failing the batch.
+        """
+        _check_batch_size(url_in)
+        try:
+            return UrlServices.create_url_mappings(db=db, items=url_in)
+        except HTTPException as exc:
+            raise exc
+        except Exception as exc:
+            raise _unexpected_error(exc)
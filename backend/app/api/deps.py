@@ -1,5 +1,12 @@
-from typing import Generator
-from app.db.session import SessionLocal
+import hmac
+from typing import AsyncGenerator, Generator, Optional
+
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.error_code.common_errors import CommonErrorCode
+from app.error_code.error_manager import error_manager
 
 from starlette import status
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
@@ -28,4 +35,35 @@ def get_db() -> Generator:
         db = SessionLocal()
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+admin_bearer = HTTPBearer(auto_error=False)
+
+
+def require_admin_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(admin_bearer)) -> None:
+    """
+    Guards the admin endpoints with the `ADMIN_API_TOKEN` bearer token.
+
+    Raises:
+        HTTPException: 404 when no token is configured, so the endpoints
+            look absent, and 401 when the request's token is missing or wrong.
+    """
+    if not settings.ADMIN_API_TOKEN:
+        raise error_manager.error_responder(
+            status_code=status.HTTP_404_NOT_FOUND,
+            error_code=CommonErrorCode.ADMIN_API_DISABLED,
+        )
+    given = credentials.credentials if credentials else ""
+    if not hmac.compare_digest(given.encode(), settings.ADMIN_API_TOKEN.encode()):
+        error = error_manager.error_responder(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            error_code=CommonErrorCode.ADMIN_TOKEN_INVALID,
+        )
+        error.headers = {"WWW-Authenticate": "Bearer"}
+        raise error
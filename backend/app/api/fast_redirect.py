@@ -0,0 +1,129 @@
+import json
+import time
+from typing import FrozenSet, Optional
+from urllib.parse import quote
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.cache.hot_keys import hot_key_tracker
+from app.cache.local import MISSING
+from app.core.config import settings
+from app.core.metrics import http_request_duration_seconds, http_requests_total
+from app.error_code.common_errors import CommonErrorCatalog, CommonErrorCode
+from app.models.url import UrlMapping
+from app.services.clicks import click_buffer
+from app.services.redirect_policy import redirect_for
+from app.services.urls import UrlServices
+from app.services.urls_async import AsyncUrlServices
+from app.utils.url_helpers import BASE62_ALPHABET
+
+# Labels match the FastAPI route, so both paths feed the same series.
+_ROUTE = "/{short_code}"
+
+_SHORT_CODE_CHARS = frozenset(BASE62_ALPHABET)
+_MAX_SHORT_CODE_LENGTH = UrlMapping.short_url.type.length
+
+# Same body and headers the FastAPI route sends for an unknown code.
+_NOT_FOUND_BODY = json.dumps(
+    {"detail": [CommonErrorCatalog.error_mapping[CommonErrorCode.SHORT_URL_NOT_FOUND]]},
+    ensure_ascii=False,
+    separators=(",", ":"),
+).encode("utf-8")
+_NOT_FOUND_START = {
+    "type": "http.response.start",
+    "status": 404,
+    "headers": (
+        (b"content-length", str(len(_NOT_FOUND_BODY)).encode("latin-1")),
+        (b"content-type", b"application/json"),
+    ),
+}
+_NOT_FOUND_BODY_MESSAGE = {"type": "http.response.body", "body": _NOT_FOUND_BODY}
+_EMPTY_BODY_MESSAGE = {"type": "http.response.body", "body": b""}
+_REDIRECT_HEADERS = ((b"content-length", b"0"),)
+
+
+def reserved_paths(scope: Scope) -> FrozenSet[str]:
+    """
+    Paths of the app's own routes without parameters, e.g. `/metrics`,
+    which are never read as short codes.
+    """
+    return frozenset(
+        route.path for route in scope["app"].routes if "{" not in getattr(route, "path", "{")
+    )
+
+
+class FastRedirectMiddleware:
+    """
+    Pure ASGI middleware that answers short code redirects itself: the
+    middleware added before it, routing, dependency injection and response
+    classes are skipped. Only admission control runs ahead of it, so the
+    order is AdmissionControl -> FastRedirect -> Metrics -> the rest.
+
+    Only `GET /<code>` for a well-formed code is handled here; every other
+    request, including paths of the app's own single-segment routes such as
+    `/metrics`, is passed on unchanged. Codes found in the per-worker cache
+    or the redirect snapshot are answered without leaving the event loop;
+    the rest go through the same resolution as the FastAPI route. Responses
+    match the route's: the link's redirect status with the quoted `Location`
+    and its Cache-Control header, or the catalog's 404 body, serialised once
+    at import.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._reserved: Optional[FrozenSet[str]] = None
+
+    def _reserved_paths(self, scope: Scope) -> FrozenSet[str]:
+        # Read on first use, after every route has been registered.
+        if self._reserved is None:
+            self._reserved = reserved_paths(scope)
+        return self._reserved
+
+    def _short_code(self, scope: Scope) -> Optional[str]:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        path = scope["path"]
+        short_code = path[1:]
+        if (
+            not short_code
+            or len(short_code) > _MAX_SHORT_CODE_LENGTH
+            or not _SHORT_CODE_CHARS.issuperset(short_code)
+            or path in self._reserved_paths(scope)
+        ):
+            return None
+        return short_code
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        short_code = self._short_code(scope)
+        if short_code is None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        cached = UrlServices.resolve_in_process(short_code)
+        if cached is not MISSING:
+            redirect = redirect_for(cached)
+        elif settings.DB_ASYNC_ENABLED:
+            redirect = await AsyncUrlServices.resolve_redirect(short_url=short_code)
+        else:
+            redirect = await run_in_threadpool(UrlServices.resolve_redirect, short_code)
+        if redirect is not None:
+            if settings.CLICK_TRACKING_ENABLED:
+                click_buffer.record(short_code)
+            if settings.HOT_KEYS_ENABLED:
+                hot_key_tracker.record(short_code)
+            # Quoted like starlette's RedirectResponse.
+            location = quote(redirect.url, safe=":/%#?=@[]!$&'()*+,;").encode("latin-1")
+            headers = ((b"location", location),) + _REDIRECT_HEADERS
+            if redirect.cache_control:
+                headers += ((b"cache-control", redirect.cache_control.encode("latin-1")),)
+            await send({"type": "http.response.start", "status": redirect.status_code, "headers": headers})
+            await send(_EMPTY_BODY_MESSAGE)
+            status_code = str(redirect.status_code)
+        else:
+            await send(_NOT_FOUND_START)
+            await send(_NOT_FOUND_BODY_MESSAGE)
+            status_code = "404"
+        if settings.METRICS_ENABLED:
+            http_request_duration_seconds.observe(time.perf_counter() - started, _ROUTE, "GET")
+            http_requests_total.inc(_ROUTE, "GET", status_code)
@@ -0,0 +1,92 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache.backends import RedisCacheBackend, shared_cache
+from app.cache.bloom import short_code_filter
+from app.cache.local import url_cache
+from app.cache.snapshot import redirect_snapshot
+from app.core.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+    metrics,
+)
+from app.services.clicks import click_buffer
+
+router = APIRouter()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status and in-flight
+    requests. Routes are labelled by their template (e.g. `/{short_code}`),
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_duration_seconds.observe(elapsed, template, method)
+            http_requests_total.inc(template, method, str(status_code))
+
+
+def _cache_metrics():
+    local = url_cache.stats()
+    tier = {"tier": "local"}
+    yield "url_cache_hits_total", "counter", "Cache hits.", [(tier, local["hits"])]
+    yield "url_cache_misses_total", "counter", "Cache misses.", [(tier, local["misses"])]
+    yield "url_cache_evictions_total", "counter", "Cache evictions.", [(tier, local["evictions"])]
+    yield "url_cache_size", "gauge", "Entries currently cached.", [(tier, local["size"])]
+    yield "url_cache_pinned", "gauge", "Cached entries of pinned hot codes.", [(tier, local["pinned"])]
+    if isinstance(shared_cache, RedisCacheBackend):
+        yield "redis_cache_errors_total", "counter", "Redis errors that fell back to the database.", [
+            ({}, shared_cache.errors)
+        ]
+    if short_code_filter.ready:
+        yield "short_code_filter_entries", "gauge", "Short codes in the filter.", [
+            ({}, short_code_filter.filter.count)
+        ]
+    if redirect_snapshot.snapshot is not None:
+        yield "redirect_snapshot_entries", "gauge", "Codes in the snapshot and its delta.", [
+            ({"part": "snapshot"}, redirect_snapshot.snapshot.count),
+            ({"part": "delta"}, len(redirect_snapshot.delta)),
+        ]
+    yield "click_buffer_dropped_total", "counter", "Clicks dropped because the buffer was full.", [
+        ({}, click_buffer.dropped)
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics() -> PlainTextResponse:
+    """
+    Prometheus scrape endpoint for this worker.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
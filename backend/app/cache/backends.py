@@ -0,0 +1,286 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Optional
+
+import redis
+import redis.asyncio
+
+from app.cache.local import MISSING, LocalUrlCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis has no native "cached None"; an empty string marks a cached miss.
+_NEGATIVE_MARKER = ""
+
+
+class CacheBackend(ABC):
+    """
+    Shared cache tier for short code -> original URL mappings.
+
+    Values follow the same convention as `LocalUrlCache`: a string is a hit,
+    `None` is a cached miss and `MISSING` means the key is not cached.
+    Strings are stored as given, expiring links included (see `cache_value`).
+    Implementations must never raise on backend failures; they report a
+    miss instead so callers fall through to the database.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys at once. Keys that are not cached are omitted.
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    def set_many(self, mapping: Dict[str, Optional[str]], ttl: Optional[float] = None) -> None:
+        for key, value in mapping.items():
+            self.set(key, value, ttl=ttl)
+
+    async def aget(self, key: str) -> Any:
+        """
+        Async `get`. Backends that do network I/O override this.
+        """
+        return self.get(key)
+
+    async def aset(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        self.set(key, value, ttl=ttl)
+
+    async def aset_many(self, mapping: Dict[str, Optional[str]], ttl: Optional[float] = None) -> None:
+        self.set_many(mapping, ttl=ttl)
+
+
+class NullCacheBackend(CacheBackend):
+    """
+    Backend used when no shared cache is configured.
+    """
+
+    def get(self, key: str) -> Any:
+        return MISSING
+
+    def set(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Process-local stand-in for Redis, for tests and single-node deployments.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self._cache = LocalUrlCache(max_size=max_size, ttl=ttl, negative_ttl=negative_ttl)
+
+    def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.invalidate(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis-backed shared cache using a pooled client and pipelined bulk calls.
+
+    After a Redis error the backend stays disabled for `retry_after` seconds
+    and reports misses, so an outage costs one timeout rather than one per
+    request.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float,
+        negative_ttl: float,
+        key_prefix: str,
+        max_connections: int,
+        socket_timeout: float,
+        retry_after: float,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.key_prefix = key_prefix
+        self.retry_after = retry_after
+        self._disabled_until = 0.0
+        self.pool = redis.ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+        self.async_pool = redis.asyncio.ConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+        )
+        self.async_client = redis.asyncio.Redis(connection_pool=self.async_pool)
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._disabled_until
+
+    def _fail(self, exc: Exception) -> None:
+        self.errors += 1
+        self._disabled_until = time.monotonic() + self.retry_after
+        logger.warning("Redis cache unavailable, falling back to database: %s", exc)
+
+    def _ttl_for(self, value: Optional[str], ttl: Optional[float]) -> int:
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        return max(int(ttl), 0)
+
+    @staticmethod
+    def _decode(raw: Optional[bytes]) -> Any:
+        if raw is None:
+            return MISSING
+        value = raw.decode("utf-8")
+        return value if value != _NEGATIVE_MARKER else None
+
+    def get(self, key: str) -> Any:
+        if not self._available():
+            return MISSING
+        try:
+            return self._decode(self.client.get(self._key(key)))
+        except redis.RedisError as exc:
+            self._fail(exc)
+            return MISSING
+
+    def set(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        ttl = self._ttl_for(value, ttl)
+        if ttl <= 0 or not self._available():
+            return
+        try:
+            self.client.set(self._key(key), value if value is not None else _NEGATIVE_MARKER, ex=ttl)
+        except redis.RedisError as exc:
+            self._fail(exc)
+
+    def delete(self, key: str) -> None:
+        if not self._available():
+            return
+        try:
+            self.client.delete(self._key(key))
+        except redis.RedisError as exc:
+            self._fail(exc)
+
+    async def aget(self, key: str) -> Any:
+        if not self._available():
+            return MISSING
+        try:
+            return self._decode(await self.async_client.get(self._key(key)))
+        except redis.RedisError as exc:
+            self._fail(exc)
+            return MISSING
+
+    async def aset(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        ttl = self._ttl_for(value, ttl)
+        if ttl <= 0 or not self._available():
+            return
+        try:
+            await self.async_client.set(
+                self._key(key), value if value is not None else _NEGATIVE_MARKER, ex=ttl
+            )
+        except redis.RedisError as exc:
+            self._fail(exc)
+
+    async def aset_many(self, mapping: Dict[str, Optional[str]], ttl: Optional[float] = None) -> None:
+        if not mapping or not self._available():
+            return
+        try:
+            async with self.async_client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    entry_ttl = self._ttl_for(value, ttl)
+                    if entry_ttl > 0:
+                        pipe.set(
+                            self._key(key),
+                            value if value is not None else _NEGATIVE_MARKER,
+                            ex=entry_ttl,
+                        )
+                await pipe.execute()
+        except redis.RedisError as exc:
+            self._fail(exc)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        if not keys or not self._available():
+            return {}
+        try:
+            raw_values = self.client.mget([self._key(key) for key in keys])
+        except redis.RedisError as exc:
+            self._fail(exc)
+            return {}
+        found = {}
+        for key, raw in zip(keys, raw_values):
+            value = self._decode(raw)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    def set_many(self, mapping: Dict[str, Optional[str]], ttl: Optional[float] = None) -> None:
+        if not mapping or not self._available():
+            return
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    entry_ttl = self._ttl_for(value, ttl)
+                    if entry_ttl > 0:
+                        pipe.set(
+                            self._key(key),
+                            value if value is not None else _NEGATIVE_MARKER,
+                            ex=entry_ttl,
+                        )
+                pipe.execute()
+        except redis.RedisError as exc:
+            self._fail(exc)
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Build the shared cache backend selected by `settings.CACHE_BACKEND`.
+    """
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "redis":
+        return RedisCacheBackend(
+            url=settings.REDIS_URL,
+            ttl=settings.SHARED_CACHE_TTL_SECONDS,
+            negative_ttl=settings.URL_CACHE_NEGATIVE_TTL_SECONDS,
+            key_prefix=settings.REDIS_KEY_PREFIX,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            retry_after=settings.REDIS_RETRY_AFTER_SECONDS,
+        )
+    if backend == "memory":
+        return InMemoryCacheBackend(
+            max_size=settings.URL_CACHE_MAX_SIZE,
+            ttl=settings.SHARED_CACHE_TTL_SECONDS,
+            negative_ttl=settings.URL_CACHE_NEGATIVE_TTL_SECONDS,
+        )
+    return NullCacheBackend()
+
+
+shared_cache = get_cache_backend()
@@ -0,0 +1,307 @@
+import argparse
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+from typing import Callable, ContextManager, Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import short_code_filter_rejected_total
+from app.db.shards import shard_router, url_mapping_sources
+from app.models.url import UrlAlias, UrlMapping
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!4sHQIQH")
+_WATERMARK = struct.Struct("!32sQ")
+_MAGIC = b"URLB"
+_VERSION = 2
+
+# Rows are re-read this far below the watermark on every catch-up, because
+# ids are assigned at insert time but can become visible out of order.
+CATCH_UP_LOOKBACK = 1000
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over short codes.
+
+    Sized for `capacity` entries at `fp_rate`; bit positions come from two
+    64-bit halves of one BLAKE2b digest (Kirsch-Mitzenmacher double hashing).
+    """
+
+    def __init__(self, capacity: int, fp_rate: float, num_bits: int = 0, num_hashes: int = 0):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = num_bits or max(
+            int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))), 8
+        )
+        self.num_hashes = num_hashes or max(
+            int(round(self.num_bits / capacity * math.log(2))), 1
+        )
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        positions = list(self._positions(key))
+        with self._lock:
+            added = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self.bits[position >> 3] & mask:
+                    self.bits[position >> 3] |= mask
+                    added = True
+            # Re-adding a known key (e.g. from a catch-up lookback) is not counted.
+            if added:
+                self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class ShortCodeFilter:
+    """
+    Per-process guard that lets the redirect path reject unknown short codes
+    without a database session.
+
+    Until the filter has been built or loaded it is not `ready` and lets
+    every code through. The filter tracks the highest `url_mappings.id` it
+    has seen in each database `sources` returns (the primary, or each
+    shard), so a saved file can be loaded and caught up with only the rows
+    created since, and a background refresh picks up codes created by other
+    workers. Codes created by this worker are added as they are created;
+    those created elsewhere are found in the shared cache tier, which is
+    consulted first, until the next refresh adds them.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        fp_rate: float,
+        page_size: int,
+        sources: Callable[[], Dict[str, Callable[[], ContextManager[Session]]]],
+    ):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.page_size = page_size
+        self.sources = sources
+        self.filter = BloomFilter(capacity, fp_rate)
+        self.watermarks: Dict[str, int] = {}
+        self.ready = False
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def might_contain(self, short_url: str) -> bool:
+        if not self.ready or short_url in self.filter:
+            return True
+        short_code_filter_rejected_total.inc()
+        return False
+
+    def add(self, short_url: str) -> None:
+        self.filter.add(short_url)
+
+    def _scan(
+        self, bloom: BloomFilter, session_factory: Callable[[], ContextManager[Session]], after_id: int
+    ) -> int:
+        """
+        Add every short code with id > after_id to `bloom`, one page per query.
+        """
+        last_id = after_id
+        while True:
+            with session_factory() as db:
+                rows = db.execute(
+                    select(UrlMapping.id, UrlMapping.short_url)
+                    .where(UrlMapping.id > last_id)
+                    .order_by(UrlMapping.id)
+                    .limit(self.page_size)
+                ).all()
+            for row_id, short_url in rows:
+                if short_url:
+                    bloom.add(short_url)
+                last_id = row_id
+            if len(rows) < self.page_size:
+                return last_id
+
+    def _scan_aliases(self, bloom: BloomFilter, session_factory: Callable[[], ContextManager[Session]]) -> None:
+        """
+        Add every alias short code to `bloom`, one page per query. Aliases
+        are only created from codes already in the filter, so catch-up
+        never needs to read them.
+        """
+        last_code = ""
+        while True:
+            with session_factory() as db:
+                codes = db.scalars(
+                    select(UrlAlias.short_url)
+                    .where(UrlAlias.short_url > last_code)
+                    .order_by(UrlAlias.short_url)
+                    .limit(self.page_size)
+                ).all()
+            for short_url in codes:
+                bloom.add(short_url)
+                last_code = short_url
+            if len(codes) < self.page_size:
+                return
+
+    def rebuild(self) -> None:
+        """
+        Build a fresh filter from every row in `url_mappings` and
+        `url_aliases` and swap it in.
+        """
+        with self._refresh_lock:
+            capacity = max(self.capacity, self.filter.count * 2)
+            bloom = BloomFilter(capacity, self.fp_rate)
+            watermarks = {}
+            for label, session_factory in self.sources().items():
+                watermarks[label] = self._scan(bloom, session_factory, after_id=0)
+                self._scan_aliases(bloom, session_factory)
+            self.filter, self.watermarks, self.capacity = bloom, watermarks, capacity
+            self.ready = True
+            logger.info("Built short code filter with %d entries", bloom.count)
+
+    def catch_up(self) -> None:
+        """
+        Add codes created since the last scan, rebuilding if the filter has
+        outgrown the capacity it was sized for.
+        """
+        if self.filter.count > self.capacity:
+            self.rebuild()
+            return
+        with self._refresh_lock:
+            for label, session_factory in self.sources().items():
+                watermark = self.watermarks.get(label, 0)
+                self.watermarks[label] = max(
+                    watermark,
+                    self._scan(
+                        self.filter, session_factory, after_id=max(watermark - CATCH_UP_LOOKBACK, 0)
+                    ),
+                )
+
+    def save(self, path: str) -> None:
+        """
+        Write the filter to `path` atomically.
+        """
+        bloom = self.filter
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            watermarks = dict(self.watermarks)
+            handle.write(_HEADER.pack(
+                _MAGIC, _VERSION, bloom.num_bits, bloom.num_hashes, bloom.count, len(watermarks)
+            ))
+            for label, watermark in watermarks.items():
+                handle.write(_WATERMARK.pack(label.encode("utf-8"), watermark))
+            handle.write(bloom.bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Load a filter written by `save`, keeping the sizing it was built with.
+        Returns False if the file is missing or unreadable.
+        """
+        try:
+            with open(path, "rb") as handle:
+                magic, version, num_bits, num_hashes, count, sources = _HEADER.unpack(
+                    handle.read(_HEADER.size)
+                )
+                watermarks = {}
+                for _ in range(sources):
+                    label, watermark = _WATERMARK.unpack(handle.read(_WATERMARK.size))
+                    watermarks[label.rstrip(b"\0").decode("utf-8")] = watermark
+                bits = handle.read()
+        except (OSError, struct.error, UnicodeDecodeError):
+            return False
+        if magic != _MAGIC or version != _VERSION or len(bits) != (num_bits + 7) // 8:
+            return False
+        if set(watermarks) != set(self.sources()):
+            # Written for a different set of shards.
+            return False
+        bloom = BloomFilter(self.capacity, self.fp_rate, num_bits=num_bits, num_hashes=num_hashes)
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        self.filter, self.watermarks = bloom, watermarks
+        return True
+
+    def warm_up(self, path: Optional[str] = None) -> None:
+        """
+        Load from `path` and catch up, or fall back to a full rebuild.
+        """
+        try:
+            if path and self.load(path):
+                self.catch_up()
+                self.ready = True
+                logger.info("Loaded short code filter from %s", path)
+            else:
+                self.rebuild()
+        except Exception as exc:
+            logger.warning("Short code filter unavailable, redirects go to the database: %s", exc)
+
+    def start(self, refresh_interval: float, path: Optional[str] = None) -> None:
+        """
+        Warm up and keep catching up in a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(refresh_interval, path), name="short-code-filter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, path: Optional[str] = None) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if path and self.ready:
+            self.save(path)
+
+    def _run(self, refresh_interval: float, path: Optional[str]) -> None:
+        self.warm_up(path)
+        while not self._stop.wait(refresh_interval):
+            try:
+                self.catch_up()
+            except Exception as exc:
+                logger.warning("Short code filter refresh failed: %s", exc)
+
+
+short_code_filter = ShortCodeFilter(
+    capacity=settings.BLOOM_FILTER_CAPACITY,
+    fp_rate=settings.BLOOM_FILTER_FP_RATE,
+    page_size=settings.BLOOM_FILTER_PAGE_SIZE,
+    sources=url_mapping_sources,
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the short code filter from the database and save it for fast worker start-up."
+    )
+    parser.add_argument("path", nargs="?", default=settings.BLOOM_FILTER_PATH)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no path given and BLOOM_FILTER_PATH is not set")
+    if shard_router.enabled:
+        shard_router.refresh()
+    short_code_filter.rebuild()
+    short_code_filter.save(args.path)
+    print(f"Saved {short_code_filter.filter.count} short codes to {args.path}")
@@ -0,0 +1,218 @@
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.cache.local import url_cache
+from app.core.config import settings
+from app.crud.url import mapping_cache_value
+from app.crud.url_core import CoreUrlQueries
+from app.db.replicas import read_connection_scope
+from app.db.shards import shard_router
+
+logger = logging.getLogger(__name__)
+
+core_url_queries = CoreUrlQueries()
+
+# Codes per IN (...) list when preloading.
+PRELOAD_CHUNK_SIZE = 1000
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in `depth` rows of `width` counters. A key's
+    estimate is the smallest of its counters, so it can overcount by
+    collisions but never undercount.
+    """
+
+    def __init__(self, width: int, depth: int):
+        self.width = max(width, 1)
+        self.depth = max(depth, 1)
+        self.rows = [array("L", bytes(array("L").itemsize * self.width)) for _ in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """
+        Count one occurrence of `key` and return its new estimate.
+        """
+        # Row indexes by double hashing from one (cached) string hash.
+        digest = hash(key)
+        step = (digest >> 32) | 1
+        estimate = None
+        for row in self.rows:
+            index = digest % self.width
+            count = row[index] + 1
+            row[index] = count
+            if estimate is None or count < estimate:
+                estimate = count
+            digest += step
+        return estimate
+
+    def decay(self) -> None:
+        """
+        Halve every counter, so old traffic fades out.
+        """
+        for seed, row in enumerate(self.rows):
+            self.rows[seed] = array("L", (count >> 1 for count in row))
+
+
+class HotKeyTracker:
+    """
+    Finds the most requested short codes with a count-min sketch and a
+    top-K min-heap, in memory independent of the number of distinct codes.
+
+    Every `interval` seconds a background thread halves all counts, so the
+    list follows current traffic, pins the top codes in the per-worker cache
+    so LRU eviction cannot drop them, and writes the list to `path`. A new
+    worker preloads the codes in that file before it starts serving.
+    """
+
+    def __init__(self, k: int, width: int, depth: int, interval: float, path: str):
+        self.k = max(k, 1)
+        self.interval = interval
+        self.path = path
+        self.sketch = CountMinSketch(width, depth)
+        # One heap entry per tracked code; an entry's count can lag behind
+        # `counts` and is brought up to date when it reaches the top.
+        self.counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, short_url: str) -> None:
+        with self._lock:
+            count = self.sketch.add(short_url)
+            if short_url in self.counts:
+                self.counts[short_url] = count
+                return
+            if len(self.counts) < self.k:
+                self.counts[short_url] = count
+                heapq.heappush(self._heap, (count, short_url))
+                return
+            while True:
+                lowest, lowest_key = self._heap[0]
+                current = self.counts[lowest_key]
+                if current == lowest:
+                    break
+                heapq.heapreplace(self._heap, (current, lowest_key))
+            if count > lowest:
+                heapq.heapreplace(self._heap, (count, short_url))
+                del self.counts[lowest_key]
+                self.counts[short_url] = count
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        The tracked codes with their estimated counts, hottest first.
+        """
+        with self._lock:
+            ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit is not None else ranked
+
+    def decay(self) -> None:
+        with self._lock:
+            self.sketch.decay()
+            self.counts = {key: count >> 1 for key, count in self.counts.items()}
+            self._heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def save(self, path: str) -> None:
+        """
+        Write the current list to `path` atomically.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(
+                {"saved_at": int(time.time()), "keys": [[key, count] for key, count in self.top()]},
+                handle,
+            )
+        os.replace(tmp_path, path)
+
+    def warm_up(self) -> int:
+        """
+        Preload and pin the codes saved at `path` by a previous worker.
+        Returns the number of codes cached.
+        """
+        if not self.path:
+            return 0
+        try:
+            with open(self.path) as handle:
+                keys = [key for key, _ in json.load(handle)["keys"]]
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Ignoring hot key list %s: %s", self.path, exc)
+            return 0
+        url_cache.pin(keys[:self.k])
+        loaded = preload(keys[:self.k])
+        logger.info("Preloaded %d of %d hot short codes from %s", loaded, len(keys), self.path)
+        return loaded
+
+    def refresh(self) -> None:
+        self.decay()
+        url_cache.pin(key for key, _ in self.top())
+        if self.path:
+            self.save(self.path)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hot-keys", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.path and self.counts:
+            self.save(self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("Hot key refresh failed: %s", exc)
+
+
+def preload(short_urls: Iterable[str]) -> int:
+    """
+    Load unexpired mappings for `short_urls` into the per-worker cache with
+    one query per chunk of codes, on each code's shard when sharding is on.
+    Codes that are not found are left uncached. Returns the number cached.
+    """
+    groups = defaultdict(list)
+    for short_url in short_urls:
+        if shard_router.enabled:
+            shards = shard_router.shards_for_short_url(short_url)
+            if shards:
+                groups[shards[0]].append(short_url)
+        else:
+            groups[None].append(short_url)
+    loaded = 0
+    for shard, codes in groups.items():
+        for start in range(0, len(codes), PRELOAD_CHUNK_SIZE):
+            chunk = codes[start:start + PRELOAD_CHUNK_SIZE]
+            with (shard.connection_scope() if shard else read_connection_scope()) as conn:
+                rows = core_url_queries.get_urls_by_short_urls(conn=conn, short_urls=chunk)
+            for row in rows:
+                url_cache.set(row.short_url, mapping_cache_value(row))
+                loaded += 1
+    return loaded
+
+
+hot_key_tracker = HotKeyTracker(
+    k=settings.HOT_KEYS_TOP_K,
+    width=settings.HOT_KEYS_SKETCH_WIDTH,
+    depth=settings.HOT_KEYS_SKETCH_DEPTH,
+    interval=settings.HOT_KEYS_INTERVAL_SECONDS,
+    path=settings.HOT_KEYS_PATH,
+)
+
@@ -0,0 +1,182 @@
+import calendar
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# Returned by `get` when a key is not cached at all. Distinct from `None`,
+# which is a cached "this short code does not exist" answer.
+MISSING = object()
+
+# Values of links that expire or have their own redirect policy are stored as
+# "~<unix seconds>;<status>;<max-age>;<stale-while-revalidate> <url>", with
+# empty fields for unset parts and trailing ones omitted, so every tier can
+# reject them once expired; original URLs always start with a scheme.
+_EXPIRING_MARKER = "~"
+
+
+def cache_value(
+    original_url: Optional[str],
+    expires_at: Optional[datetime],
+    policy: Sequence[Optional[int]] = (),
+) -> Optional[str]:
+    """
+    Encode an original URL with its UTC expiry and redirect policy
+    overrides for the caches and the redirect snapshot.
+    """
+    if original_url is None:
+        return None
+    fields = [str(calendar.timegm(expires_at.utctimetuple())) if expires_at else ""]
+    fields.extend("" if value is None else str(value) for value in policy)
+    meta = ";".join(fields).rstrip(";")
+    if not meta:
+        return original_url
+    return f"{_EXPIRING_MARKER}{meta} {original_url}"
+
+
+def parse_value(value: str) -> Tuple[str, Optional[int], Tuple[Optional[int], ...]]:
+    """
+    Split a cached URL value into the original URL, its expiry in unix
+    seconds, and its redirect policy overrides.
+    """
+    if value[0] != _EXPIRING_MARKER:
+        return value, None, ()
+    meta, _, original_url = value[1:].partition(" ")
+    expires_at, *policy = meta.split(";")
+    return (
+        original_url,
+        int(expires_at) if expires_at else None,
+        tuple(int(field) if field else None for field in policy),
+    )
+
+
+class LocalUrlCache:
+    """
+    Bounded per-process LRU cache for short code -> original URL lookups.
+
+    Entries expire after `ttl` seconds. Unknown short codes can be cached as
+    `None` for `negative_ttl` seconds so repeated misses skip the database.
+    Entries of pinned codes are kept apart from the LRU order, so eviction
+    never drops them, and do not count towards `max_size`.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pinned: Dict[str, tuple] = {}
+        self._pinned_keys: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """
+        Look up a cached value.
+
+        Args:
+            key (str): The short code.
+
+        Returns:
+            The cached original URL, `None` for a cached miss, or `MISSING`
+            if the key is not cached or has expired.
+        """
+        with self._lock:
+            entries = self._pinned if key in self._pinned_keys else self._entries
+            entry = entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del entries[key]
+                self.misses += 1
+                return MISSING
+            if entries is self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Optional[str], ttl: Optional[float] = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key (str): The short code.
+            value (Optional[str]): The original URL, or `None` to cache a miss.
+            ttl (Optional[float]): Overrides the default TTL for this entry.
+        """
+        if self.max_size <= 0:
+            return
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if key in self._pinned_keys:
+                self._pinned[key] = (value, time.monotonic() + ttl)
+                return
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drop a single entry, positive or negative.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pinned.pop(key, None)
+
+    def pin(self, keys: Iterable[str]) -> None:
+        """
+        Replace the set of pinned codes. Cached entries move to or from the
+        LRU order with their expiry unchanged.
+
+        Args:
+            keys (Iterable[str]): The short codes to pin.
+        """
+        if self.max_size <= 0:
+            return
+        pinned_keys = frozenset(keys)
+        with self._lock:
+            unpinned = {key: entry for key, entry in self._pinned.items() if key not in pinned_keys}
+            self._pinned = {key: entry for key, entry in self._pinned.items() if key in pinned_keys}
+            for key in pinned_keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._pinned[key] = entry
+            self._pinned_keys = pinned_keys
+            self._entries.update(unpinned)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries) + len(self._pinned),
+                "pinned": len(self._pinned),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+url_cache = LocalUrlCache(
+    max_size=settings.URL_CACHE_MAX_SIZE if settings.URL_CACHE_ENABLED else 0,
+    ttl=settings.URL_CACHE_TTL_SECONDS,
+    negative_ttl=settings.URL_CACHE_NEGATIVE_TTL_SECONDS,
+)
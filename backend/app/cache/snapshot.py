@@ -0,0 +1,314 @@
+import argparse
+import heapq
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.metrics import redirect_snapshot_hits_total
+from app.crud.url import mapping_cache_value, unexpired
+from app.db.shards import shard_router, url_mapping_sources
+from app.models.url import UrlMapping
+
+# Columns a mapping's cache value is built from.
+_VALUE_COLUMNS = (
+    UrlMapping.short_url,
+    UrlMapping.original_url,
+    UrlMapping.expires_at,
+    UrlMapping.redirect_status,
+    UrlMapping.cache_max_age,
+    UrlMapping.cache_stale_while_revalidate,
+)
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!4sHHQH")
+_WATERMARK = struct.Struct("!32sQ")
+_OFFSET = struct.Struct("<Q")
+_MAGIC = b"URLS"
+_VERSION = 1
+
+# Rows are re-read this far below the watermark when catching up the delta,
+# because ids are assigned at insert time but can become visible out of order.
+DELTA_LOOKBACK = 1000
+EXPORT_PAGE_SIZE = 10000
+
+
+class _CodeColumn:
+    """
+    Read-only sequence view of the sorted fixed-width codes, so `bisect`
+    can search the mapped file; each probe slices out one code.
+    """
+
+    __slots__ = ("buffer", "start", "width", "count")
+
+    def __init__(self, buffer: mmap.mmap, start: int, width: int, count: int):
+        self.buffer = buffer
+        self.start = start
+        self.width = width
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        offset = self.start + index * self.width
+        return self.buffer[offset:offset + self.width]
+
+
+class RedirectSnapshot:
+    """
+    An immutable, memory-mapped short code -> original URL table.
+
+    Layout after the header and per-database watermarks: `count` short codes
+    of `width` bytes, NUL-padded and sorted; `count + 1` little-endian
+    uint64 offsets into the URL blob; the UTF-8 URLs back to back, encoded
+    with their expiry and redirect policy by `cache_value` where set. The file
+    is mapped read-only, so every worker shares one copy through the page
+    cache, and a lookup is a binary search that allocates nothing per entry.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as handle:
+            self.stat = os.fstat(handle.fileno())
+            self.buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.count, sources = _HEADER.unpack_from(self.buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a redirect snapshot")
+        position = _HEADER.size
+        self.watermarks: Dict[str, int] = {}
+        for _ in range(sources):
+            label, watermark = _WATERMARK.unpack_from(self.buffer, position)
+            self.watermarks[label.rstrip(b"\0").decode("utf-8")] = watermark
+            position += _WATERMARK.size
+        self.codes = _CodeColumn(self.buffer, position, self.width, self.count)
+        self.offsets_start = position + self.count * self.width
+        self.blob_start = self.offsets_start + (self.count + 1) * _OFFSET.size
+
+    def get(self, short_url: str) -> Optional[str]:
+        key = short_url.encode("utf-8")
+        if len(key) > self.width:
+            return None
+        key = key.ljust(self.width, b"\0")
+        index = bisect_left(self.codes, key)
+        if index == self.count or self.codes[index] != key:
+            return None
+        start, end = (
+            _OFFSET.unpack_from(self.buffer, self.offsets_start + (index + offset) * _OFFSET.size)[0]
+            for offset in (0, 1)
+        )
+        return self.buffer[self.blob_start + start:self.blob_start + end].decode("utf-8")
+
+
+class SnapshotStore:
+    """
+    Serves redirects from the current `RedirectSnapshot` plus a small
+    in-memory delta of mappings created after it was exported.
+
+    A background thread swaps in a new snapshot when the file at `path` is
+    replaced (export writes it atomically), and catches the delta up with
+    rows above the snapshot's watermarks. Codes found in neither fall
+    through to the caches and the database as before.
+    """
+
+    def __init__(self, path: str, delta_max_keys: int, page_size: int = EXPORT_PAGE_SIZE):
+        self.path = path
+        self.delta_max_keys = delta_max_keys
+        self.page_size = page_size
+        self.snapshot: Optional[RedirectSnapshot] = None
+        self.delta: Dict[str, str] = {}
+        self.watermarks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, short_url: str) -> Optional[str]:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        original_url = snapshot.get(short_url) or self.delta.get(short_url)
+        if original_url is not None:
+            redirect_snapshot_hits_total.inc()
+        return original_url
+
+    def reload(self) -> bool:
+        """
+        Map the file at `path` if it differs from the current snapshot.
+        Returns True when a new snapshot was swapped in.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        current = self.snapshot
+        if current is not None and (stat.st_ino, stat.st_mtime_ns) == (current.stat.st_ino, current.stat.st_mtime_ns):
+            return False
+        snapshot = RedirectSnapshot(self.path)
+        with self._lock:
+            delta, watermarks = {}, dict(snapshot.watermarks)
+            self._catch_up(snapshot, delta, watermarks)
+            # The old mapping is unmapped once the last lookup using it returns.
+            self.snapshot, self.delta, self.watermarks = snapshot, delta, watermarks
+        logger.info("Loaded redirect snapshot with %d codes from %s", snapshot.count, self.path)
+        return True
+
+    def _catch_up(self, snapshot: RedirectSnapshot, delta: Dict[str, str], watermarks: Dict[str, int]) -> None:
+        for label, session_factory in url_mapping_sources().items():
+            last_id = max(watermarks.get(label, 0) - DELTA_LOOKBACK, 0)
+            while len(delta) < self.delta_max_keys:
+                with session_factory() as db:
+                    rows = db.execute(
+                        select(UrlMapping.id, *_VALUE_COLUMNS)
+                        .where(UrlMapping.id > last_id)
+                        .order_by(UrlMapping.id)
+                        .limit(self.page_size)
+                    ).all()
+                for row in rows:
+                    # The lookback re-reads rows the snapshot already has.
+                    if row.short_url and row.original_url and snapshot.get(row.short_url) is None:
+                        delta[row.short_url] = mapping_cache_value(row)
+                    last_id = row.id
+                if len(rows) < self.page_size:
+                    break
+            else:
+                logger.warning(
+                    "Redirect snapshot delta is full (%d codes); export a new snapshot", len(delta)
+                )
+            watermarks[label] = max(watermarks.get(label, 0), last_id)
+
+    def refresh(self) -> None:
+        if self.reload() or self.snapshot is None:
+            return
+        with self._lock:
+            delta, watermarks = dict(self.delta), dict(self.watermarks)
+            self._catch_up(self.snapshot, delta, watermarks)
+            self.delta, self.watermarks = delta, watermarks
+
+    def start(self, refresh_interval: float) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(refresh_interval,), name="redirect-snapshot", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, refresh_interval: float) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("Redirect snapshot refresh failed: %s", exc)
+            if self._stop.wait(refresh_interval):
+                return
+
+
+def _sorted_mappings(session_factory, watermark: int, page_size: int) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (short_url, value) for unexpired rows up to `watermark`, ordered
+    by code, one keyset page per query.
+    """
+    last_code = ""
+    while True:
+        with session_factory() as db:
+            # Lookups compare bytes, so sort by code points rather than the
+            # database's locale.
+            code = UrlMapping.short_url
+            if db.get_bind().dialect.name == "postgresql":
+                code = code.collate("C")
+            rows = db.execute(
+                select(*_VALUE_COLUMNS)
+                .where(UrlMapping.id <= watermark, code > last_code, unexpired())
+                .order_by(code)
+                .limit(page_size)
+            ).all()
+        for row in rows:
+            if row.original_url:
+                yield row.short_url, mapping_cache_value(row)
+        if len(rows) < page_size:
+            return
+        last_code = rows[-1][0]
+
+
+def export_snapshot(path: str, page_size: int = EXPORT_PAGE_SIZE) -> int:
+    """
+    Write a snapshot of every mapping to `path`, replacing it atomically.
+    Returns the number of codes written.
+    """
+    width = settings.SHORT_URL_LENGTH
+    sources = url_mapping_sources()
+    watermarks = {}
+    for label, session_factory in sources.items():
+        with session_factory() as db:
+            watermarks[label] = db.scalar(select(func.coalesce(func.max(UrlMapping.id), 0)))
+    streams = [
+        _sorted_mappings(session_factory, watermarks[label], page_size)
+        for label, session_factory in sources.items()
+    ]
+    directory = os.path.dirname(os.path.abspath(path))
+    count = blob_size = 0
+    with tempfile.TemporaryFile(dir=directory) as codes, \
+            tempfile.TemporaryFile(dir=directory) as offsets, \
+            tempfile.TemporaryFile(dir=directory) as blob:
+        offsets.write(_OFFSET.pack(0))
+        previous = None
+        for short_url, value in heapq.merge(*streams):
+            if short_url == previous:
+                # On two shards while its bucket is being moved.
+                continue
+            previous = short_url
+            code = short_url.encode("utf-8")
+            if len(code) > width:
+                logger.warning("Skipping %s, longer than %d characters", short_url, width)
+                continue
+            url = value.encode("utf-8")
+            codes.write(code.ljust(width, b"\0"))
+            blob.write(url)
+            blob_size += len(url)
+            offsets.write(_OFFSET.pack(blob_size))
+            count += 1
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, _VERSION, width, count, len(watermarks)))
+            for label, watermark in watermarks.items():
+                handle.write(_WATERMARK.pack(label.encode("utf-8"), watermark))
+            for part in (codes, offsets, blob):
+                part.seek(0)
+                shutil.copyfileobj(part, handle)
+        os.replace(tmp_path, path)
+    return count
+
+
+redirect_snapshot = SnapshotStore(
+    path=settings.SNAPSHOT_PATH,
+    delta_max_keys=settings.SNAPSHOT_DELTA_MAX_KEYS,
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export every short code to a memory-mapped redirect snapshot."
+    )
+    parser.add_argument("path", nargs="?", default=settings.SNAPSHOT_PATH)
+    args = parser.parse_args()
+    if not args.path:
+        parser.error("no path given and SNAPSHOT_PATH is not set")
+    if shard_router.enabled:
+        shard_router.refresh()
+    count = export_snapshot(args.path)
+    print(f"Saved {count} short codes to {args.path}")
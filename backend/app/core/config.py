@@ -7,6 +7,11 @@ from pydantic_settings import BaseSettings
 
 load_dotenv()
 
+# Longest link lifetime; later expiries would overflow datetime.
+MAX_URL_TTL_SECONDS = 10 * 365 * 24 * 60 * 60
+# Statuses a redirect may be sent with.
+REDIRECT_STATUS_CODES = (301, 302, 307, 308)
+
 
 class Settings(BaseSettings):
     API_V1_STR: str = "/url-shortener/api/v1"
@@ -31,10 +36,165 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "")
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "")
-    SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = os.getenv(
+    # PostgreSQL in deployments; the benchmark suite points this at SQLite
+    SQLALCHEMY_DATABASE_URI: Optional[Union[PostgresDsn, str]] = os.getenv(
         "SQLALCHEMY_DATABASE_URI"
     )
     SHORT_URL_LENGTH: int = int(os.getenv("SHORT_URL_LENGTH", "10"))
+    # "random" (check-and-retry) or "sequence" (base62 of leased id blocks)
+    SHORT_CODE_ALLOCATOR: str = os.getenv("SHORT_CODE_ALLOCATOR", "random")
+    SHORT_CODE_BLOCK_SIZE: int = int(os.getenv("SHORT_CODE_BLOCK_SIZE", "1000"))
+    # Secret for the bijective scramble of sequence codes; empty disables it
+    SHORT_CODE_SCRAMBLE_KEY: str = os.getenv("SHORT_CODE_SCRAMBLE_KEY", "")
+
+    @field_validator("SHORT_CODE_ALLOCATOR")
+    @classmethod
+    def check_short_code_allocator(cls, v: str, info) -> str:
+        # short_code_block_seq only exists on PostgreSQL.
+        if v.lower() == "sequence" and not str(info.data.get("SQLALCHEMY_DATABASE_URI")).startswith("postgresql"):
+            raise ValueError("SHORT_CODE_ALLOCATOR=sequence needs a PostgreSQL SQLALCHEMY_DATABASE_URI")
+        return v
+
+    URL_BATCH_MAX_SIZE: int = int(os.getenv("URL_BATCH_MAX_SIZE", "1000"))
+
+    # Deduplicate on a canonical form of the original URL: lowercase scheme and
+    # host, no default port, normalized percent-encoding, sorted query
+    # parameters, without URL_TRACKING_PARAMETERS
+    URL_CANONICALIZATION_ENABLED: bool = True
+    # Comma-separated query parameters to strip; a trailing * matches a prefix
+    URL_TRACKING_PARAMETERS: str = os.getenv(
+        "URL_TRACKING_PARAMETERS", "utm_*,gclid,dclid,fbclid,msclkid,yclid,mc_cid,mc_eid,_ga,_gl"
+    )
+    # Store and redirect to the URL as first submitted instead of its canonical form
+    URL_KEEP_ORIGINAL_FORM: bool = False
+
+    # Group concurrent single creates into one transaction
+    CREATE_COALESCING_ENABLED: bool = False
+    CREATE_COALESCING_MAX_WAIT_MS: float = float(os.getenv("CREATE_COALESCING_MAX_WAIT_MS", "5"))
+    CREATE_COALESCING_MAX_GROUP_SIZE: int = int(os.getenv("CREATE_COALESCING_MAX_GROUP_SIZE", "64"))
+
+    # One redirect lookup per short code, and one create per original URL,
+    # in flight per process; concurrent callers share its result
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # Lifetime of links created without `expires_in_seconds`; 0 keeps them forever
+    URL_DEFAULT_TTL_SECONDS: int = int(os.getenv("URL_DEFAULT_TTL_SECONDS", "0"))
+
+    @field_validator("URL_DEFAULT_TTL_SECONDS")
+    @classmethod
+    def check_default_ttl(cls, v: int) -> int:
+        if v > MAX_URL_TTL_SECONDS:
+            raise ValueError(f"URL_DEFAULT_TTL_SECONDS must be at most {MAX_URL_TTL_SECONDS}")
+        return v
+
+    # Background purge of expired url_mappings rows, in small batches
+    URL_EXPIRY_SWEEP_ENABLED: bool = True
+    URL_EXPIRY_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("URL_EXPIRY_SWEEP_INTERVAL_SECONDS", "60"))
+    URL_EXPIRY_SWEEP_BATCH_SIZE: int = int(os.getenv("URL_EXPIRY_SWEEP_BATCH_SIZE", "1000"))
+
+    # Redirect status and Cache-Control max-age / stale-while-revalidate for
+    # links created without their own; only links that never expire are cached
+    REDIRECT_STATUS_CODE: int = int(os.getenv("REDIRECT_STATUS_CODE", "307"))
+    REDIRECT_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("REDIRECT_CACHE_MAX_AGE_SECONDS", "0"))
+    REDIRECT_STALE_WHILE_REVALIDATE_SECONDS: int = int(os.getenv("REDIRECT_STALE_WHILE_REVALIDATE_SECONDS", "0"))
+
+    @field_validator("REDIRECT_STATUS_CODE")
+    @classmethod
+    def check_redirect_status(cls, v: int) -> int:
+        if v not in REDIRECT_STATUS_CODES:
+            raise ValueError(f"REDIRECT_STATUS_CODE must be one of {REDIRECT_STATUS_CODES}")
+        return v
+
+    # Buffered per-link click counting on the redirect path
+    CLICK_TRACKING_ENABLED: bool = True
+    CLICK_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("CLICK_FLUSH_INTERVAL_SECONDS", "10"))
+    CLICK_BUFFER_MAX_KEYS: int = int(os.getenv("CLICK_BUFFER_MAX_KEYS", "100000"))
+
+    # Per-worker short code -> original URL cache on the redirect path
+    URL_CACHE_ENABLED: bool = True
+    URL_CACHE_MAX_SIZE: int = int(os.getenv("URL_CACHE_MAX_SIZE", "100000"))
+    URL_CACHE_TTL_SECONDS: float = float(os.getenv("URL_CACHE_TTL_SECONDS", "300"))
+    URL_CACHE_NEGATIVE_TTL_SECONDS: float = float(
+        os.getenv("URL_CACHE_NEGATIVE_TTL_SECONDS", "30")
+    )
+
+    # Shared cache tier behind the per-worker cache: "none", "memory" or "redis"
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "none")
+    SHARED_CACHE_TTL_SECONDS: float = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "86400"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    REDIS_KEY_PREFIX: str = os.getenv("REDIS_KEY_PREFIX", "url:")
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.1"))
+    REDIS_RETRY_AFTER_SECONDS: float = float(os.getenv("REDIS_RETRY_AFTER_SECONDS", "5"))
+
+    # Per-worker Bloom filter that answers definite misses without the database
+    BLOOM_FILTER_ENABLED: bool = False
+    BLOOM_FILTER_CAPACITY: int = int(os.getenv("BLOOM_FILTER_CAPACITY", "10000000"))
+    BLOOM_FILTER_FP_RATE: float = float(os.getenv("BLOOM_FILTER_FP_RATE", "0.01"))
+    BLOOM_FILTER_PAGE_SIZE: int = int(os.getenv("BLOOM_FILTER_PAGE_SIZE", "50000"))
+    BLOOM_FILTER_REFRESH_SECONDS: float = float(os.getenv("BLOOM_FILTER_REFRESH_SECONDS", "5"))
+    BLOOM_FILTER_PATH: str = os.getenv("BLOOM_FILTER_PATH", "")
+
+    # Memory-mapped redirect snapshot written by `python -m app.cache.snapshot`
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_PATH: str = os.getenv("SNAPSHOT_PATH", "")
+    SNAPSHOT_REFRESH_SECONDS: float = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "10"))
+    SNAPSHOT_DELTA_MAX_KEYS: int = int(os.getenv("SNAPSHOT_DELTA_MAX_KEYS", "100000"))
+
+    # Track the most redirected codes, pin them in the per-worker cache and
+    # save them to HOT_KEYS_PATH for new workers to preload
+    HOT_KEYS_ENABLED: bool = False
+    HOT_KEYS_TOP_K: int = int(os.getenv("HOT_KEYS_TOP_K", "1000"))
+    HOT_KEYS_SKETCH_WIDTH: int = int(os.getenv("HOT_KEYS_SKETCH_WIDTH", "16384"))
+    HOT_KEYS_SKETCH_DEPTH: int = int(os.getenv("HOT_KEYS_SKETCH_DEPTH", "4"))
+    HOT_KEYS_INTERVAL_SECONDS: float = float(os.getenv("HOT_KEYS_INTERVAL_SECONDS", "60"))
+    HOT_KEYS_PATH: str = os.getenv("HOT_KEYS_PATH", "")
+
+    # Bearer token for the /admin endpoints (listing, export, hot keys).
+    # Empty leaves them switched off.
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+
+    # Prometheus /metrics endpoint and hot-path instrumentation
+    METRICS_ENABLED: bool = True
+
+    # Answer GET /{short_code} in a raw ASGI middleware ahead of the FastAPI stack
+    FAST_REDIRECT_ENABLED: bool = False
+
+    # Per-worker admission control for redirects and creates: requests in
+    # flight, with creates capped separately, and a short bounded queue
+    ADMISSION_CONTROL_ENABLED: bool = False
+    ADMISSION_MAX_CONCURRENCY: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+    ADMISSION_CREATE_MAX_CONCURRENCY: int = int(os.getenv("ADMISSION_CREATE_MAX_CONCURRENCY", "16"))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "128"))
+    ADMISSION_QUEUE_TIMEOUT_MS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "250"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+    # Creates per second per client address, with bursts up to the burst size; 0 disables
+    CREATE_RATE_LIMIT_PER_SECOND: float = float(os.getenv("CREATE_RATE_LIMIT_PER_SECOND", "0"))
+    CREATE_RATE_LIMIT_BURST: int = int(os.getenv("CREATE_RATE_LIMIT_BURST", "20"))
+
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+    # Serve the endpoints with `async def` handlers on an asyncpg engine
+    DB_ASYNC_ENABLED: bool = False
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = os.getenv(
+        "SQLALCHEMY_ASYNC_DATABASE_URI"
+    )
+    # Hot lookups through prebuilt Core statements on plain connections,
+    # returning tuples; false goes back to ORM queries on a Session
+    DB_CORE_QUERIES_ENABLED: bool = True
+
+    # Comma-separated read replica DSNs; redirect lookups are spread across them
+    DB_REPLICA_URIS: str = os.getenv("DB_REPLICA_URIS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_HEALTH_CHECK_SECONDS", "5"))
+    # Reads of a code this worker just created go to the primary for this long
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+
+    # Comma-separated url_mappings shard DSNs; empty keeps url_mappings on the primary
+    SHARD_DATABASE_URIS: str = os.getenv("SHARD_DATABASE_URIS", "")
+    SHARD_MAP_REFRESH_SECONDS: float = float(os.getenv("SHARD_MAP_REFRESH_SECONDS", "5"))
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     @classmethod
@@ -51,6 +211,24 @@ class Settings(BaseSettings):
             path=f"{info.data.get('POSTGRES_DB')}",
         )
 
+    @staticmethod
+    def async_uri_for(uri: str) -> str:
+        return str(uri).replace("postgresql://", "postgresql+asyncpg://", 1)
+
+    @property
+    def async_database_uri(self) -> str:
+        if self.SQLALCHEMY_ASYNC_DATABASE_URI:
+            return self.SQLALCHEMY_ASYNC_DATABASE_URI
+        return self.async_uri_for(self.SQLALCHEMY_DATABASE_URI)
+
+    @property
+    def replica_database_uris(self) -> List[str]:
+        return [uri.strip() for uri in self.DB_REPLICA_URIS.split(",") if uri.strip()]
+
+    @property
+    def shard_database_uris(self) -> List[str]:
+        return [uri.strip() for uri in self.SHARD_DATABASE_URIS.split(",") if uri.strip()]
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.click import UrlClick
+
+# Codes per upsert statement: three bind parameters each, well under
+# SQLite's and PostgreSQL's limits.
+UPSERT_CHUNK_SIZE = 1000
+
+
+class CRUDClick:
+    """
+    CRUD operations for UrlClick model.
+    """
+
+    def bulk_increment(self, db: Session, clicks: Dict[str, Tuple[int, datetime]]) -> None:
+        """
+        Add buffered click counts with a single multi-row upsert and commit.
+        Callers pass at most `UPSERT_CHUNK_SIZE` codes at a time.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            clicks (Dict[str, Tuple[int, datetime]]): Short code -> (clicks, last access).
+        """
+        if not clicks:
+            return
+        dialect_name = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+        # GREATEST on PostgreSQL; SQLite's multi-argument max() is the scalar equivalent.
+        greatest = func.greatest if dialect_name == "postgresql" else func.max
+        # Sorted so concurrent flushes from several workers lock rows in the
+        # same order and cannot deadlock.
+        stmt = insert(UrlClick).values([
+            dict(short_url=short_url, click_count=count, last_accessed_at=last_accessed_at)
+            for short_url, (count, last_accessed_at) in sorted(clicks.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UrlClick.short_url],
+            set_=dict(
+                click_count=UrlClick.click_count + stmt.excluded.click_count,
+                last_accessed_at=greatest(
+                    func.coalesce(UrlClick.last_accessed_at, stmt.excluded.last_accessed_at),
+                    stmt.excluded.last_accessed_at,
+                ),
+            ),
+        )
+        db.execute(stmt)
+        db.commit()
+
+    def delete_many(self, db: Session, short_urls: List[str]) -> None:
+        """
+        Delete the click counts of purged short codes and commit.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            short_urls (List[str]): The short codes.
+        """
+        if not short_urls:
+            return
+        db.execute(delete(UrlClick).where(UrlClick.short_url.in_(short_urls)))
+        db.commit()
@@ -1,15 +1,239 @@
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Row, delete, false, func, or_, select, true, union_all
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from app.models.url import UrlMapping
+from app.cache.backends import CacheBackend, shared_cache
+from app.cache.local import cache_value
+from app.models.url import RedirectPolicy, UrlAlias, UrlMapping, UrlType
+from app.utils.url_helpers import URLUtils
+
+# Columns returned by the upsert, plus a `created` flag.
+UPSERT_RETURNING = (
+    UrlMapping.id,
+    UrlMapping.short_url,
+    UrlMapping.original_url,
+    UrlMapping.created_at,
+    UrlMapping.original_url_hash,
+    UrlMapping.expires_at,
+    UrlMapping.redirect_status,
+    UrlMapping.cache_max_age,
+    UrlMapping.cache_stale_while_revalidate,
+)
+
+# Columns of a mapping in the listing API.
+LIST_COLUMNS = (
+    UrlMapping.id,
+    UrlMapping.short_url,
+    UrlMapping.original_url,
+    UrlMapping.url_type,
+    UrlMapping.created_at,
+    UrlMapping.expires_at,
+    UrlMapping.redirect_status,
+    UrlMapping.cache_max_age,
+    UrlMapping.cache_stale_while_revalidate,
+)
+
+# Keeps IN (...) lists well below driver bind parameter limits.
+LOOKUP_CHUNK_SIZE = 1000
+
+
+def _insert_for(dialect_name: str):
+    return postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+
+
+def is_expired(expires_at: Optional[datetime]) -> bool:
+    return expires_at is not None and expires_at <= datetime.utcnow()
+
+
+def unexpired():
+    """
+    Filter for mappings that have not expired. Expiry is compared with the
+    application's UTC clock, the one `expires_at` is computed from.
+    """
+    return or_(UrlMapping.expires_at.is_(None), UrlMapping.expires_at > datetime.utcnow())
+
+
+def redirect_policy(row) -> RedirectPolicy:
+    """
+    The redirect policy overrides stored on a mapping or row.
+    """
+    return RedirectPolicy(row.redirect_status, row.cache_max_age, row.cache_stale_while_revalidate)
+
+
+def mapping_cache_value(row) -> str:
+    """
+    Cache value of a mapping or row: its original URL with its expiry and
+    redirect policy.
+    """
+    return cache_value(row.original_url, row.expires_at, redirect_policy(row))
+
+
+def build_upsert_statement(
+    dialect_name: str,
+    original_url: str,
+    short_url: str,
+    url_type: UrlType,
+    expires_at: Optional[datetime] = None,
+    policy: RedirectPolicy = RedirectPolicy(),
+):
+    """
+    Build the idempotent create statement for a URL mapping.
+
+    On PostgreSQL this is a single statement: the insert is skipped if either
+    unique index conflicts, and a UNION ALL with a lookup by original URL
+    returns the existing row instead. Other dialects get the bare
+    `INSERT ... ON CONFLICT DO NOTHING RETURNING`, and the caller falls back
+    to a lookup when nothing is returned.
+
+    An empty result means the short code collided or a concurrent insert of
+    the same URL committed after the statement's snapshot; retry with a new
+    code in both cases. The existing row is returned even if it has expired.
+    """
+    insert = _insert_for(dialect_name)
+    original_url_hash = URLUtils.url_digest(original_url)
+    values = dict(
+        original_url=original_url,
+        original_url_hash=original_url_hash,
+        original_url_host=URLUtils.url_host(original_url),
+        short_url=short_url,
+        url_type=url_type,
+        expires_at=expires_at,
+        **policy._asdict(),
+        created_at=func.now(),
+        updated_at=func.now(),
+    )
+    stmt = insert(UrlMapping).values(**values).on_conflict_do_nothing()
+    if dialect_name != "postgresql":
+        return stmt.returning(*UPSERT_RETURNING, true().label("created"))
+
+    inserted = stmt.returning(*UPSERT_RETURNING, true().label("created")).cte("inserted")
+    existing = select(*UPSERT_RETURNING, false().label("created")).where(
+        UrlMapping.original_url_hash == original_url_hash
+    )
+    return union_all(select(inserted), existing).limit(1)
+
+
+def build_bulk_insert_statement(
+    dialect_name: str, mappings: List[Tuple[str, str, Optional[datetime], RedirectPolicy]], url_type: UrlType
+):
+    """
+    Build one multi-row `INSERT ... ON CONFLICT DO NOTHING RETURNING` for
+    (original_url, short_url, expires_at, policy) tuples. Rows that conflict
+    on either unique index are silently skipped and missing from the result.
+    """
+    values = [
+        dict(
+            original_url=original_url,
+            original_url_hash=URLUtils.url_digest(original_url),
+            original_url_host=URLUtils.url_host(original_url),
+            short_url=short_url,
+            url_type=url_type,
+            expires_at=expires_at,
+            **policy._asdict(),
+            created_at=func.now(),
+            updated_at=func.now(),
+        )
+        for original_url, short_url, expires_at, policy in mappings
+    ]
+    return (
+        _insert_for(dialect_name)(UrlMapping)
+        .values(values)
+        .on_conflict_do_nothing()
+        .returning(*UPSERT_RETURNING, true().label("created"))
+    )
+
+
+def build_hash_lookup_statement(hashes: List[bytes]):
+    return select(*UPSERT_RETURNING, false().label("created")).where(
+        UrlMapping.original_url_hash.in_(hashes)
+    )
+
+
+def build_delete_expired_by_hashes_statement(hashes: List[bytes]):
+    return (
+        delete(UrlMapping)
+        .where(UrlMapping.original_url_hash.in_(hashes), UrlMapping.expires_at <= datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+class UrlListFilter(NamedTuple):
+    """
+    Filters of the listing API; None leaves a field unfiltered.
+    """
+    url_type: Optional[UrlType] = None
+    # UTC, inclusive.
+    created_after: Optional[datetime] = None
+    # UTC, exclusive.
+    created_before: Optional[datetime] = None
+    # Matched exactly against `original_url_host`.
+    host: Optional[str] = None
+    include_expired: bool = False
+
+
+def build_list_statement(
+    filters: UrlListFilter,
+    limit: Optional[int] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    inclusive: bool = False,
+):
+    """
+    Build the listing query: mappings matching `filters`, newest first by
+    (created_at, id), starting after the keyset `before` (or at it when
+    `inclusive`). Served by the (created_at, id) index, or the
+    (original_url_host, created_at, id) one when filtering by host, so a
+    page deep into the listing costs the same as the first.
+
+    After a keyset, rows tied on `created_at` and older rows are read as two
+    index range scans: a row-value comparison only seeks on `created_at` in
+    SQLite, which rescans every tied row, and batch creates share a timestamp.
+    """
+    conditions = []
+    if filters.url_type is not None:
+        conditions.append(UrlMapping.url_type == filters.url_type)
+    if filters.created_after is not None:
+        conditions.append(UrlMapping.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(UrlMapping.created_at < filters.created_before)
+    if filters.host is not None:
+        conditions.append(UrlMapping.original_url_host == filters.host)
+    if not filters.include_expired:
+        conditions.append(unexpired())
+    newest_first = (UrlMapping.created_at.desc(), UrlMapping.id.desc())
+    if before is None:
+        return select(*LIST_COLUMNS).where(*conditions).order_by(*newest_first).limit(limit)
+    created_at, row_id = before
+    tied = select(*LIST_COLUMNS).where(
+        *conditions,
+        UrlMapping.created_at == created_at,
+        UrlMapping.id <= row_id if inclusive else UrlMapping.id < row_id,
+    )
+    older = select(*LIST_COLUMNS).where(*conditions, UrlMapping.created_at < created_at)
+    page = union_all(
+        *(select(branch.order_by(*newest_first).limit(limit).subquery()) for branch in (tied, older))
+    ).subquery()
+    return select(page).order_by(page.c.created_at.desc(), page.c.id.desc()).limit(limit)
+
+
+def cached_mappings(rows: Iterable[Row]) -> Dict[str, str]:
+    return {row.short_url: mapping_cache_value(row) for row in rows}
 
 
 class CRUDUrl:
     """
     CRUD operations for UrlMapping model.
+
+    New mappings are written through to the shared cache tier.
     """
 
+    def __init__(self, cache: CacheBackend = shared_cache):
+        self.cache = cache
+
     def get_url_by_short_url(self, db: Session, short_url: str) -> UrlMapping:
         """
-        Retrieve a UrlMapping object by its short URL.
+        Retrieve a UrlMapping object by its short URL, unless it has expired.
 
         Args:
             db (Session): SQLAlchemy database session.
@@ -18,7 +242,56 @@ class CRUDUrl:
         Returns:
             UrlMapping: The UrlMapping object if found, else None.
         """
-        return db.query(UrlMapping).filter(UrlMapping.short_url == short_url).first()
+        return db.query(UrlMapping).filter(UrlMapping.short_url == short_url, unexpired()).first()
+
+    def get_alias_target(self, db: Session, short_url: str) -> Optional[str]:
+        """
+        Retrieve the short URL an alias redirects like.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            short_url (str): The alias short URL string.
+
+        Returns:
+            Optional[str]: The target short URL if `short_url` is an alias, else None.
+        """
+        return db.scalar(select(UrlAlias.target_short_url).where(UrlAlias.short_url == short_url))
+
+    def add_aliases(self, db: Session, aliases: Dict[str, str]) -> None:
+        """
+        Add aliases, without committing.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            aliases (Dict[str, str]): Target short URL by alias short URL.
+        """
+        if aliases:
+            db.execute(
+                UrlAlias.__table__.insert(),
+                [{"short_url": alias, "target_short_url": target} for alias, target in aliases.items()],
+            )
+
+    def delete_aliases_to(self, db: Session, short_urls: List[str]) -> List[str]:
+        """
+        Delete the aliases of these short URLs, e.g. once they have expired,
+        and commit.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            short_urls (List[str]): The target short URL strings.
+
+        Returns:
+            List[str]: The short codes of the deleted aliases.
+        """
+        deleted = []
+        for start in range(0, len(short_urls), LOOKUP_CHUNK_SIZE):
+            deleted.extend(db.scalars(
+                delete(UrlAlias)
+                .where(UrlAlias.target_short_url.in_(short_urls[start:start + LOOKUP_CHUNK_SIZE]))
+                .returning(UrlAlias.short_url)
+            ).all())
+        db.commit()
+        return deleted
 
     def get_url_by_original_url(self, db: Session, original_url: str) -> UrlMapping:
         """
@@ -31,7 +304,9 @@ class CRUDUrl:
         Returns:
             UrlMapping: The UrlMapping object if found, else None.
         """
-        return db.query(UrlMapping).filter(UrlMapping.original_url == original_url).first()
+        return db.query(UrlMapping).filter(
+            UrlMapping.original_url_hash == URLUtils.url_digest(original_url)
+        ).first()
 
     def create_url_mapping(self, db: Session, url_mapping: UrlMapping) -> UrlMapping:
         """
@@ -47,4 +322,174 @@ class CRUDUrl:
         db.add(url_mapping)
         db.commit()
         db.refresh(url_mapping)
+        self.cache.set(url_mapping.short_url, mapping_cache_value(url_mapping))
         return url_mapping
+
+    def upsert_url_mapping(
+        self,
+        db: Session,
+        original_url: str,
+        short_url: str,
+        url_type: UrlType = UrlType.RANDOM,
+        expires_at: Optional[datetime] = None,
+        policy: RedirectPolicy = RedirectPolicy(),
+    ) -> Optional[Row]:
+        """
+        Atomically insert a mapping or return the existing one for the same URL.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            original_url (str): The original URL string.
+            short_url (str): The short code to use if a new row is inserted.
+            url_type (UrlType): The type of the new mapping.
+            expires_at (Optional[datetime]): UTC expiry of the new mapping.
+            policy (RedirectPolicy): Redirect policy overrides of the new mapping.
+
+        Returns:
+            Optional[Row]: The stored row with a `created` flag, or None if the
+            short code collided and the caller should retry with another one.
+        """
+        dialect_name = db.get_bind().dialect.name
+        stmt = build_upsert_statement(dialect_name, original_url, short_url, url_type, expires_at, policy)
+        row = db.execute(stmt).first()
+        if row is None and dialect_name != "postgresql":
+            row = db.execute(
+                select(*UPSERT_RETURNING, false().label("created")).where(
+                    UrlMapping.original_url_hash == URLUtils.url_digest(original_url)
+                )
+            ).first()
+        db.commit()
+        if row is not None and row.created:
+            self.cache.set(row.short_url, mapping_cache_value(row))
+        return row
+
+    def get_urls_by_hashes(self, db: Session, hashes: Iterable[bytes]) -> Dict[bytes, Row]:
+        """
+        Retrieve existing mappings for many original URL digests at once.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            hashes (Iterable[bytes]): Digests from URLUtils.url_digest.
+
+        Returns:
+            Dict[bytes, Row]: Stored rows keyed by digest; unknown digests are omitted.
+        """
+        hashes = list(hashes)
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            stmt = build_hash_lookup_statement(hashes[start:start + LOOKUP_CHUNK_SIZE])
+            for row in db.execute(stmt):
+                found[row.original_url_hash] = row
+        return found
+
+    def bulk_insert_url_mappings(
+        self,
+        db: Session,
+        mappings: List[Tuple[str, str, Optional[datetime], RedirectPolicy]],
+        url_type: UrlType = UrlType.RANDOM,
+    ) -> List[Row]:
+        """
+        Insert many mappings with a single multi-row statement, without committing.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            mappings (List[Tuple[str, str, Optional[datetime], RedirectPolicy]]):
+                (original_url, short_url, expires_at, policy) tuples.
+            url_type (UrlType): The type of the new mappings.
+
+        Returns:
+            List[Row]: The inserted rows. Pairs that conflicted on either the
+            original URL or the short code are not returned.
+        """
+        if not mappings:
+            return []
+        stmt = build_bulk_insert_statement(db.get_bind().dialect.name, mappings, url_type)
+        return db.execute(stmt).all()
+
+    def cache_url_mappings(self, rows: Iterable[Row]) -> None:
+        """
+        Write committed mappings through to the shared cache tier.
+        """
+        self.cache.set_many(cached_mappings(rows))
+
+    def delete_expired_by_hashes(self, db: Session, hashes: Iterable[bytes]) -> None:
+        """
+        Delete the expired mappings among these original URL digests, without
+        committing, so the URLs can be shortened again.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            hashes (Iterable[bytes]): Digests from URLUtils.url_digest.
+        """
+        hashes = list(hashes)
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            db.execute(build_delete_expired_by_hashes_statement(hashes[start:start + LOOKUP_CHUNK_SIZE]))
+
+    def list_url_mappings(
+        self,
+        db: Session,
+        filters: UrlListFilter,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None,
+        inclusive: bool = False,
+    ) -> List[Row]:
+        """
+        Retrieve one page of the listing, see `build_list_statement`.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            filters (UrlListFilter): The listing filters.
+            limit (int): Maximum number of rows.
+            before (Optional[Tuple[datetime, int]]): (created_at, id) the page
+                starts after; None for the first page.
+            inclusive (bool): Whether the page may start at `before` itself.
+
+        Returns:
+            List[Row]: The rows, newest first.
+        """
+        return db.execute(build_list_statement(filters, limit, before, inclusive)).all()
+
+    def stream_url_mappings(self, db: Session, filters: UrlListFilter, batch_size: int) -> Iterator[Row]:
+        """
+        Iterate over every row of the listing from a server-side cursor,
+        `batch_size` rows per fetch, so the result set is never held in memory.
+
+        Args:
+            db (Session): SQLAlchemy database session, kept open while iterating.
+            filters (UrlListFilter): The listing filters.
+            batch_size (int): Rows fetched per round trip.
+
+        Returns:
+            Iterator[Row]: The rows, newest first.
+        """
+        return iter(db.execute(build_list_statement(filters).execution_options(yield_per=batch_size)))
+
+    def delete_expired(self, db: Session, limit: int) -> List[str]:
+        """
+        Delete up to `limit` expired mappings, oldest expiry first, and commit.
+
+        On PostgreSQL rows another sweeper has locked are skipped, so workers
+        sweeping at the same time do not queue behind each other.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            limit (int): Maximum number of rows to delete.
+
+        Returns:
+            List[str]: The short codes of the deleted mappings.
+        """
+        expired_ids = (
+            select(UrlMapping.id)
+            .where(UrlMapping.expires_at <= datetime.utcnow())
+            .order_by(UrlMapping.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        short_urls = db.scalars(
+            delete(UrlMapping)
+            .where(UrlMapping.id.in_(expired_ids))
+            .returning(UrlMapping.short_url)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        return list(short_urls)
@@ -0,0 +1,173 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Row, false, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache.backends import CacheBackend, shared_cache
+from app.crud.url import (
+    LOOKUP_CHUNK_SIZE,
+    UPSERT_RETURNING,
+    build_bulk_insert_statement,
+    build_delete_expired_by_hashes_statement,
+    build_hash_lookup_statement,
+    build_upsert_statement,
+    cached_mappings,
+    mapping_cache_value,
+    unexpired,
+)
+from app.models.url import RedirectPolicy, UrlAlias, UrlMapping, UrlType
+from app.utils.url_helpers import URLUtils
+
+
+class AsyncCRUDUrl:
+    """
+    Async CRUD operations for UrlMapping model, mirroring `CRUDUrl`.
+
+    New mappings are written through to the shared cache tier.
+    """
+
+    def __init__(self, cache: CacheBackend = shared_cache):
+        self.cache = cache
+
+    async def get_url_by_short_url(self, db: AsyncSession, short_url: str) -> UrlMapping:
+        """
+        Retrieve a UrlMapping object by its short URL, unless it has expired.
+
+        Args:
+            db (AsyncSession): SQLAlchemy async database session.
+            short_url (str): The short URL string.
+
+        Returns:
+            UrlMapping: The UrlMapping object if found, else None.
+        """
+        result = await db.execute(
+            select(UrlMapping).where(UrlMapping.short_url == short_url, unexpired())
+        )
+        return result.scalars().first()
+
+    async def get_alias_target(self, db: AsyncSession, short_url: str) -> Optional[str]:
+        """
+        Retrieve the short URL an alias redirects like.
+
+        Args:
+            db (AsyncSession): SQLAlchemy async database session.
+            short_url (str): The alias short URL string.
+
+        Returns:
+            Optional[str]: The target short URL if `short_url` is an alias, else None.
+        """
+        return await db.scalar(select(UrlAlias.target_short_url).where(UrlAlias.short_url == short_url))
+
+    async def get_url_by_original_url(self, db: AsyncSession, original_url: str) -> UrlMapping:
+        """
+        Retrieve a UrlMapping object by its original URL.
+
+        Args:
+            db (AsyncSession): SQLAlchemy async database session.
+            original_url (str): The original URL string.
+
+        Returns:
+            UrlMapping: The UrlMapping object if found, else None.
+        """
+        result = await db.execute(
+            select(UrlMapping).where(
+                UrlMapping.original_url_hash == URLUtils.url_digest(original_url)
+            )
+        )
+        return result.scalars().first()
+
+    async def create_url_mapping(self, db: AsyncSession, url_mapping: UrlMapping) -> UrlMapping:
+        """
+        Create and persist a new UrlMapping object in the database.
+
+        Args:
+            db (AsyncSession): SQLAlchemy async database session.
+            url_mapping (UrlMapping): The UrlMapping object to be added.
+
+        Returns:
+            UrlMapping: The persisted UrlMapping object.
+        """
+        db.add(url_mapping)
+        await db.commit()
+        await db.refresh(url_mapping)
+        await self.cache.aset(
+            url_mapping.short_url, mapping_cache_value(url_mapping)
+        )
+        return url_mapping
+
+    async def upsert_url_mapping(
+        self,
+        db: AsyncSession,
+        original_url: str,
+        short_url: str,
+        url_type: UrlType = UrlType.RANDOM,
+        expires_at: Optional[datetime] = None,
+        policy: RedirectPolicy = RedirectPolicy(),
+    ) -> Optional[Row]:
+        """
+        Atomically insert a mapping or return the existing one for the same URL.
+
+        See `CRUDUrl.upsert_url_mapping`.
+        """
+        dialect_name = db.get_bind().dialect.name
+        stmt = build_upsert_statement(dialect_name, original_url, short_url, url_type, expires_at, policy)
+        row = (await db.execute(stmt)).first()
+        if row is None and dialect_name != "postgresql":
+            row = (
+                await db.execute(
+                    select(*UPSERT_RETURNING, false().label("created")).where(
+                        UrlMapping.original_url_hash == URLUtils.url_digest(original_url)
+                    )
+                )
+            ).first()
+        await db.commit()
+        if row is not None and row.created:
+            await self.cache.aset(row.short_url, mapping_cache_value(row))
+        return row
+
+    async def get_urls_by_hashes(self, db: AsyncSession, hashes: Iterable[bytes]) -> Dict[bytes, Row]:
+        """
+        Retrieve existing mappings for many original URL digests at once.
+
+        See `CRUDUrl.get_urls_by_hashes`.
+        """
+        hashes = list(hashes)
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            stmt = build_hash_lookup_statement(hashes[start:start + LOOKUP_CHUNK_SIZE])
+            for row in await db.execute(stmt):
+                found[row.original_url_hash] = row
+        return found
+
+    async def bulk_insert_url_mappings(
+        self,
+        db: AsyncSession,
+        mappings: List[Tuple[str, str, Optional[datetime], RedirectPolicy]],
+        url_type: UrlType = UrlType.RANDOM,
+    ) -> List[Row]:
+        """
+        Insert many mappings with a single multi-row statement, without committing.
+
+        See `CRUDUrl.bulk_insert_url_mappings`.
+        """
+        if not mappings:
+            return []
+        stmt = build_bulk_insert_statement(db.get_bind().dialect.name, mappings, url_type)
+        return (await db.execute(stmt)).all()
+
+    async def cache_url_mappings(self, rows: Iterable[Row]) -> None:
+        """
+        Write committed mappings through to the shared cache tier.
+        """
+        await self.cache.aset_many(cached_mappings(rows))
+
+    async def delete_expired_by_hashes(self, db: AsyncSession, hashes: Iterable[bytes]) -> None:
+        """
+        Delete the expired mappings among these original URL digests, without committing.
+
+        See `CRUDUrl.delete_expired_by_hashes`.
+        """
+        hashes = list(hashes)
+        for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+            stmt = build_delete_expired_by_hashes_statement(hashes[start:start + LOOKUP_CHUNK_SIZE])
+            await db.execute(stmt)
@@ -0,0 +1,147 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Connection, Row, bindparam, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.models.url import UrlAlias, UrlMapping
+from app.utils.url_helpers import URLUtils
+
+url_mappings = UrlMapping.__table__
+url_aliases = UrlAlias.__table__
+
+# Built once at import, so each lookup only binds parameters: SQLAlchemy
+# compiles them once per dialect into its statement cache, and asyncpg
+# prepares them once per connection.
+BY_SHORT_URL = (
+    select(
+        url_mappings.c.original_url,
+        url_mappings.c.expires_at,
+        url_mappings.c.redirect_status,
+        url_mappings.c.cache_max_age,
+        url_mappings.c.cache_stale_while_revalidate,
+    )
+    .where(
+        url_mappings.c.short_url == bindparam("short_url"),
+        or_(url_mappings.c.expires_at.is_(None), url_mappings.c.expires_at > bindparam("now")),
+    )
+    .limit(1)
+)
+# Expanding IN (...), so one cached compilation serves every list length.
+# Aliases among the codes come back as their target's row under their own code.
+_UNEXPIRED = or_(url_mappings.c.expires_at.is_(None), url_mappings.c.expires_at > bindparam("now"))
+_MAPPING_COLUMNS = (
+    url_mappings.c.original_url,
+    url_mappings.c.expires_at,
+    url_mappings.c.redirect_status,
+    url_mappings.c.cache_max_age,
+    url_mappings.c.cache_stale_while_revalidate,
+)
+BY_SHORT_URLS = union_all(
+    select(url_mappings.c.short_url, *_MAPPING_COLUMNS).where(
+        url_mappings.c.short_url.in_(bindparam("short_urls", expanding=True)), _UNEXPIRED
+    ),
+    select(url_aliases.c.short_url, *_MAPPING_COLUMNS)
+    .join(url_mappings, url_mappings.c.short_url == url_aliases.c.target_short_url)
+    .where(url_aliases.c.short_url.in_(bindparam("short_urls", expanding=True)), _UNEXPIRED),
+)
+ALIAS_TARGET = select(url_aliases.c.target_short_url).where(
+    url_aliases.c.short_url == bindparam("short_url")
+)
+BY_ORIGINAL_URL_HASH = (
+    select(
+        url_mappings.c.short_url,
+        url_mappings.c.original_url,
+        url_mappings.c.created_at,
+        url_mappings.c.expires_at,
+    )
+    .where(url_mappings.c.original_url_hash == bindparam("original_url_hash"))
+    .limit(1)
+)
+
+
+class CoreUrlQueries:
+    """
+    Read-only url_mappings lookups for the hot paths, run on a plain
+    `Connection` with no Session or identity map. Only the columns the
+    caller uses are selected, and rows come back as named tuples rather
+    than `UrlMapping` instances.
+    """
+
+    def get_url_by_short_url(self, conn: Connection, short_url: str) -> Optional[Row]:
+        """
+        Look up an unexpired mapping by its short URL.
+
+        Args:
+            conn (Connection): Connection to the database holding the code.
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[Row]: (original_url, expires_at, redirect_status,
+            cache_max_age, cache_stale_while_revalidate) if found, else None.
+        """
+        return conn.execute(BY_SHORT_URL, {"short_url": short_url, "now": datetime.utcnow()}).first()
+
+    def get_urls_by_short_urls(self, conn: Connection, short_urls: List[str]) -> List[Row]:
+        """
+        Look up unexpired mappings for several short URLs in one query,
+        resolving aliases like `UrlServices.lookup_short_url`.
+
+        Args:
+            conn (Connection): Connection to the database holding the codes.
+            short_urls (List[str]): The short URL strings.
+
+        Returns:
+            List[Row]: (short_url, original_url, expires_at, redirect_status,
+            cache_max_age, cache_stale_while_revalidate) for the codes found.
+        """
+        return conn.execute(BY_SHORT_URLS, {"short_urls": short_urls, "now": datetime.utcnow()}).all()
+
+    def get_alias_target(self, conn: Connection, short_url: str) -> Optional[str]:
+        """
+        Look up the short URL an alias redirects like.
+
+        Args:
+            conn (Connection): Connection to the database holding the code.
+            short_url (str): The alias short URL string.
+
+        Returns:
+            Optional[str]: The target short URL if `short_url` is an alias, else None.
+        """
+        return conn.execute(ALIAS_TARGET, {"short_url": short_url}).scalar()
+
+    def get_url_by_original_url(self, conn: Connection, original_url: str) -> Optional[Row]:
+        """
+        Look up a mapping by its original URL, expired or not.
+
+        Args:
+            conn (Connection): Connection to the database holding the URL.
+            original_url (str): The original URL string.
+
+        Returns:
+            Optional[Row]: (short_url, original_url, created_at, expires_at)
+            if found, else None.
+        """
+        return conn.execute(
+            BY_ORIGINAL_URL_HASH, {"original_url_hash": URLUtils.url_digest(original_url)}
+        ).first()
+
+
+class AsyncCoreUrlQueries:
+    """
+    Async counterpart of `CoreUrlQueries`, on an `AsyncConnection`.
+    """
+
+    async def get_url_by_short_url(self, conn: AsyncConnection, short_url: str) -> Optional[Row]:
+        result = await conn.execute(BY_SHORT_URL, {"short_url": short_url, "now": datetime.utcnow()})
+        return result.first()
+
+    async def get_alias_target(self, conn: AsyncConnection, short_url: str) -> Optional[str]:
+        result = await conn.execute(ALIAS_TARGET, {"short_url": short_url})
+        return result.scalar()
+
+    async def get_url_by_original_url(self, conn: AsyncConnection, original_url: str) -> Optional[Row]:
+        result = await conn.execute(
+            BY_ORIGINAL_URL_HASH, {"original_url_hash": URLUtils.url_digest(original_url)}
+        )
+        return result.first()
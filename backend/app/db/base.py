@@ -1,4 +1,6 @@
 from app.db.base_class import Base
-from app.models.url import UrlMapping
+from app.models.url import UrlAlias, UrlMapping
+from app.models.click import UrlClick
+from app.models.shard import ShardBucket
 
-__all__ = ["Base", "UrlMapping"]
\ No newline at end of file
+__all__ = ["Base", "UrlMapping", "UrlAlias", "UrlClick", "ShardBucket"]
@@ -1,6 +1,8 @@
 from typing import Any
 
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
+from sqlalchemy.sql import functions
 
 
 @as_declarative()
@@ -11,3 +13,11 @@ class Base:
     @declared_attr
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
+
+
+@compiles(functions.now, "sqlite")
+def _sqlite_now(element, compiler, **kw) -> str:
+    # SQLite keeps DateTime columns as text, and CURRENT_TIMESTAMP has no
+    # fraction, while SQLAlchemy binds datetimes with six digits. Write both in
+    # the same format so stored values compare equal to bound ones.
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
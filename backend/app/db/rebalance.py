@@ -0,0 +1,279 @@
+import argparse
+import logging
+import time
+from typing import Dict, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.crud.url import redirect_policy
+from app.db.session import session_scope
+from app.db.shards import SHARD_BUCKETS, Shard, ShardRouter, shard_router
+from app.models.shard import ShardBucket
+from app.models.url import UrlAlias, UrlMapping
+from app.utils.url_helpers import BASE62_ALPHABET
+
+logger = logging.getLogger(__name__)
+
+# Rows copied or deleted per statement while moving a bucket.
+MOVE_PAGE_SIZE = 5000
+
+_COPIED_COLUMNS = (
+    UrlMapping.original_url,
+    UrlMapping.original_url_hash,
+    UrlMapping.original_url_host,
+    UrlMapping.short_url,
+    UrlMapping.url_type,
+    UrlMapping.expires_at,
+    UrlMapping.redirect_status,
+    UrlMapping.cache_max_age,
+    UrlMapping.cache_stale_while_revalidate,
+    UrlMapping.created_at,
+    UrlMapping.updated_at,
+)
+
+
+class BucketMover:
+    """
+    Moves short code buckets between shards while the app keeps serving.
+
+    A move first points the bucket at the target shard with the source as
+    `previous_shard`, and waits `settle_seconds` for every worker to reload
+    the map: from then on new rows go to the target, and reads and
+    deduplication that miss there fall back to the source. Rows are then
+    copied in pages, the fallback is dropped, and after another wait the
+    source rows are deleted. A row whose URL the target already has is kept
+    as an alias of that row. A move that was interrupted is resumed by
+    running it again.
+    """
+
+    def __init__(self, router: ShardRouter, settle_seconds: float, page_size: int = MOVE_PAGE_SIZE):
+        self.router = router
+        self.settle_seconds = settle_seconds
+        self.page_size = page_size
+
+    def _set_route(self, bucket: int, shard: int, previous_shard) -> None:
+        with session_scope() as db:
+            db.execute(
+                update(ShardBucket)
+                .where(ShardBucket.bucket == bucket)
+                .values(shard=shard, previous_shard=previous_shard)
+            )
+            db.commit()
+        self.router.refresh()
+
+    def _in_bucket(self, bucket: int):
+        return func.substr(UrlMapping.short_url, 1, 1) == BASE62_ALPHABET[bucket]
+
+    def _copy(self, source: Shard, target: Shard, bucket: int) -> int:
+        copied = skipped = aliased = last_id = 0
+        while True:
+            with source.session_scope() as source_db:
+                rows = source_db.execute(
+                    select(UrlMapping.id, *_COPIED_COLUMNS)
+                    .where(self._in_bucket(bucket), UrlMapping.id > last_id)
+                    .order_by(UrlMapping.id)
+                    .limit(self.page_size)
+                ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = [{column.key: getattr(row, column.key) for column in _COPIED_COLUMNS} for row in rows]
+            with target.session_scope() as target_db:
+                insert = postgresql.insert if target.engine.dialect.name == "postgresql" else sqlite.insert
+                inserted = set(target_db.scalars(
+                    insert(UrlMapping).values(values).on_conflict_do_nothing()
+                    .returning(UrlMapping.short_url)
+                ).all())
+                refused = [row for row in rows if row.short_url not in inserted]
+                aliases = self._alias_duplicates(target_db, bucket, refused) if refused else {}
+                target_db.commit()
+            copied += len(inserted)
+            aliased += len(aliases)
+            skipped += len(refused) - len(aliases)
+        if skipped:
+            logger.info("Bucket %d: %d rows were already on %s", bucket, skipped, target.label)
+        if aliased:
+            logger.info("Bucket %d: %d duplicate rows kept as aliases on %s", bucket, aliased, target.label)
+        return copied
+
+    def _alias_duplicates(self, target_db, bucket: int, rows: List) -> Dict[str, str]:
+        """
+        Keep rows the target refused because it already has a row for their
+        original URL, as aliases of that row. Such duplicates were created
+        before creates looked a URL up on every shard. Rows refused because
+        their code is already on the target, from an interrupted move, are
+        left out. Returns the aliases added, without committing.
+        """
+        codes = [row.short_url for row in rows]
+        on_target = set(target_db.scalars(select(UrlMapping.short_url).where(UrlMapping.short_url.in_(codes))))
+        duplicates = [row for row in rows if row.short_url not in on_target]
+        if not duplicates:
+            return {}
+        survivors = {
+            row.original_url_hash: row
+            for row in target_db.execute(
+                select(*_COPIED_COLUMNS)
+                .where(UrlMapping.original_url_hash.in_([row.original_url_hash for row in duplicates]))
+            )
+        }
+        aliases = {}
+        for row in duplicates:
+            survivor = survivors[row.original_url_hash]
+            if row.expires_at != survivor.expires_at or redirect_policy(row) != redirect_policy(survivor):
+                # An alias redirects like its target, which would change this link.
+                raise RuntimeError(
+                    f"Bucket {bucket}: {row.short_url} has the URL of {survivor.short_url} on the target "
+                    "shard with another expiry or redirect policy; resolve it and run the move again"
+                )
+            aliases[row.short_url] = survivor.short_url
+        insert = postgresql.insert if target_db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        target_db.execute(
+            insert(UrlAlias).values([
+                {"short_url": alias, "target_short_url": survivor} for alias, survivor in aliases.items()
+            ]).on_conflict_do_nothing()
+        )
+        return aliases
+
+    def _copy_aliases(self, source: Shard, target: Shard, bucket: int) -> int:
+        """
+        Copy the bucket's aliases, whose targets are in the same bucket.
+        """
+        copied, last_code = 0, ""
+        while True:
+            with source.session_scope() as source_db:
+                rows = source_db.execute(
+                    select(UrlAlias.short_url, UrlAlias.target_short_url)
+                    .where(
+                        func.substr(UrlAlias.short_url, 1, 1) == BASE62_ALPHABET[bucket],
+                        UrlAlias.short_url > last_code,
+                    )
+                    .order_by(UrlAlias.short_url)
+                    .limit(self.page_size)
+                ).all()
+            if not rows:
+                if copied:
+                    self._flatten_aliases(target)
+                return copied
+            last_code = rows[-1].short_url
+            with target.session_scope() as target_db:
+                insert = postgresql.insert if target.engine.dialect.name == "postgresql" else sqlite.insert
+                copied += len(target_db.execute(
+                    insert(UrlAlias).values([row._asdict() for row in rows]).on_conflict_do_nothing()
+                    .returning(UrlAlias.short_url)
+                ).all())
+                target_db.commit()
+
+    def _flatten_aliases(self, target: Shard) -> None:
+        """
+        Point aliases whose target was itself kept as an alias, by
+        `_alias_duplicates`, at that alias's target; lookups follow one hop.
+        """
+        hop = UrlAlias.__table__.alias("hop")
+        with target.session_scope() as target_db:
+            target_db.execute(
+                update(UrlAlias)
+                .where(UrlAlias.target_short_url.in_(select(hop.c.short_url)))
+                .values(target_short_url=(
+                    select(hop.c.target_short_url)
+                    .where(hop.c.short_url == UrlAlias.target_short_url)
+                    .scalar_subquery()
+                ))
+            )
+            target_db.commit()
+
+    def _delete_aliases(self, source: Shard, bucket: int) -> None:
+        with source.session_scope() as source_db:
+            source_db.execute(
+                delete(UrlAlias).where(func.substr(UrlAlias.short_url, 1, 1) == BASE62_ALPHABET[bucket])
+            )
+            source_db.commit()
+
+    def _delete(self, source: Shard, bucket: int) -> int:
+        deleted = 0
+        while True:
+            with source.session_scope() as source_db:
+                ids = source_db.scalars(
+                    select(UrlMapping.id).where(self._in_bucket(bucket)).limit(self.page_size)
+                ).all()
+                if not ids:
+                    return deleted
+                source_db.execute(delete(UrlMapping).where(UrlMapping.id.in_(ids)))
+                source_db.commit()
+            deleted += len(ids)
+
+    def move(self, bucket: int, target: int) -> None:
+        self.router.refresh()
+        current, previous = self.router.buckets[bucket]
+        if previous is not None and current != target:
+            raise RuntimeError(
+                f"Bucket {bucket} is being moved to shard {current}; finish that move first"
+            )
+        source = previous if previous is not None else current
+        if source == target:
+            logger.info("Bucket %d is already on shard %d", bucket, target)
+            return
+        if previous is None:
+            self._set_route(bucket, shard=target, previous_shard=source)
+            time.sleep(self.settle_seconds)
+        copied = self._copy(self.router.shards[source], self.router.shards[target], bucket)
+        aliases = self._copy_aliases(self.router.shards[source], self.router.shards[target], bucket)
+        self._set_route(bucket, shard=target, previous_shard=None)
+        time.sleep(self.settle_seconds)
+        self._delete_aliases(self.router.shards[source], bucket)
+        deleted = self._delete(self.router.shards[source], bucket)
+        logger.info(
+            "Moved bucket %d from shard %d to %d: %d rows and %d aliases copied, %d rows deleted",
+            bucket, source, target, copied, aliases, deleted,
+        )
+
+    def split(self, shard: int, target: int) -> List[int]:
+        """
+        Move the upper half of `shard`'s buckets to `target`.
+        """
+        self.router.refresh()
+        buckets = [bucket for bucket, (current, _) in enumerate(self.router.buckets) if current == shard]
+        moving = buckets[len(buckets) // 2:]
+        for bucket in moving:
+            self.move(bucket, target)
+        return moving
+
+
+def show(router: ShardRouter) -> None:
+    router.refresh()
+    for index, shard in enumerate(router.shards):
+        buckets = [bucket for bucket, (current, _) in enumerate(router.buckets) if current == index]
+        print(f"{shard.label}: {len(buckets)} buckets {''.join(BASE62_ALPHABET[b] for b in buckets)}")
+    for bucket, (current, previous) in enumerate(router.buckets):
+        if previous is not None:
+            print(f"bucket {bucket} ({BASE62_ALPHABET[bucket]}): moving from shard {previous} to {current}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(
+        description="Inspect and rebalance the url_mappings shards listed in SHARD_DATABASE_URIS."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="Print the bucket map.")
+    move = commands.add_parser("move", help="Move one bucket to another shard.")
+    move.add_argument("bucket", type=int, choices=range(SHARD_BUCKETS), metavar="BUCKET")
+    move.add_argument("target", type=int)
+    split = commands.add_parser("split", help="Move half of a shard's buckets to another shard.")
+    split.add_argument("shard", type=int)
+    split.add_argument("target", type=int)
+    args = parser.parse_args()
+
+    if not shard_router.enabled:
+        parser.error("SHARD_DATABASE_URIS is not set")
+    for shard_index in (getattr(args, "target", 0), getattr(args, "shard", 0)):
+        if not 0 <= shard_index < len(shard_router.shards):
+            parser.error(f"shard {shard_index} is not configured")
+    mover = BucketMover(shard_router, settle_seconds=2 * settings.SHARD_MAP_REFRESH_SECONDS + 1)
+    if args.command == "show":
+        show(shard_router)
+    elif args.command == "move":
+        mover.move(args.bucket, args.target)
+    else:
+        mover.split(args.shard, args.target)
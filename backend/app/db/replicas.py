@@ -0,0 +1,234 @@
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, List, Optional
+
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import (
+    AsyncSessionLocal,
+    SessionLocal,
+    async_engine,
+    build_async_engine,
+    build_engine,
+    engine,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds of replay lag; zero when the replica has replayed everything it
+# has received, so an idle primary does not look like lag.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Upper bound on codes remembered for read-your-writes pinning.
+RECENT_WRITES_MAX_KEYS = 100000
+
+
+class Replica:
+    def __init__(self, label: str, uri: str):
+        self.label = label
+        self.engine = build_engine(uri, label)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = None
+        self.async_session_factory = None
+        if settings.DB_ASYNC_ENABLED:
+            self.async_engine = build_async_engine(settings.async_uri_for(uri), f"{label}_async")
+            self.async_session_factory = async_sessionmaker(
+                bind=self.async_engine,
+                autoflush=False,
+                expire_on_commit=False,
+            )
+        # Unhealthy until the first health check has measured the lag.
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+
+class ReplicaSet:
+    """
+    Routes read-only lookups to healthy read replicas, round-robin, and
+    everything else to the primary.
+
+    A background thread measures each replica's replay lag; a replica that
+    cannot be reached or lags more than `max_lag` seconds is skipped until
+    it recovers, and with no healthy replica reads go to the primary. Codes
+    created by this worker are pinned to the primary for
+    `read_your_writes` seconds, so a replica that has not caught up yet
+    cannot answer "not found" for them.
+    """
+
+    def __init__(self, uris: List[str], max_lag: float, check_interval: float, read_your_writes: float):
+        self.replicas = [Replica(f"replica{index}", uri) for index, uri in enumerate(uris)]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_your_writes = read_your_writes
+        self._counter = itertools.count()
+        self._recent_writes: "OrderedDict[str, float]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def mark_written(self, short_url: str) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.read_your_writes
+        with self._recent_lock:
+            self._recent_writes[short_url] = expires_at
+            self._recent_writes.move_to_end(short_url)
+            while len(self._recent_writes) > RECENT_WRITES_MAX_KEYS:
+                self._recent_writes.popitem(last=False)
+
+    def pinned(self, short_url: Optional[str]) -> bool:
+        if short_url is None:
+            return False
+        now = time.monotonic()
+        with self._recent_lock:
+            # Entries are in write order, so expired ones sit at the front.
+            while self._recent_writes and next(iter(self._recent_writes.values())) <= now:
+                self._recent_writes.popitem(last=False)
+            return short_url in self._recent_writes
+
+    def choose(self, short_url: Optional[str] = None) -> Optional[Replica]:
+        """
+        Pick the replica for the next read, or None to use the primary.
+        """
+        if not self.enabled or self.pinned(short_url):
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def _measure_lag(self, engine: Engine) -> float:
+        with engine.connect() as conn:
+            if engine.dialect.name != "postgresql":
+                conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(conn.execute(REPLICA_LAG_QUERY).scalar() or 0.0)
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                replica.lag = self._measure_lag(replica.engine)
+            except Exception as exc:
+                if replica.healthy:
+                    logger.warning("Read replica %s is unavailable: %s", replica.label, exc)
+                replica.lag, replica.healthy = None, False
+                continue
+            healthy = replica.lag <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Read replica %s %s (lag %.1fs)",
+                    replica.label, "back in rotation" if healthy else "lagging, reads go elsewhere", replica.lag,
+                )
+            replica.healthy = healthy
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+
+replica_set = ReplicaSet(
+    uris=settings.replica_database_uris,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_HEALTH_CHECK_SECONDS,
+    read_your_writes=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+
+def _replica_metrics():
+    lag, healthy = [], []
+    for replica in replica_set.replicas:
+        labels = {"engine": replica.label}
+        if replica.lag is not None:
+            lag.append((labels, replica.lag))
+        healthy.append((labels, int(replica.healthy)))
+    if replica_set.enabled:
+        yield "db_replica_lag_seconds", "gauge", "Replay lag at the last health check.", lag
+        yield "db_replica_healthy", "gauge", "1 while the replica receives reads.", healthy
+
+
+metrics.register_collector(_replica_metrics)
+
+
+@contextmanager
+def read_session_scope(short_url: Optional[str] = None) -> Iterator[Session]:
+    """
+    Like `session_scope`, but on a read replica when one is healthy and
+    `short_url` is not pinned to the primary. `db.info["replica"]` names the
+    replica, and is absent on the primary.
+    """
+    replica = replica_set.choose(short_url)
+    db = replica.session_factory() if replica else SessionLocal()
+    if replica:
+        db.info["replica"] = replica.label
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_read_session_scope(short_url: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Async counterpart of `read_session_scope`.
+    """
+    replica = replica_set.choose(short_url)
+    factory = replica.async_session_factory if replica else AsyncSessionLocal
+    async with factory() as db:
+        if replica:
+            db.info["replica"] = replica.label
+        yield db
+
+
+@contextmanager
+def read_connection_scope(short_url: Optional[str] = None) -> Iterator[Connection]:
+    """
+    Connection counterpart of `read_session_scope`, for Core lookups;
+    `conn.info["replica"]` names the replica in the same way.
+    """
+    replica = replica_set.choose(short_url)
+    with (replica.engine if replica else engine).connect() as conn:
+        if replica:
+            conn.info["replica"] = replica.label
+        yield conn
+
+
+@asynccontextmanager
+async def async_read_connection_scope(short_url: Optional[str] = None) -> AsyncIterator[AsyncConnection]:
+    """
+    Async counterpart of `read_connection_scope`.
+    """
+    replica = replica_set.choose(short_url)
+    async with (replica.async_engine if replica else async_engine).connect() as conn:
+        if replica:
+            conn.info["replica"] = replica.label
+        yield conn
@@ -1,22 +1,194 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Type
+
+from sqlalchemy import Connection, Engine, create_engine, event
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
+from app.core.metrics import db_pool_checkout_wait_seconds, db_query_duration_seconds, metrics
 
 database_url = str(settings.SQLALCHEMY_DATABASE_URI) if settings.SQLALCHEMY_DATABASE_URI else None
 
-engine = create_engine(
-    database_url,
-    pool_pre_ping=True,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
-)
+# Every engine built by this module, by label, for the pool metrics.
+engines: Dict[str, Engine] = {}
+
+
+def pool_class(base: Type[QueuePool], label: str) -> Type[QueuePool]:
+    """
+    Return `base`, or with metrics enabled a subclass that records how long
+    each checkout waited for a connection under the given engine label.
+    """
+    if not settings.METRICS_ENABLED:
+        return base
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started, label)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def instrument_engine(engine: Engine, label: str) -> None:
+    """
+    Time every statement on `engine` by statement kind (SELECT, INSERT, ...).
+    """
+    if not settings.METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        db_query_duration_seconds.observe(
+            time.perf_counter() - context._query_started, label, kind
+        )
+
+
+def _connect_args(url: str) -> Dict[str, Any]:
+    # SQLite (used by the benchmark suite) hands connections across the
+    # threadpool that serves sync endpoints, and waits on writer locks.
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False, "timeout": 30}
+    return {}
+
+
+def build_engine(url: str, label: str) -> Engine:
+    """
+    Create a pooled, instrumented engine for `url` and register it under `label`.
+    """
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        poolclass=pool_class(QueuePool, label),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_args=_connect_args(url),
+    )
+    instrument_engine(engine, label)
+    engines[label] = engine
+    return engine
+
+
+def build_async_engine(url: str, label: str) -> AsyncEngine:
+    """
+    Async counterpart of `build_engine`.
+    """
+    engine = create_async_engine(
+        url,
+        pool_pre_ping=True,
+        poolclass=pool_class(AsyncAdaptedQueuePool, label),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    instrument_engine(engine.sync_engine, label)
+    engines[label] = engine.sync_engine
+    return engine
+
+
+engine = build_engine(database_url, "primary")
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
+
+# The async engine is only built when selected, so the asyncpg driver is not
+# needed by deployments that stay on the synchronous path.
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC_ENABLED:
+    async_engine = build_async_engine(settings.async_database_uri, "primary_async")
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+def pooled_engines() -> Dict[str, Engine]:
+    """
+    Engines whose pools are reported by the metrics endpoint, by label.
+    """
+    return dict(engines)
+
+
+def _pool_metrics():
+    size, checked_out, overflow, saturation = [], [], [], []
+    for label, pooled in pooled_engines().items():
+        pool = pooled.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        labels = {"engine": label}
+        capacity = pool.size() + settings.DB_MAX_OVERFLOW
+        size.append((labels, pool.size()))
+        checked_out.append((labels, pool.checkedout()))
+        overflow.append((labels, max(pool.overflow(), 0)))
+        saturation.append((labels, pool.checkedout() / capacity if capacity else 0.0))
+    yield "db_pool_size", "gauge", "Configured pool size.", size
+    yield "db_pool_checked_out", "gauge", "Connections currently checked out.", checked_out
+    yield "db_pool_overflow", "gauge", "Overflow connections currently open.", overflow
+    yield "db_pool_saturation", "gauge", "Checked-out connections over pool_size + max_overflow.", saturation
+
+
+metrics.register_collector(_pool_metrics)
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    Open a session for code that only needs one some of the time,
+    e.g. the redirect path on a cache miss.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Async counterpart of `session_scope`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def connection_scope() -> Iterator[Connection]:
+    """
+    Open a bare connection on the primary for Core lookups that need no
+    Session or identity map.
+    """
+    with engine.connect() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def async_connection_scope() -> AsyncIterator[AsyncConnection]:
+    """
+    Async counterpart of `connection_scope`.
+    """
+    async with async_engine.connect() as conn:
+        yield conn
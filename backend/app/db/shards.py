@@ -0,0 +1,250 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Connection, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.session import build_async_engine, build_engine, session_scope
+from app.models.shard import ShardBucket
+from app.utils.url_helpers import BASE62_ALPHABET
+
+logger = logging.getLogger(__name__)
+
+# One bucket per possible first character of a short code.
+SHARD_BUCKETS = len(BASE62_ALPHABET)
+_BUCKET_OF_CHAR = {char: index for index, char in enumerate(BASE62_ALPHABET)}
+
+
+def bucket_for_short_url(short_url: str) -> Optional[int]:
+    """
+    Bucket of a short code: its first character. None for codes that
+    cannot exist.
+    """
+    return _BUCKET_OF_CHAR.get(short_url[:1])
+
+
+def bucket_for_hash(original_url_hash: bytes) -> int:
+    """
+    Bucket a new mapping for this original URL digest is created in.
+    """
+    return int.from_bytes(original_url_hash[:8], "big") % SHARD_BUCKETS
+
+
+class Shard:
+    def __init__(self, index: int, uri: str):
+        self.index = index
+        self.label = f"shard{index}"
+        self.engine = build_engine(uri, self.label)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = None
+        self.async_session_factory = None
+        if settings.DB_ASYNC_ENABLED:
+            self.async_engine = build_async_engine(settings.async_uri_for(uri), f"{self.label}_async")
+            self.async_session_factory = async_sessionmaker(
+                bind=self.async_engine,
+                autoflush=False,
+                expire_on_commit=False,
+            )
+
+    @contextmanager
+    def session_scope(self) -> Iterator[Session]:
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @asynccontextmanager
+    async def async_session_scope(self) -> AsyncIterator[AsyncSession]:
+        async with self.async_session_factory() as db:
+            yield db
+
+    @contextmanager
+    def connection_scope(self) -> Iterator[Connection]:
+        with self.engine.connect() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def async_connection_scope(self) -> AsyncIterator[AsyncConnection]:
+        async with self.async_engine.connect() as conn:
+            yield conn
+
+
+class ShardRouter:
+    """
+    Routes url_mappings reads and writes to one shard database each.
+
+    Rows are placed by the first character of their short code, one of
+    `SHARD_BUCKETS` buckets, and the `shard_buckets` table on the primary
+    maps buckets to shards. A new mapping's code starts with the bucket of
+    its original URL digest, so a lookup by code goes to one shard and a
+    new mapping is deduplicated on the shard it is written to. Older rows,
+    and imported ones that kept their code, can be on another shard, so
+    creates look a URL up on the other shards too (`other_shards`). While a
+    bucket is being moved (`app.db.rebalance`) it also names the previous
+    shard, and reads that miss on the new shard fall back to it.
+
+    Until the map is loaded every bucket is on the first shard, which is
+    also the map written on first start, so an existing database can
+    become shard 0 and be split later.
+    """
+
+    def __init__(self, uris: List[str], refresh_interval: float):
+        self.shards = [Shard(index, uri) for index, uri in enumerate(uris)]
+        self.refresh_interval = refresh_interval
+        self.buckets: List[Tuple[int, Optional[int]]] = [(0, None)] * SHARD_BUCKETS
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.shards)
+
+    def refresh(self) -> None:
+        """
+        Reload the bucket map from the primary, writing the default map if
+        there is none yet.
+        """
+        with session_scope() as db:
+            rows = db.execute(select(ShardBucket)).scalars().all()
+            if not rows:
+                db.add_all(ShardBucket(bucket=bucket, shard=0) for bucket in range(SHARD_BUCKETS))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+                rows = db.execute(select(ShardBucket)).scalars().all()
+            buckets = list(self.buckets)
+            for row in rows:
+                if row.shard >= len(self.shards) or (row.previous_shard or 0) >= len(self.shards):
+                    logger.error(
+                        "Bucket %d is mapped to a shard that is not configured; keeping its old route",
+                        row.bucket,
+                    )
+                    continue
+                buckets[row.bucket] = (row.shard, row.previous_shard)
+        self.buckets = buckets
+
+    def shard_for_bucket(self, bucket: int) -> Shard:
+        return self.shards[self.buckets[bucket][0]]
+
+    def shard_for_hash(self, original_url_hash: bytes) -> Optional[Shard]:
+        """
+        Shard new mappings for this digest are written to, or None when
+        sharding is off.
+        """
+        if not self.enabled:
+            return None
+        return self.shard_for_bucket(bucket_for_hash(original_url_hash))
+
+    def shards_for_short_url(self, short_url: str) -> List[Shard]:
+        """
+        Shards to read a code from, in order: its shard, then the previous
+        one while its bucket is being moved.
+        """
+        bucket = bucket_for_short_url(short_url)
+        if bucket is None:
+            return []
+        shard, previous = self.buckets[bucket]
+        if previous is None:
+            return [self.shards[shard]]
+        return [self.shards[shard], self.shards[previous]]
+
+    def other_shards(self, hashes: Iterable[bytes]) -> Dict[Shard, List[bytes]]:
+        """
+        Digests grouped by every shard other than the one new mappings for
+        them are written to. Rows are stored by their code's bucket, so rows
+        whose code does not start with their digest's bucket, created before
+        sharding or imported with their code kept, are on another shard, as
+        are rows not copied yet from a bucket being moved.
+        """
+        grouped = defaultdict(list)
+        if len(self.shards) > 1:
+            for original_url_hash in hashes:
+                write_shard = self.shard_for_hash(original_url_hash)
+                for shard in self.shards:
+                    if shard is not write_shard:
+                        grouped[shard].append(original_url_hash)
+        return grouped
+
+    def group_by_shard(self, urls: Dict[bytes, str]) -> Dict[Optional[Shard], Dict[bytes, str]]:
+        """
+        Split digest -> URL pairs by the shard they are written to; a single
+        group keyed by None when sharding is off.
+        """
+        if not self.enabled:
+            return {None: urls}
+        grouped = defaultdict(dict)
+        for original_url_hash, url in urls.items():
+            grouped[self.shard_for_hash(original_url_hash)][original_url_hash] = url
+        return grouped
+
+    def prefix(self, original_url_hash: bytes, short_url: str) -> str:
+        """
+        Put an allocated code in the bucket of its original URL.
+        """
+        if not self.enabled:
+            return short_url
+        return BASE62_ALPHABET[bucket_for_hash(original_url_hash)] + short_url
+
+    @contextmanager
+    def write_session(self, db: Session, shard: Optional[Shard]) -> Iterator[Session]:
+        """
+        Session on `shard`, or the caller's own `db` when sharding is off.
+        """
+        if shard is None:
+            yield db
+            return
+        with shard.session_scope() as shard_db:
+            yield shard_db
+
+    @asynccontextmanager
+    async def async_write_session(self, db: AsyncSession, shard: Optional[Shard]) -> AsyncIterator[AsyncSession]:
+        if shard is None:
+            yield db
+            return
+        async with shard.async_session_scope() as shard_db:
+            yield shard_db
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shard-map", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("Shard map refresh failed: %s", exc)
+
+
+shard_router = ShardRouter(
+    uris=settings.shard_database_uris,
+    refresh_interval=settings.SHARD_MAP_REFRESH_SECONDS,
+)
+
+
+def url_mapping_sources() -> Dict[str, Callable[[], ContextManager[Session]]]:
+    """
+    Databases holding url_mappings rows, by label: each shard, or the primary.
+    """
+    if shard_router.enabled:
+        return {shard.label: shard.session_scope for shard in shard_router.shards}
+    return {"primary": session_scope}
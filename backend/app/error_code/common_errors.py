@@ -5,6 +5,12 @@ class CommonErrorCode:
     INVALID_URL = 1000
     INTERNAL_SERVER_ERROR = 1001
     SHORT_URL_NOT_FOUND = 1002
+    BATCH_TOO_LARGE = 1003
+    SERVICE_OVERLOADED = 1004
+    RATE_LIMITED = 1005
+    INVALID_CURSOR = 1006
+    ADMIN_API_DISABLED = 1007
+    ADMIN_TOKEN_INVALID = 1008
 class CommonErrorCatalog:
     error_mapping = {
         CommonErrorCode.INVALID_URL: {
@@ -21,6 +27,36 @@ class CommonErrorCatalog:
             "msg": "Short URL not found",
             "type": "short.url.not.found",
             "error_code": CommonErrorCode.SHORT_URL_NOT_FOUND
+        },
+        CommonErrorCode.BATCH_TOO_LARGE: {
+            "msg": "Batch too large",
+            "type": "batch.too.large",
+            "error_code": CommonErrorCode.BATCH_TOO_LARGE
+        },
+        CommonErrorCode.SERVICE_OVERLOADED: {
+            "msg": "Service overloaded, retry later",
+            "type": "service.overloaded",
+            "error_code": CommonErrorCode.SERVICE_OVERLOADED
+        },
+        CommonErrorCode.RATE_LIMITED: {
+            "msg": "Too many requests",
+            "type": "rate.limited",
+            "error_code": CommonErrorCode.RATE_LIMITED
+        },
+        CommonErrorCode.INVALID_CURSOR: {
+            "msg": "Invalid cursor",
+            "type": "invalid.cursor",
+            "error_code": CommonErrorCode.INVALID_CURSOR
+        },
+        CommonErrorCode.ADMIN_API_DISABLED: {
+            "msg": "Not Found",
+            "type": "admin.api.disabled",
+            "error_code": CommonErrorCode.ADMIN_API_DISABLED
+        },
+        CommonErrorCode.ADMIN_TOKEN_INVALID: {
+            "msg": "Invalid admin token",
+            "type": "admin.token.invalid",
+            "error_code": CommonErrorCode.ADMIN_TOKEN_INVALID
         }
     }
 
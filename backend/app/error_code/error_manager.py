@@ -12,12 +12,11 @@ class ErrorManager:
         error_response = HTTPException(status_code=None, detail=[])
         error_response.status_code = status_code
 
-        error_catalog = {
-            **CommonErrorCatalog.error_mapping,
-        }
-        error_response.detail.append(error_catalog[error_code])
-        if error_message and error_response.detail:
-            error_response.detail[0]["msg"] = error_message
+        # A copy, so a custom message does not leak into the shared catalog.
+        error = dict(CommonErrorCatalog.error_mapping[error_code])
+        if error_message:
+            error["msg"] = error_message
+        error_response.detail.append(error)
         return error_response
 
 
@@ -1,13 +1,57 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from app.core.config import settings
 from app.api.api_v1.api import url_shortener_router, redirect_router
+from app.api.admission import AdmissionControlMiddleware
+from app.api.fast_redirect import FastRedirectMiddleware
+from app.api.metrics import MetricsMiddleware, router as metrics_router
+from app.cache.bloom import short_code_filter
+from app.cache.hot_keys import hot_key_tracker
+from app.cache.snapshot import redirect_snapshot
+from app.db.replicas import replica_set
+from app.db.shards import shard_router
+from app.services.clicks import click_flusher
+from app.services.expiry import expiry_sweeper
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    replica_set.start()
+    shard_router.start()
+    if settings.CLICK_TRACKING_ENABLED:
+        click_flusher.start()
+    if settings.BLOOM_FILTER_ENABLED:
+        short_code_filter.start(
+            refresh_interval=settings.BLOOM_FILTER_REFRESH_SECONDS,
+            path=settings.BLOOM_FILTER_PATH,
+        )
+    if settings.SNAPSHOT_ENABLED and settings.SNAPSHOT_PATH:
+        redirect_snapshot.start(refresh_interval=settings.SNAPSHOT_REFRESH_SECONDS)
+    if settings.URL_EXPIRY_SWEEP_ENABLED:
+        expiry_sweeper.start()
+    if settings.HOT_KEYS_ENABLED:
+        # Before the first request, so a fresh worker starts with a warm cache.
+        hot_key_tracker.warm_up()
+        hot_key_tracker.start()
+    yield
+    # Flush buffered clicks before the worker exits.
+    click_flusher.stop()
+    expiry_sweeper.stop()
+    hot_key_tracker.stop()
+    short_code_filter.stop(path=settings.BLOOM_FILTER_PATH)
+    redirect_snapshot.stop()
+    replica_set.stop()
+    shard_router.stop()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    docs_url="/url-shortener/docs"
+    docs_url="/url-shortener/docs",
+    lifespan=lifespan,
 )
 
 # Gzip middleware for compression
@@ -23,6 +67,20 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Request metrics, outside GZip and CORS so latency includes them
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    # Registered before the redirect catch-all so /metrics is not read as a short code
+    app.include_router(metrics_router, prefix="")
+
+# Short code redirects answered ahead of the rest of the stack
+if settings.FAST_REDIRECT_ENABLED:
+    app.add_middleware(FastRedirectMiddleware)
+
+# Admission control outermost, so shed requests cost nothing downstream
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # Include the API router
 app.include_router(url_shortener_router, prefix=settings.API_V1_STR)
 app.include_router(redirect_router, prefix="")
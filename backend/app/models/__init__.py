@@ -1 +1,3 @@
 from .url import UrlMapping
+from .click import UrlClick
+from .shard import ShardBucket
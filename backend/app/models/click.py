@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+
+from app.db.base_class import Base
+
+
+class UrlClick(Base):
+    """
+    Aggregated click counts per short code, written in bulk by the click flusher.
+    """
+    __tablename__ = "url_clicks"
+
+    short_url = Column(String(10), primary_key=True)
+    click_count = Column(BigInteger, nullable=False, default=0)
+    last_accessed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer
+
+from app.db.base_class import Base
+
+
+class ShardBucket(Base):
+    """
+    Which shard holds the url_mappings rows of each short code bucket (the
+    first character of the code). `previous_shard` is set while the bucket
+    is being moved and reads still fall back to it.
+    """
+    __tablename__ = "shard_buckets"
+
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+    shard = Column(Integer, nullable=False)
+    previous_shard = Column(Integer, nullable=True)
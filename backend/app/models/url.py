@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, DateTime, String, Enum as SQLAlchemyEnum
+from sqlalchemy import (
+    Column, Integer, DateTime, Index, LargeBinary, Sequence, SmallInteger, String, Enum as SQLAlchemyEnum
+)
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
+from typing import NamedTuple, Optional
 
 from app.db.base_class import Base
 
@@ -10,6 +13,16 @@ class UrlType(PyEnum):
     CUSTOM = "CUSTOM"
 
 
+class RedirectPolicy(NamedTuple):
+    """
+    A link's overrides of the REDIRECT_* settings, as stored on its row;
+    None keeps the setting.
+    """
+    redirect_status: Optional[int] = None
+    cache_max_age: Optional[int] = None
+    cache_stale_while_revalidate: Optional[int] = None
+
+
 class BaseModel(Base):
     __abstract__ = True
 
@@ -21,6 +34,46 @@ class BaseModel(Base):
 class UrlMapping(BaseModel):
     __tablename__ = "url_mappings"
 
-    original_url = Column(String(2048), index=True)
+    original_url = Column(String(2048))
+    # Fixed-width digest of original_url, see URLUtils.url_digest. Deduplication
+    # probes this index instead of one over the full URL string.
+    original_url_hash = Column(LargeBinary(16), index=True, unique=True, nullable=False)
+    # Lowercased host of original_url, see URLUtils.url_host, for listing by domain.
+    original_url_host = Column(String(255), nullable=True)
     short_url = Column(String(10), index=True, unique=True)
     url_type = Column(SQLAlchemyEnum(UrlType), default=UrlType.RANDOM)
+    # UTC; NULL for links that never expire.
+    expires_at = Column(DateTime, nullable=True)
+    # Redirect policy overrides, see RedirectPolicy; NULL uses the settings.
+    redirect_status = Column(SmallInteger, nullable=True)
+    cache_max_age = Column(Integer, nullable=True)
+    cache_stale_while_revalidate = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Partial, so links that never expire cost the expiry sweeper nothing.
+        Index(
+            "ix_url_mappings_expires_at",
+            expires_at,
+            postgresql_where=expires_at.isnot(None),
+            sqlite_where=expires_at.isnot(None),
+        ),
+        # Keyset pagination of the listing API, newest first, optionally by host.
+        Index("ix_url_mappings_created_at_id", "created_at", "id"),
+        Index("ix_url_mappings_host_created_at_id", original_url_host, "created_at", "id"),
+    )
+
+
+class UrlAlias(Base):
+    """
+    A short code whose mapping was merged into `target_short_url`'s, which
+    has the same canonical original URL. It redirects like its target.
+    """
+    __tablename__ = "url_aliases"
+
+    short_url = Column(String(10), primary_key=True)
+    target_short_url = Column(String(10), nullable=False, index=True)
+
+
+# Each value leases a block of SHORT_CODE_BLOCK_SIZE ids to the sequence
+# short code allocator.
+short_code_block_seq = Sequence("short_code_block_seq", metadata=Base.metadata)
@@ -1,5 +1,6 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from app.core.config import MAX_URL_TTL_SECONDS
 from app.models.url import UrlType
 from datetime import datetime
 
@@ -7,10 +8,65 @@ from datetime import datetime
 class URLCreate(BaseModel):
     original_url: str
     url_type: Optional[UrlType] = UrlType.RANDOM
+    # Overrides URL_DEFAULT_TTL_SECONDS for a newly created link.
+    expires_in_seconds: Optional[int] = Field(default=None, gt=0, le=MAX_URL_TTL_SECONDS)
+    # Override REDIRECT_STATUS_CODE, REDIRECT_CACHE_MAX_AGE_SECONDS and
+    # REDIRECT_STALE_WHILE_REVALIDATE_SECONDS for a newly created link.
+    redirect_status: Optional[Literal[301, 302, 307, 308]] = None
+    cache_max_age: Optional[int] = Field(default=None, ge=0)
+    cache_stale_while_revalidate: Optional[int] = Field(default=None, ge=0)
 
 
 class URLResponse(BaseModel):
     short_url: str
     original_url: str
     is_short_url_exists: bool
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    redirect_status: Optional[int] = None
+    cache_max_age: Optional[int] = None
+    cache_stale_while_revalidate: Optional[int] = None
+
+
+class URLBatchError(BaseModel):
+    msg: str
+    type: str
+    error_code: int
+
+
+class URLBatchItemResult(BaseModel):
+    index: int
+    result: Optional[URLResponse] = None
+    error: Optional[URLBatchError] = None
+
+
+class URLBatchResponse(BaseModel):
+    results: List[URLBatchItemResult]
+
+
+class URLListItem(BaseModel):
+    short_url: str
+    original_url: str
+    url_type: UrlType
+    created_at: datetime
+    expires_at: Optional[datetime] = None
+    redirect_status: Optional[int] = None
+    cache_max_age: Optional[int] = None
+    cache_stale_while_revalidate: Optional[int] = None
+
+
+class URLListResponse(BaseModel):
+    items: List[URLListItem]
+    # Pass back as `cursor` for the next page; None on the last page.
+    next_cursor: Optional[str] = None
+
+
+class HotKey(BaseModel):
+    short_url: str
+    # Estimated redirects, halved every HOT_KEYS_INTERVAL_SECONDS.
+    count: int
+
+
+class HotKeysResponse(BaseModel):
+    enabled: bool
+    keys: List[HotKey]
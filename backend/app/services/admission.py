@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import admission_queued_total, metrics
+
+# Request classes in priority order: when the server is saturated, queued
+# redirects are admitted before queued creates.
+REDIRECT = "redirect"
+CREATE = "create"
+
+# Upper bound on clients with a rate limit bucket.
+RATE_LIMIT_MAX_CLIENTS = 100000
+
+
+class AdmissionController:
+    """
+    Bounds the requests each worker serves at once, so a slow database makes
+    excess requests fail fast instead of queueing on the connection pool for
+    up to `DB_POOL_TIMEOUT` seconds.
+
+    At most `max_concurrency` requests run at a time, and each class at most
+    its own limit. A request that cannot start waits in its class's queue
+    for up to `queue_timeout` seconds; it is shed when the queue is full or
+    the wait runs out. Freed slots go to queued requests in class priority
+    order, and a class is not admitted ahead of queued requests of a
+    higher-priority one.
+
+    Runs on the event loop; requests served by sync handlers hold their
+    slot until the response is sent.
+    """
+
+    def __init__(self, max_concurrency: int, class_limits: Dict[str, int], queue_size: int, queue_timeout: float):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.class_limits = {name: max(min(limit, self.max_concurrency), 1) for name, limit in class_limits.items()}
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_by_class = {name: 0 for name in class_limits}
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in class_limits}
+
+    def _can_start(self, name: str) -> bool:
+        return self.active < self.max_concurrency and self.active_by_class[name] < self.class_limits[name]
+
+    def _queued_ahead(self, name: str) -> bool:
+        for other in self.class_limits:
+            if self.waiters[other]:
+                return True
+            if other == name:
+                return False
+        return False
+
+    def _start(self, name: str) -> None:
+        self.active += 1
+        self.active_by_class[name] += 1
+
+    async def acquire(self, name: str) -> Optional[str]:
+        """
+        Wait for a slot for a request of class `name`.
+
+        Args:
+            name (str): The request class.
+
+        Returns:
+            Optional[str]: None once admitted, which must be paired with
+            `release`, or why the request was shed: "queue_full" or "timeout".
+        """
+        if self._can_start(name) and not self._queued_ahead(name):
+            self._start(name)
+            return None
+        queue = self.waiters[name]
+        if len(queue) >= self.queue_size:
+            return "queue_full"
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        admission_queued_total.inc(name)
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout)
+        except BaseException:
+            # Cancelled while queued, e.g. the client went away.
+            if future.done():
+                self.release(name)
+            else:
+                queue.remove(future)
+            raise
+        if future.done():
+            return None
+        queue.remove(future)
+        return "timeout"
+
+    def release(self, name: str) -> None:
+        self.active -= 1
+        self.active_by_class[name] -= 1
+        for other, queue in self.waiters.items():
+            while queue and self._can_start(other):
+                self._start(other)
+                queue.popleft().set_result(None)
+            if queue:
+                # Lower-priority classes wait until this queue has drained.
+                return
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"in_flight": self.active_by_class[name], "queued": len(self.waiters[name])}
+            for name in self.class_limits
+        }
+
+
+class TokenBuckets:
+    """
+    Per-client token buckets: each client may make `burst` requests at once,
+    refilled at `rate` requests per second. The least recently seen clients
+    are forgotten beyond `max_clients`, which resets them to a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """
+        Take a token for `client`.
+
+        Args:
+            client (str): The client address.
+
+        Returns:
+            float: 0 if the request may proceed, else the seconds until the
+            next token.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets[client] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[client] = (tokens, now)
+            wait = (1 - tokens) / self.rate
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    class_limits={
+        REDIRECT: settings.ADMISSION_MAX_CONCURRENCY,
+        CREATE: settings.ADMISSION_CREATE_MAX_CONCURRENCY,
+    },
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+)
+
+create_rate_limiter = (
+    TokenBuckets(rate=settings.CREATE_RATE_LIMIT_PER_SECOND, burst=settings.CREATE_RATE_LIMIT_BURST)
+    if settings.CREATE_RATE_LIMIT_PER_SECOND > 0
+    else None
+)
+
+
+def _admission_metrics():
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        return
+    stats = admission_controller.stats()
+    yield "admission_in_flight", "gauge", "Admitted requests being served, by request class.", [
+        ({"route_class": name}, values["in_flight"]) for name, values in stats.items()
+    ]
+    yield "admission_queue_depth", "gauge", "Requests waiting for admission, by request class.", [
+        ({"route_class": name}, values["queued"]) for name, values in stats.items()
+    ]
+
+
+metrics.register_collector(_admission_metrics)
@@ -0,0 +1,209 @@
+import argparse
+import logging
+from collections import defaultdict
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.url import CRUDUrl, redirect_policy
+from app.db.shards import bucket_for_hash, bucket_for_short_url, shard_router, url_mapping_sources
+from app.models.url import UrlAlias, UrlMapping
+from app.utils.url_helpers import URLUtils
+
+logger = logging.getLogger(__name__)
+
+crud_url = CRUDUrl()
+
+# Rows read, and rewritten in one transaction, per batch.
+MERGE_BATCH_SIZE = 1000
+# Attempts per batch when a concurrent create takes a canonical digest first.
+MERGE_BATCH_ATTEMPTS = 3
+
+url_mappings = UrlMapping.__table__
+url_aliases = UrlAlias.__table__
+
+_MERGE_COLUMNS = (
+    UrlMapping.id,
+    UrlMapping.short_url,
+    UrlMapping.original_url,
+    UrlMapping.original_url_hash,
+    UrlMapping.expires_at,
+    UrlMapping.redirect_status,
+    UrlMapping.cache_max_age,
+    UrlMapping.cache_stale_while_revalidate,
+)
+
+REKEY = (
+    update(url_mappings)
+    .where(url_mappings.c.id == bindparam("row_id"))
+    .values(
+        original_url=bindparam("url"),
+        original_url_hash=bindparam("digest"),
+        original_url_host=bindparam("host"),
+    )
+)
+DELETE_BY_ID = url_mappings.delete().where(url_mappings.c.id == bindparam("row_id"))
+RETARGET_ALIASES = (
+    update(url_aliases)
+    .where(url_aliases.c.target_short_url == bindparam("merged"))
+    .values(target_short_url=bindparam("survivor"))
+)
+
+
+class MergeProgress:
+    """
+    Row counters for `merge_duplicates`.
+    """
+
+    def __init__(self):
+        # Rows rewritten under their canonical key.
+        self.rekeyed = 0
+        # Duplicates deleted, their codes kept as aliases.
+        self.merged = 0
+        # Duplicates whose expiry or redirect policy differ from the survivor's.
+        self.kept = 0
+        # Rows whose canonical key belongs to another shard.
+        self.skipped = 0
+
+    def add(self, other: "MergeProgress") -> None:
+        self.rekeyed += other.rekeyed
+        self.merged += other.merged
+        self.kept += other.kept
+        self.skipped += other.skipped
+
+
+def _mergeable(row: Any, survivor: Any) -> bool:
+    return row.expires_at == survivor.expires_at and redirect_policy(row) == redirect_policy(survivor)
+
+
+def _merge_batch(db: Session, rows: List[Any]) -> MergeProgress:
+    """
+    Rekey or merge the rows of one batch, without committing.
+    """
+    progress = MergeProgress()
+    groups: Dict[bytes, List[Any]] = defaultdict(list)
+    for row in rows:
+        digest = URLUtils.url_digest(row.original_url)
+        if digest == row.original_url_hash and URLUtils.stored_url(row.original_url) == row.original_url:
+            continue
+        if shard_router.enabled and bucket_for_hash(digest) != bucket_for_short_url(row.short_url):
+            # New links for the URL are created and deduplicated on the
+            # canonical digest's bucket, which rebalancing may move apart
+            # from this code's.
+            progress.skipped += 1
+            continue
+        groups[digest].append(row)
+    if not groups:
+        return progress
+    survivors = crud_url.get_urls_by_hashes(db=db, hashes=groups.keys())
+    rekeys, deletes, aliases, retargets = [], [], {}, []
+    for digest, group in groups.items():
+        survivor: Optional[Any] = survivors.get(digest)
+        if survivor is not None and survivor.id in {row.id for row in group}:
+            # Already keyed by its canonical digest, but stored in another form.
+            survivor = None
+        if survivor is None:
+            survivor, group = group[0], group[1:]
+            url = URLUtils.stored_url(survivor.original_url)
+            rekeys.append({"row_id": survivor.id, "url": url, "digest": digest, "host": URLUtils.url_host(url)})
+            progress.rekeyed += 1
+        for row in group:
+            if not _mergeable(row, survivor):
+                progress.kept += 1
+                continue
+            deletes.append({"row_id": row.id})
+            aliases[row.short_url] = survivor.short_url
+            retargets.append({"merged": row.short_url, "survivor": survivor.short_url})
+            progress.merged += 1
+    if deletes:
+        db.execute(DELETE_BY_ID, deletes)
+        db.execute(RETARGET_ALIASES, retargets)
+        crud_url.add_aliases(db=db, aliases=aliases)
+    if rekeys:
+        db.execute(REKEY, rekeys)
+    return progress
+
+
+def merge_source(
+    session_factory: Callable[[], ContextManager[Session]], batch_size: int = MERGE_BATCH_SIZE
+) -> MergeProgress:
+    """
+    Merge the canonical duplicates in one database, `batch_size` rows by id
+    at a time, one transaction per batch.
+    """
+    progress = MergeProgress()
+    last_id = 0
+    while True:
+        for attempt in range(MERGE_BATCH_ATTEMPTS):
+            with session_factory() as db:
+                rows = db.execute(
+                    select(*_MERGE_COLUMNS)
+                    .where(UrlMapping.id > last_id)
+                    .order_by(UrlMapping.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    return progress
+                try:
+                    batch = _merge_batch(db, rows)
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # A create took a canonical digest after it was looked up.
+                    db.rollback()
+                    if attempt == MERGE_BATCH_ATTEMPTS - 1:
+                        raise
+        progress.add(batch)
+        last_id = rows[-1].id
+
+
+def merge_duplicates(batch_size: int = MERGE_BATCH_SIZE) -> MergeProgress:
+    """
+    Merge url_mappings rows whose original URLs share a canonical form (see
+    `URLUtils.canonicalize_url`), e.g. rows created before canonicalization
+    was enabled or with a shorter `URL_TRACKING_PARAMETERS`.
+
+    Each row is rewritten with its canonical digest and stored form. A row
+    whose canonical digest another row already holds is deleted, and its
+    code kept in `url_aliases` so existing links still redirect, provided
+    both have the same expiry and redirect policy; otherwise it is kept
+    under its old key. The row holding the digest, or else the oldest row
+    of the batch, survives. Safe to run while the app is serving, and to
+    run again.
+
+    Args:
+        batch_size (int): Rows read and rewritten per transaction.
+
+    Returns:
+        MergeProgress: The counts over every database.
+    """
+    progress = MergeProgress()
+    for label, session_factory in url_mapping_sources().items():
+        source = merge_source(session_factory, batch_size=batch_size)
+        logger.info(
+            "%s: %d rows rekeyed, %d duplicates merged, %d kept, %d skipped",
+            label, source.rekeyed, source.merged, source.kept, source.skipped,
+        )
+        progress.add(source)
+    return progress
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(
+        description="Merge short URLs whose original URLs have the same canonical form."
+    )
+    parser.add_argument("--batch-size", type=int, default=MERGE_BATCH_SIZE)
+    args = parser.parse_args()
+    if not settings.URL_CANONICALIZATION_ENABLED:
+        parser.error("URL_CANONICALIZATION_ENABLED is off")
+    if shard_router.enabled:
+        shard_router.refresh()
+    result = merge_duplicates(batch_size=args.batch_size)
+    print(
+        f"Rekeyed {result.rekeyed} and merged {result.merged} short URLs; "
+        f"kept {result.kept} duplicates and skipped {result.skipped}"
+    )
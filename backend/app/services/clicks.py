@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from app.core.config import settings
+from app.crud.click import UPSERT_CHUNK_SIZE, CRUDClick
+from app.db.session import session_scope
+
+logger = logging.getLogger(__name__)
+
+crud_click = CRUDClick()
+
+
+class ClickBuffer:
+    """
+    In-memory aggregation of redirect clicks, keyed by short code.
+
+    Recording a click is a dict update under a lock; nothing on the redirect
+    path waits for the database. Once `max_keys` distinct codes are buffered,
+    clicks for new codes are dropped and counted until the next flush.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._clicks: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self.full = threading.Event()
+        self.dropped = 0
+
+    def record(self, short_url: str) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._clicks.get(short_url)
+            if entry is not None:
+                entry[0] += 1
+                entry[1] = now
+                return
+            if len(self._clicks) >= self.max_keys:
+                self.dropped += 1
+                self.full.set()
+                return
+            self._clicks[short_url] = [1, now]
+
+    def drain(self) -> Dict[str, Tuple[int, datetime]]:
+        with self._lock:
+            clicks, self._clicks = self._clicks, {}
+            self.full.clear()
+        return {
+            short_url: (count, datetime.utcfromtimestamp(last_accessed))
+            for short_url, (count, last_accessed) in clicks.items()
+        }
+
+    def restore(self, clicks: Dict[str, Tuple[int, datetime]]) -> None:
+        """
+        Put back counts from `drain` that could not be written, merged with
+        clicks recorded since. They are kept even past `max_keys`.
+        """
+        with self._lock:
+            for short_url, (count, last_accessed_at) in clicks.items():
+                last_accessed = last_accessed_at.replace(tzinfo=timezone.utc).timestamp()
+                entry = self._clicks.get(short_url)
+                if entry is None:
+                    self._clicks[short_url] = [count, last_accessed]
+                else:
+                    entry[0] += count
+                    entry[1] = max(entry[1], last_accessed)
+
+
+class ClickFlusher:
+    """
+    Background thread that writes the click buffer to `url_clicks` every
+    `interval` seconds, or early when the buffer fills up.
+    """
+
+    def __init__(self, buffer: ClickBuffer, interval: float):
+        self.buffer = buffer
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="click-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the thread and flush whatever is still buffered.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self.buffer.full.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def flush(self) -> bool:
+        """
+        Write the buffer in chunks of `UPSERT_CHUNK_SIZE` codes, one
+        transaction each. If a chunk fails, it and the chunks after it go
+        back into the buffer for the next flush.
+
+        Returns:
+            bool: False if some counts could not be written.
+        """
+        clicks = list(self.buffer.drain().items())
+        for start in range(0, len(clicks), UPSERT_CHUNK_SIZE):
+            try:
+                with session_scope() as db:
+                    crud_click.bulk_increment(db=db, clicks=dict(clicks[start:start + UPSERT_CHUNK_SIZE]))
+            except Exception as exc:
+                self.buffer.restore(dict(clicks[start:]))
+                logger.warning(
+                    "Could not write %d buffered click counts, will retry: %s", len(clicks) - start, exc
+                )
+                return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.buffer.full.wait(self.interval)
+            if self._stop.is_set():
+                break
+            if not self.flush():
+                # Restored counts may keep the buffer full; back off instead
+                # of retrying in a tight loop.
+                self._stop.wait(self.interval)
+
+
+click_buffer = ClickBuffer(max_keys=settings.CLICK_BUFFER_MAX_KEYS)
+click_flusher = ClickFlusher(buffer=click_buffer, interval=settings.CLICK_FLUSH_INTERVAL_SECONDS)
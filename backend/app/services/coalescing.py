@@ -0,0 +1,228 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from fastapi import status
+
+from app.core.metrics import create_group_size, create_group_wait_seconds
+from app.error_code.common_errors import CommonErrorCode
+from app.error_code.error_manager import error_manager
+from app.schemas.url import URLBatchItemResult, URLBatchResponse, URLCreate, URLResponse
+
+
+class CoalescingStats:
+    """
+    Counters for tuning the group commit window, also exported as the
+    `create_group_size` and `create_group_wait_seconds` histograms.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.groups = 0
+        self.requests = 0
+        self.max_group_size = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, group_size: int, waits: List[float]) -> None:
+        create_group_size.observe(group_size)
+        for wait in waits:
+            create_group_wait_seconds.observe(wait)
+        with self._lock:
+            self.groups += 1
+            self.requests += group_size
+            self.max_group_size = max(self.max_group_size, group_size)
+            self.wait_seconds_total += sum(waits)
+            self.max_wait_seconds = max([self.max_wait_seconds, *waits])
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "groups": self.groups,
+                "requests": self.requests,
+                "mean_group_size": self.requests / self.groups if self.groups else 0.0,
+                "max_group_size": self.max_group_size,
+                "wait_seconds_total": self.wait_seconds_total,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+def _item_result(item: URLBatchItemResult) -> URLResponse:
+    if item.result is not None:
+        return item.result
+    error = item.error
+    status_code = (
+        status.HTTP_400_BAD_REQUEST
+        if error.error_code == CommonErrorCode.INVALID_URL
+        else status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
+    raise error_manager.error_responder(
+        status_code=status_code, error_code=error.error_code, error_message=error.msg
+    )
+
+
+class _PendingCreate:
+    __slots__ = ("url_in", "future", "queued_at", "taken")
+
+    def __init__(self, url_in: URLCreate):
+        self.url_in = url_in
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+        self.taken = False
+
+
+class CreateCoalescer:
+    """
+    Group commit for concurrent single-URL creates on the sync path.
+
+    The first request to arrive becomes the group leader. It waits up to
+    `max_wait` seconds, or until `max_group_size` requests have joined, then
+    writes the whole group through the batch create path in one transaction
+    and hands each follower its own result. Requests still queued when a
+    group is taken elect a new leader among themselves.
+    """
+
+    def __init__(
+        self,
+        max_wait_ms: float,
+        max_group_size: int,
+        write_group: Callable[[Any, List[URLCreate]], URLBatchResponse],
+    ):
+        self.max_wait = max_wait_ms / 1000
+        self.max_group_size = max(max_group_size, 1)
+        self.write_group = write_group
+        self.stats = CoalescingStats()
+        self._condition = threading.Condition()
+        self._pending: List[_PendingCreate] = []
+        self._leader_active = False
+
+    def submit(self, db: Any, url_in: URLCreate) -> URLResponse:
+        """
+        Create one mapping as part of a group and return its own result.
+
+        Args:
+            db: The caller's session, used if this caller leads a group.
+            url_in (URLCreate): The URL to shorten.
+
+        Returns:
+            URLResponse: The result for this URL.
+        """
+        entry = _PendingCreate(url_in)
+        with self._condition:
+            self._pending.append(entry)
+            self._condition.notify_all()
+        while True:
+            with self._condition:
+                while not entry.future.done() and (entry.taken or self._leader_active):
+                    self._condition.wait()
+                if entry.future.done():
+                    break
+                self._leader_active = True
+            self._lead(db)
+        return _item_result(entry.future.result())
+
+    def _lead(self, db: Any) -> None:
+        deadline = time.perf_counter() + self.max_wait
+        with self._condition:
+            while len(self._pending) < self.max_group_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            group = self._pending[:self.max_group_size]
+            del self._pending[:self.max_group_size]
+            for entry in group:
+                entry.taken = True
+            self._leader_active = False
+            self._condition.notify_all()
+        started = time.perf_counter()
+        self.stats.record(len(group), [started - entry.queued_at for entry in group])
+        try:
+            response = self.write_group(db, [entry.url_in for entry in group])
+            for entry, item in zip(group, response.results):
+                entry.future.set_result(item)
+        except BaseException as exc:
+            for entry in group:
+                if not entry.future.done():
+                    entry.future.set_exception(exc)
+        with self._condition:
+            self._condition.notify_all()
+
+
+class AsyncCreateCoalescer:
+    """
+    Group commit for concurrent single-URL creates on the async path.
+
+    Same grouping rules as `CreateCoalescer`, using one event loop task per
+    group instead of a leader thread.
+    """
+
+    def __init__(
+        self,
+        max_wait_ms: float,
+        max_group_size: int,
+        write_group: Callable[[List[URLCreate]], Awaitable[URLBatchResponse]],
+    ):
+        self.max_wait = max_wait_ms / 1000
+        self.max_group_size = max(max_group_size, 1)
+        self.write_group = write_group
+        self.stats = CoalescingStats()
+        self._pending: List[Tuple[URLCreate, asyncio.Future, float]] = []
+        self._group_full = None
+        self._flush_task = None
+
+    async def submit(self, url_in: URLCreate) -> URLResponse:
+        """
+        Create one mapping as part of a group and return its own result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((url_in, future, time.perf_counter()))
+        if self._flush_task is None:
+            self._group_full = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush())
+        elif len(self._pending) >= self.max_group_size:
+            self._group_full.set()
+        return _item_result(await future)
+
+    async def _flush(self) -> None:
+        group = []
+        try:
+            try:
+                await asyncio.wait_for(self._group_full.wait(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+            group = self._take_group()
+            started = time.perf_counter()
+            self.stats.record(len(group), [started - queued for _, _, queued in group])
+            response = await self.write_group([url_in for url_in, _, _ in group])
+            for (_, future, _), item in zip(group, response.results):
+                if not future.done():
+                    future.set_result(item)
+        except BaseException as exc:
+            if not group:
+                # Cancelled while waiting; no other task would flush the queue.
+                group, self._pending, self._flush_task = self._pending, [], None
+            # The callers were not cancelled themselves, so they get an error.
+            error = exc if isinstance(exc, Exception) else RuntimeError("Create group was cancelled")
+            for _, future, _ in group:
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(exc, Exception):
+                raise
+
+    def _take_group(self) -> List[Tuple[URLCreate, asyncio.Future, float]]:
+        """
+        Take the next group off the queue, and schedule a flush for the rest.
+        """
+        group = self._pending[:self.max_group_size]
+        del self._pending[:self.max_group_size]
+        if self._pending:
+            self._group_full = asyncio.Event()
+            if len(self._pending) >= self.max_group_size:
+                self._group_full.set()
+            self._flush_task = asyncio.create_task(self._flush())
+        else:
+            self._flush_task = None
+        return group
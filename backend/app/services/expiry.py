@@ -0,0 +1,99 @@
+import argparse
+import logging
+import threading
+
+from app.core.config import settings
+from app.core.metrics import url_mappings_purged_total
+from app.crud.click import CRUDClick
+from app.crud.url import CRUDUrl
+from app.db.session import session_scope
+from app.db.shards import shard_router, url_mapping_sources
+
+logger = logging.getLogger(__name__)
+
+crud_url = CRUDUrl()
+crud_click = CRUDClick()
+
+# Pause between batches, so a large backlog of expired rows is purged
+# without monopolising the database.
+SWEEP_BATCH_PAUSE_SECONDS = 0.1
+
+
+class ExpirySweeper:
+    """
+    Background thread that deletes expired url_mappings rows every
+    `interval` seconds, from the primary or from each shard.
+
+    Rows are deleted `batch_size` at a time, one short transaction each,
+    through the partial index on `expires_at`, so purging a backlog never
+    holds locks for long. Their aliases and `url_clicks` rows are deleted
+    with them.
+    Expired links are already rejected on the redirect path; the sweeper
+    only reclaims their space.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sweep(self) -> int:
+        """
+        Delete every row that has expired. Returns the number deleted.
+        """
+        purged = 0
+        for label, session_factory in url_mapping_sources().items():
+            while True:
+                with session_factory() as db:
+                    short_urls = crud_url.delete_expired(db=db, limit=self.batch_size)
+                    aliases = crud_url.delete_aliases_to(db=db, short_urls=short_urls) if short_urls else []
+                if short_urls:
+                    with session_scope() as db:
+                        crud_click.delete_many(db=db, short_urls=short_urls + aliases)
+                    url_mappings_purged_total.inc(label, amount=len(short_urls))
+                    purged += len(short_urls)
+                if len(short_urls) < self.batch_size or self._stop.wait(SWEEP_BATCH_PAUSE_SECONDS):
+                    break
+        return purged
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="expiry-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                purged = self.sweep()
+            except Exception as exc:
+                logger.warning("Expiry sweep failed: %s", exc)
+                continue
+            if purged:
+                logger.info("Purged %d expired short URLs", purged)
+
+
+expiry_sweeper = ExpirySweeper(
+    interval=settings.URL_EXPIRY_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.URL_EXPIRY_SWEEP_BATCH_SIZE,
+)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Delete every expired short URL now.")
+    parser.add_argument("--batch-size", type=int, default=settings.URL_EXPIRY_SWEEP_BATCH_SIZE)
+    args = parser.parse_args()
+    if shard_router.enabled:
+        shard_router.refresh()
+    count = ExpirySweeper(interval=0, batch_size=args.batch_size).sweep()
+    print(f"Purged {count} expired short URLs")
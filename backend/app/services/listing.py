@@ -0,0 +1,154 @@
+import base64
+import heapq
+import json
+from contextlib import ExitStack
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.crud.url import CRUDUrl, UrlListFilter
+from app.db.replicas import read_session_scope
+from app.db.shards import shard_router
+from app.schemas.url import URLListItem, URLListResponse
+from app.services.urls import UrlServices
+
+crud_url = CRUDUrl()
+
+# Rows fetched per round trip, and NDJSON lines per chunk, when streaming.
+STREAM_BATCH_SIZE = 1000
+
+# A listed row with the label of the database it came from.
+Listed = Tuple[Any, str]
+
+
+def list_sources() -> Dict[str, Callable[[], ContextManager[Session]]]:
+    """
+    Databases to list url_mappings from, by label: each shard, or a healthy
+    read replica, else the primary.
+    """
+    if shard_router.enabled:
+        return {shard.label: shard.session_scope for shard in shard_router.shards}
+    return {"primary": read_session_scope}
+
+
+def _sort_key(listed: Listed) -> Tuple[datetime, int, str]:
+    row, label = listed
+    # Ids are only unique per database, so ties sort by its label.
+    return row.created_at, row.id, label
+
+
+def _labelled(rows: Iterable[Any], label: str) -> Iterator[Listed]:
+    for row in rows:
+        yield row, label
+
+
+def encode_cursor(listed: Listed) -> str:
+    row, label = listed
+    payload = json.dumps([row.created_at.isoformat(), row.id, label], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """
+    Decode a cursor from `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        created_at, row_id, label = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    if not isinstance(row_id, int) or not isinstance(label, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, row_id, label
+
+
+def list_item(row: Any) -> URLListItem:
+    return URLListItem(
+        short_url=UrlServices.short_link(row.short_url),
+        original_url=row.original_url,
+        url_type=row.url_type,
+        created_at=row.created_at,
+        expires_at=row.expires_at,
+        redirect_status=row.redirect_status,
+        cache_max_age=row.cache_max_age,
+        cache_stale_while_revalidate=row.cache_stale_while_revalidate,
+    )
+
+
+class UrlListServices:
+    @staticmethod
+    def list_urls(filters: UrlListFilter, limit: int, cursor: Optional[str] = None) -> URLListResponse:
+        """
+        One page of mappings matching `filters`, newest first.
+
+        Pages are keyset-paginated on (created_at, id): each query seeks
+        straight to the cursor through an index instead of skipping rows
+        with OFFSET, so deep pages cost the same as the first. When sharded,
+        every shard returns its next `limit` rows and the pages are merged.
+
+        Args:
+            filters (UrlListFilter): The listing filters.
+            limit (int): Maximum number of mappings.
+            cursor (Optional[str]): `next_cursor` of the previous page.
+
+        Returns:
+            URLListResponse: The mappings and the cursor of the next page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        pages = []
+        for label, session_factory in list_sources().items():
+            before, inclusive = None, False
+            if after is not None:
+                created_at, row_id, after_label = after
+                before = (created_at, row_id)
+                # A row of another database tied with the cursor's comes after
+                # it when its label sorts lower.
+                inclusive = label < after_label
+            with session_factory() as db:
+                rows = crud_url.list_url_mappings(
+                    db=db, filters=filters, limit=limit + 1, before=before, inclusive=inclusive
+                )
+            pages.append(_labelled(rows, label))
+        merged = list(islice(heapq.merge(*pages, key=_sort_key, reverse=True), limit + 1))
+        return URLListResponse(
+            items=[list_item(row) for row, _ in merged[:limit]],
+            next_cursor=encode_cursor(merged[limit - 1]) if len(merged) > limit else None,
+        )
+
+    @staticmethod
+    def stream_urls(filters: UrlListFilter, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+        """
+        Every mapping matching `filters` as NDJSON, newest first, in chunks
+        of `batch_size` lines.
+
+        Rows come from a server-side cursor on each database, merged when
+        sharded, so memory stays flat however many rows match.
+
+        Args:
+            filters (UrlListFilter): The listing filters.
+            batch_size (int): Rows fetched per round trip and lines per chunk.
+
+        Returns:
+            Iterator[str]: Chunks of newline-terminated JSON objects.
+        """
+        with ExitStack() as stack:
+            streams = []
+            for label, session_factory in list_sources().items():
+                db = stack.enter_context(session_factory())
+                streams.append(_labelled(crud_url.stream_url_mappings(db, filters, batch_size), label))
+            lines = []
+            for row, _ in heapq.merge(*streams, key=_sort_key, reverse=True):
+                lines.append(list_item(row).model_dump_json())
+                if len(lines) >= batch_size:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
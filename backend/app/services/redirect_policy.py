@@ -0,0 +1,74 @@
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from app.cache.local import parse_value
+from app.core.config import settings
+
+
+class Redirect(NamedTuple):
+    url: str
+    status_code: int
+    # None sends no Cache-Control header.
+    cache_control: Optional[str]
+
+
+@lru_cache(maxsize=256)
+def cache_control_for(status_code: int, max_age: int, stale_while_revalidate: int, expiring: bool) -> Optional[str]:
+    """
+    The Cache-Control header of a redirect.
+
+    Links that never expire cannot change once created, so browsers and
+    edge caches may keep them for `max_age` seconds, and serve them stale
+    for `stale_while_revalidate` more while revalidating. Expiring links
+    are not cached; a permanent redirect to one is sent `no-store`, since
+    browsers would otherwise keep it past the expiry.
+
+    Args:
+        status_code (int): The redirect status.
+        max_age (int): Seconds caches may reuse the redirect; 0 disables it.
+        stale_while_revalidate (int): Seconds a stale redirect may be reused.
+        expiring (bool): Whether the link has an expiry.
+
+    Returns:
+        Optional[str]: The header value, or None to send none.
+    """
+    if not expiring and max_age > 0:
+        directives = f"public, max-age={max_age}"
+        if stale_while_revalidate > 0:
+            directives += f", stale-while-revalidate={stale_while_revalidate}"
+        return directives
+    if status_code in (301, 308):
+        return "no-store"
+    return None
+
+
+def redirect_for(value: Optional[str]) -> Optional[Redirect]:
+    """
+    The redirect for a value written by `cache_value`, with the link's own
+    policy overrides or else the REDIRECT_* settings.
+
+    Args:
+        value (Optional[str]): The cached value.
+
+    Returns:
+        Optional[Redirect]: The redirect, or None for a cached miss or a
+        link that has expired.
+    """
+    if not value:
+        return None
+    original_url, expires_at, policy = parse_value(value)
+    if expires_at is not None and expires_at <= time.time():
+        return None
+    status_code, max_age, stale_while_revalidate = policy + (None,) * (3 - len(policy))
+    if status_code is None:
+        status_code = settings.REDIRECT_STATUS_CODE
+    if max_age is None:
+        max_age = settings.REDIRECT_CACHE_MAX_AGE_SECONDS
+    if stale_while_revalidate is None:
+        stale_while_revalidate = settings.REDIRECT_STALE_WHILE_REVALIDATE_SECONDS
+    return Redirect(
+        original_url,
+        status_code,
+        cache_control_for(status_code, max_age, stale_while_revalidate, expires_at is not None),
+    )
@@ -0,0 +1,168 @@
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.url import short_code_block_seq
+from app.utils.url_helpers import URLUtils
+
+
+class ShortCodeAllocator(ABC):
+    """
+    Hands out short codes for new URL mappings.
+    """
+
+    @abstractmethod
+    def allocate(self, db: Session) -> str:
+        ...
+
+    @abstractmethod
+    async def allocate_async(self, db: AsyncSession) -> str:
+        ...
+
+    def allocate_many(self, db: Session, count: int) -> List[str]:
+        return [self.allocate(db=db) for _ in range(count)]
+
+    async def allocate_many_async(self, db: AsyncSession, count: int) -> List[str]:
+        return [await self.allocate_async(db=db) for _ in range(count)]
+
+
+class RandomCodeAllocator(ShortCodeAllocator):
+    """
+    Random codes. Collisions are caught by the unique index on
+    `url_mappings.short_url` at insert time and retried with a new code.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+
+    def allocate(self, db: Session) -> str:
+        return URLUtils.generate_random_short_url(length=self.length)
+
+    async def allocate_async(self, db: AsyncSession) -> str:
+        return URLUtils.generate_random_short_url(length=self.length)
+
+
+class FeistelScrambler:
+    """
+    Keyed bijection on [0, domain) used to make sequential IDs unguessable.
+
+    A balanced Feistel network permutes the smallest even-width bit range
+    covering the domain; values that land outside the domain are walked
+    through the permutation again until they fall back inside it.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, domain: int, key: str):
+        self.domain = domain
+        self.key = key.encode("utf-8")
+        bits = max((domain - 1).bit_length(), 2)
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+
+    def _round(self, value: int, round_index: int) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "big"),
+            key=self.key,
+            person=round_index.to_bytes(16, "big"),
+            digest_size=8,
+        ).digest()
+        return int.from_bytes(digest, "big") & self.half_mask
+
+    def _permute(self, value: int) -> int:
+        left, right = value >> self.half_bits, value & self.half_mask
+        for round_index in range(self.ROUNDS):
+            left, right = right, left ^ self._round(right, round_index)
+        return (left << self.half_bits) | right
+
+    def scramble(self, value: int) -> int:
+        value = self._permute(value)
+        while value >= self.domain:
+            value = self._permute(value)
+        return value
+
+
+class SequenceCodeAllocator(ShortCodeAllocator):
+    """
+    Base62 codes derived from a database sequence, with no existence check.
+
+    Each `nextval('short_code_block_seq')` leases a block of `block_size`
+    IDs to this worker, so the database is touched once per block rather
+    than once per code. IDs are unique across workers by construction; the
+    optional scrambler maps them to codes that do not reveal the sequence.
+    """
+
+    def __init__(self, length: int, block_size: int, scrambler: Optional[FeistelScrambler] = None):
+        self.length = length
+        self.block_size = max(block_size, 1)
+        self.capacity = 62 ** length
+        self.scrambler = scrambler
+        self._blocks = deque()
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> Optional[int]:
+        with self._lock:
+            while self._blocks:
+                next_id, end = self._blocks[0]
+                if next_id < end:
+                    self._blocks[0] = (next_id + 1, end)
+                    return next_id
+                self._blocks.popleft()
+        return None
+
+    def _add_block(self, block_number: int) -> None:
+        start = block_number * self.block_size
+        with self._lock:
+            self._blocks.append((start, start + self.block_size))
+
+    def _encode(self, value: int) -> str:
+        if value >= self.capacity:
+            raise RuntimeError(
+                f"Short code space of {self.length} characters is exhausted"
+            )
+        if self.scrambler is not None:
+            value = self.scrambler.scramble(value)
+        return URLUtils.encode_base62(value, length=self.length)
+
+    def allocate(self, db: Session) -> str:
+        value = self._next_id()
+        while value is None:
+            self._add_block(db.scalar(select(short_code_block_seq.next_value())))
+            value = self._next_id()
+        return self._encode(value)
+
+    async def allocate_async(self, db: AsyncSession) -> str:
+        value = self._next_id()
+        while value is None:
+            self._add_block(await db.scalar(select(short_code_block_seq.next_value())))
+            value = self._next_id()
+        return self._encode(value)
+
+
+def get_short_code_allocator() -> ShortCodeAllocator:
+    """
+    Build the allocator selected by `settings.SHORT_CODE_ALLOCATOR`. With
+    sharding on, the first character of each code is the shard bucket
+    prepended by the shard router, so one fewer is allocated.
+    """
+    length = settings.SHORT_URL_LENGTH - (1 if settings.shard_database_uris else 0)
+    if settings.SHORT_CODE_ALLOCATOR.lower() == "sequence":
+        scrambler = None
+        if settings.SHORT_CODE_SCRAMBLE_KEY:
+            scrambler = FeistelScrambler(domain=62 ** length, key=settings.SHORT_CODE_SCRAMBLE_KEY)
+        return SequenceCodeAllocator(
+            length=length,
+            block_size=settings.SHORT_CODE_BLOCK_SIZE,
+            scrambler=scrambler,
+        )
+    return RandomCodeAllocator(length=length)
+
+
+short_code_allocator = get_short_code_allocator()
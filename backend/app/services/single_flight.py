@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.core.metrics import single_flight_coalesced_total
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time in this process, on the sync
+    path. The first caller for a key runs it; callers arriving on other
+    threads while it is in flight wait for its result, or its exception,
+    instead of repeating the work. Nothing is kept once the call returns.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, call: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Return `call()`, or the result of the call already in flight for `key`.
+
+        Args:
+            key (Hashable): What the call loads, e.g. a short code.
+            call (Callable[[], Any]): Loads the value for `key`.
+
+        Returns:
+            Tuple[Any, bool]: The value returned by whichever call ran, and
+            True when this caller joined another caller's call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            single_flight_coalesced_total.inc(self.name)
+            return future.result(), True
+        try:
+            result = call()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Async counterpart of `SingleFlight`. The call runs as its own task, so
+    a caller that is cancelled, e.g. on client disconnect, does not cancel
+    it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        See `SingleFlight.do`.
+        """
+        task = self._calls.get(key)
+        joined = task is not None
+        if joined:
+            self.coalesced += 1
+            single_flight_coalesced_total.inc(self.name)
+        else:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), joined
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
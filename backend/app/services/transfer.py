@@ -0,0 +1,462 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    Engine,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.crud.url import CRUDUrl, is_expired, unexpired
+from app.db.session import engine, session_scope
+from app.db.shards import bucket_for_short_url, shard_router, url_mapping_sources
+from app.models.url import UrlMapping, UrlType
+from app.services.short_codes import short_code_allocator
+from app.services.urls import MAX_CREATE_ATTEMPTS
+from app.utils.url_helpers import BASE62_ALPHABET, URLUtils
+
+logger = logging.getLogger(__name__)
+
+crud_url = CRUDUrl()
+
+# Rows per staging load and transaction; memory use depends on this, not
+# on the size of the file.
+IMPORT_CHUNK_SIZE = 50000
+# Rows fetched per round trip from the export's server-side cursor.
+EXPORT_BATCH_SIZE = 10000
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+FIELDS = ("short_url", "original_url", "created_at", "expires_at")
+
+_SHORT_URL_CHARS = frozenset(BASE62_ALPHABET)
+
+# Per-connection staging table the import COPYs each chunk into.
+url_import = Table(
+    "url_import",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("original_url", String(2048)),
+    Column("original_url_hash", LargeBinary(16)),
+    Column("original_url_host", String(255)),
+    Column("short_url", String(10)),
+    Column("keep_code", Boolean),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime),
+    prefixes=["TEMPORARY"],
+)
+_COPY_COLUMNS = (
+    "original_url", "original_url_hash", "original_url_host", "short_url", "keep_code", "created_at", "expires_at"
+)
+
+
+class TransferProgress:
+    """
+    Row counters for an import or export, logged every
+    `PROGRESS_INTERVAL_SECONDS` and once at the end.
+    """
+
+    def __init__(self, verb: str):
+        self.verb = verb
+        self.started = time.monotonic()
+        self._last_report = self.started
+        self.read = 0
+        self.written = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.expired = 0
+        self.conflicts = 0
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        parts = [f"{self.read} rows read", f"{self.written} {self.verb}"]
+        for name in ("duplicates", "invalid", "expired", "conflicts"):
+            if getattr(self, name):
+                parts.append(f"{getattr(self, name)} {name}")
+        return f"{', '.join(parts)} in {elapsed:.1f}s ({self.read / max(elapsed, 1e-9):.0f} rows/s)"
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now - self._last_report >= PROGRESS_INTERVAL_SECONDS:
+            self._last_report = now
+            logger.info(self.summary())
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _format_time(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def read_records(handle: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream records from CSV with a header row, or from JSON lines. A JSON
+    line that does not parse yields an empty record, counted as invalid.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(handle)
+        return
+    for line in handle:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {}
+        yield record if isinstance(record, dict) else {}
+
+
+class _StagingLoader:
+    """
+    One database's side of an import: a connection holding the staging
+    table, into which each chunk is loaded and then moved to url_mappings.
+    """
+
+    def __init__(self, engine: Engine, allocate: Callable[[List[bytes]], List[str]], progress: TransferProgress):
+        self.engine = engine
+        self.allocate = allocate
+        self.progress = progress
+        self.conn: Optional[Connection] = None
+
+    def __enter__(self) -> "_StagingLoader":
+        # A temporary table lives as long as its connection, so the import
+        # keeps this one instead of a session that returns it to the pool.
+        self.conn = self.engine.connect()
+        url_import.create(self.conn)
+        self.conn.commit()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.conn.close()
+
+    def _copy(self, rows: List[Dict[str, Any]]) -> None:
+        if self.conn.dialect.name != "postgresql":
+            self.conn.execute(insert(url_import), rows)
+            return
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                row["original_url"],
+                "\\x" + row["original_url_hash"].hex(),
+                row["original_url_host"],
+                row["short_url"],
+                row["keep_code"],
+                row["created_at"],
+                row["expires_at"],
+            ])
+        buffer.seek(0)
+        cursor = self.conn.connection.driver_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY url_import ({', '.join(_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+    def _insert_staged(self) -> int:
+        staged = select(
+            url_import.c.original_url,
+            url_import.c.original_url_hash,
+            url_import.c.original_url_host,
+            url_import.c.short_url,
+            literal(UrlType.RANDOM, UrlMapping.url_type.type),
+            func.coalesce(url_import.c.created_at, func.now()),
+            func.now(),
+            url_import.c.expires_at,
+        ).where(url_import.c.short_url.isnot(None))
+        dialect_insert = postgresql.insert if self.conn.dialect.name == "postgresql" else sqlite.insert
+        stmt = dialect_insert(UrlMapping).from_select(
+            [
+                "original_url", "original_url_hash", "original_url_host", "short_url",
+                "url_type", "created_at", "updated_at", "expires_at",
+            ],
+            staged,
+        ).on_conflict_do_nothing()
+        return self.conn.execute(stmt).rowcount
+
+    def _delete_expired(self) -> None:
+        """
+        Delete expired, not yet swept rows for staged URLs, as creates do, so
+        the URLs get new links instead of being skipped as duplicates.
+        """
+        self.conn.execute(
+            delete(UrlMapping).where(
+                UrlMapping.original_url_hash.in_(select(url_import.c.original_url_hash)),
+                UrlMapping.expires_at <= datetime.utcnow(),
+            )
+        )
+
+    def _drop_stored(self) -> int:
+        """
+        Drop staged rows whose original URL is stored now: ones already there
+        before the chunk, ones just inserted, and ones a concurrent create won.
+        """
+        return self.conn.execute(
+            delete(url_import).where(
+                exists().where(UrlMapping.original_url_hash == url_import.c.original_url_hash)
+            )
+        ).rowcount
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Store one chunk of distinct original URLs and commit.
+        """
+        self._copy(rows)
+        self._delete_expired()
+        self.progress.duplicates += self._drop_stored()
+        for _ in range(MAX_CREATE_ATTEMPTS):
+            inserted = self._insert_staged()
+            self.progress.written += inserted
+            self.progress.duplicates += self._drop_stored() - inserted
+            # What is left collided on the short code.
+            self.progress.conflicts += self.conn.execute(
+                delete(url_import).where(url_import.c.keep_code)
+            ).rowcount
+            collided = self.conn.execute(select(url_import.c.id, url_import.c.original_url_hash)).all()
+            if not collided:
+                break
+            codes = self.allocate([original_url_hash for _, original_url_hash in collided])
+            self.conn.execute(
+                update(url_import)
+                .where(url_import.c.id == bindparam("row_id"))
+                .values(short_url=bindparam("code")),
+                [{"row_id": row_id, "code": code} for (row_id, _), code in zip(collided, codes)],
+            )
+        else:
+            self.progress.conflicts += self.conn.execute(delete(url_import)).rowcount
+        self.conn.commit()
+
+
+def _prepare(record: Dict[str, Any], progress: TransferProgress, now: datetime) -> Optional[Dict[str, Any]]:
+    original_url = record.get("original_url")
+    if not isinstance(original_url, str) or not URLUtils.is_valid_url(original_url.strip()):
+        progress.invalid += 1
+        return None
+    original_url = URLUtils.stored_url(original_url.strip())
+    short_url = record.get("short_url") or None
+    try:
+        created_at = _parse_time(record.get("created_at"))
+        expires_at = _parse_time(record.get("expires_at"))
+    except (TypeError, ValueError):
+        progress.invalid += 1
+        return None
+    if short_url is not None and (
+        not isinstance(short_url, str)
+        or len(short_url) > UrlMapping.short_url.type.length
+        or not _SHORT_URL_CHARS.issuperset(short_url)
+    ):
+        progress.invalid += 1
+        return None
+    if expires_at is not None and expires_at <= now:
+        progress.expired += 1
+        return None
+    return dict(
+        original_url=original_url,
+        original_url_hash=URLUtils.url_digest(original_url),
+        original_url_host=URLUtils.url_host(original_url),
+        short_url=short_url,
+        keep_code=short_url is not None,
+        created_at=created_at,
+        expires_at=expires_at,
+    )
+
+
+def _shard_for(row: Dict[str, Any]):
+    if not shard_router.enabled:
+        return None
+    if row["keep_code"]:
+        return shard_router.shard_for_bucket(bucket_for_short_url(row["short_url"]))
+    return shard_router.shard_for_hash(row["original_url_hash"])
+
+
+def _stored_on_other_shards(rows: Iterable[Dict[str, Any]]) -> Set[bytes]:
+    """
+    Digests of rows whose URL a shard other than their own already has:
+    the digest's shard, or the shard of an older or imported code of
+    another bucket. Each loader only deduplicates on its own shard.
+    """
+    by_shard = defaultdict(list)
+    for row in rows:
+        own_shard = _shard_for(row)
+        for shard in shard_router.shards:
+            if shard is not own_shard:
+                by_shard[shard].append(row["original_url_hash"])
+    stored = set()
+    for shard, hashes in by_shard.items():
+        with shard.session_scope() as db:
+            found = crud_url.get_urls_by_hashes(db=db, hashes=hashes)
+        stored.update(digest for digest, row in found.items() if not is_expired(row.expires_at))
+    return stored
+
+
+def import_mappings(records: Iterable[Dict[str, Any]], chunk_size: int = IMPORT_CHUNK_SIZE) -> TransferProgress:
+    """
+    Store short URLs from a stream of records, `chunk_size` at a time.
+
+    Each record needs `original_url`, and may carry `short_url`,
+    `created_at` and `expires_at` (ISO 8601, UTC unless it has an offset),
+    as written by `export_mappings`. Records whose original URL is already
+    stored, in the database or earlier in the stream, are skipped, as are
+    invalid and expired ones. A given short code is kept, and counted as a
+    conflict if it is taken; records without one get codes from the short
+    code allocator in bulk.
+
+    Every chunk is loaded into a temporary staging table, with `COPY` on
+    PostgreSQL, then moved into url_mappings with one set-based
+    `INSERT ... SELECT` and committed. A URL whose link has expired, but not
+    been swept yet, gets a new one. With sharding each shard has its own
+    staging table; a kept code is stored on the shard of its bucket, and
+    a record is skipped if any shard already has its URL. Do not import
+    while a bucket is being moved.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): The records, e.g. from `read_records`.
+        chunk_size (int): Records per staging load and transaction.
+
+    Returns:
+        TransferProgress: The final counts.
+    """
+    progress = TransferProgress("imported")
+    records = iter(records)
+    with ExitStack() as stack:
+        allocation_db = stack.enter_context(session_scope())
+
+        def allocate(hashes: List[bytes]) -> List[str]:
+            codes = short_code_allocator.allocate_many(db=allocation_db, count=len(hashes))
+            return [shard_router.prefix(original_url_hash, code) for original_url_hash, code in zip(hashes, codes)]
+
+        loaders = {}
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            progress.read += len(chunk)
+            now = datetime.utcnow()
+            prepared = {}
+            for record in chunk:
+                row = _prepare(record, progress, now)
+                if row is None:
+                    continue
+                # Deduplicated over the chunk, not per shard: a kept code can
+                # place its URL on another shard than the URL's digest.
+                if row["original_url_hash"] in prepared:
+                    progress.duplicates += 1
+                    continue
+                prepared[row["original_url_hash"]] = row
+            by_shard = defaultdict(dict)
+            stored = _stored_on_other_shards(prepared.values()) if shard_router.enabled else set()
+            progress.duplicates += len(stored)
+            for digest, row in prepared.items():
+                if digest not in stored:
+                    by_shard[_shard_for(row)][digest] = row
+            for shard, rows in by_shard.items():
+                new_rows = [row for row in rows.values() if row["short_url"] is None]
+                if new_rows:
+                    for row, short_url in zip(new_rows, allocate([row["original_url_hash"] for row in new_rows])):
+                        row["short_url"] = short_url
+                if shard not in loaders:
+                    loaders[shard] = stack.enter_context(
+                        _StagingLoader(shard.engine if shard else engine, allocate, progress)
+                    )
+                loaders[shard].load(list(rows.values()))
+            progress.report()
+    progress.report(force=True)
+    return progress
+
+
+def export_mappings(handle: TextIO, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> TransferProgress:
+    """
+    Write every unexpired short URL as CSV with a header row, or as JSON
+    lines, in the format `import_mappings` reads.
+
+    Rows are streamed from a server-side cursor `batch_size` at a time, one
+    database after another when sharded, so the result set is never held
+    in memory.
+
+    Args:
+        handle (TextIO): Where to write.
+        fmt (str): "csv" or "jsonl".
+        batch_size (int): Rows fetched per round trip.
+
+    Returns:
+        TransferProgress: The final counts.
+    """
+    progress = TransferProgress("exported")
+    writer = csv.writer(handle) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(FIELDS)
+    columns = [getattr(UrlMapping, field) for field in FIELDS]
+    for session_factory in url_mapping_sources().values():
+        with session_factory() as db:
+            result = db.execute(select(*columns).where(unexpired()).execution_options(yield_per=batch_size))
+            for short_url, original_url, created_at, expires_at in result:
+                values = (short_url, original_url, _format_time(created_at), _format_time(expires_at))
+                if writer is not None:
+                    writer.writerow(values)
+                else:
+                    handle.write(json.dumps(dict(zip(FIELDS, values))) + "\n")
+                progress.read += 1
+                progress.written += 1
+                progress.report()
+    progress.report(force=True)
+    return progress
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Bulk import and export short URLs as CSV or JSON lines.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Load short URLs from a file, or stdin.")
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    export_parser = commands.add_parser("export", help="Write every unexpired short URL to a file, or stdout.")
+    export_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    for command in (import_parser, export_parser):
+        command.add_argument("path", nargs="?", default="-", help="Use - for stdin or stdout.")
+        command.add_argument(
+            "--format", choices=("csv", "jsonl"), help="Defaults to jsonl for .jsonl files, else csv."
+        )
+    args = parser.parse_args()
+    fmt = args.format or ("jsonl" if args.path.endswith(".jsonl") else "csv")
+    if shard_router.enabled:
+        shard_router.refresh()
+    if args.command == "import":
+        handle = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        with handle:
+            import_mappings(read_records(handle, fmt), chunk_size=args.chunk_size)
+    else:
+        handle = sys.stdout if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+        with handle:
+            export_mappings(handle, fmt, batch_size=args.batch_size)
@@ -1,12 +1,121 @@
-from app.models.url import UrlMapping
-from app.schemas.url import URLCreate, UrlType
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import status
+from app.models.url import RedirectPolicy, UrlMapping
+from app.schemas.url import URLCreate
 from sqlalchemy.orm import Session
+from app.cache.backends import shared_cache
+from app.cache.bloom import short_code_filter
+from app.cache.local import MISSING, url_cache
+from app.cache.snapshot import redirect_snapshot
+from app.db.replicas import read_connection_scope, read_session_scope, replica_set
+from app.db.session import connection_scope, session_scope
+from app.db.shards import shard_router
+from app.services.short_codes import short_code_allocator
+from app.crud.url import CRUDUrl, is_expired, mapping_cache_value
+from app.crud.url_core import CoreUrlQueries
+from app.schemas.url import URLBatchError, URLBatchItemResult, URLBatchResponse, URLResponse
+from app.error_code.common_errors import CommonErrorCatalog, CommonErrorCode
+from app.error_code.error_manager import error_manager
 from app.utils.url_helpers import URLUtils
-from app.crud.url import CRUDUrl
-from app.schemas.url import URLResponse
+from app.services.coalescing import CreateCoalescer
+from app.services.redirect_policy import Redirect, redirect_for
+from app.services.single_flight import SingleFlight
 from app.core.config import settings
 
 crud_url = CRUDUrl()
+core_url_queries = CoreUrlQueries()
+
+# Upsert attempts before giving up on short code collisions.
+MAX_CREATE_ATTEMPTS = 10
+
+
+def _batch_error(error_code: int, error_message: Optional[str] = None) -> URLBatchError:
+    error = dict(CommonErrorCatalog.error_mapping[error_code])
+    if error_message:
+        error["msg"] = error_message
+    return URLBatchError(**error)
+
+
+class UrlBatchPlan:
+    """
+    Validation and in-batch deduplication for a batch create.
+
+    Each distinct original URL is resolved once, with the expiry and
+    redirect policy of its first item; `rows` collects the stored row per URL digest as existing
+    rows are found and new ones inserted.
+    """
+
+    def __init__(self, items: List[URLCreate]):
+        self.item_hashes: List[Optional[bytes]] = []
+        self.urls: Dict[bytes, str] = {}
+        self.expires: Dict[bytes, Optional[datetime]] = {}
+        self.policies: Dict[bytes, RedirectPolicy] = {}
+        self.rows: Dict[bytes, Any] = {}
+        for item in items:
+            if not URLUtils.is_valid_url(item.original_url):
+                self.item_hashes.append(None)
+                continue
+            digest = URLUtils.url_digest(item.original_url)
+            if digest not in self.urls:
+                self.urls[digest] = URLUtils.stored_url(item.original_url)
+                self.expires[digest] = UrlServices.expires_at_for(item)
+                self.policies[digest] = UrlServices.redirect_policy_for(item)
+            self.item_hashes.append(digest)
+
+    def pending(self, within: Optional[Dict[bytes, str]] = None) -> Dict[bytes, str]:
+        urls = self.urls if within is None else within
+        return {digest: url for digest, url in urls.items() if digest not in self.rows}
+
+    def add_rows(self, rows: Dict[bytes, Any]) -> None:
+        self.rows.update(rows)
+
+    def add_existing_rows(self, rows: Dict[bytes, Any]) -> List[bytes]:
+        """
+        Add rows found by digest, except those that have expired. Returns the
+        digests of the expired ones; the caller deletes them so the URLs get
+        new links.
+        """
+        expired = [digest for digest, row in rows.items() if is_expired(row.expires_at)]
+        self.add_rows({digest: row for digest, row in rows.items() if digest not in expired})
+        return expired
+
+    def new_mappings(
+        self, short_urls: Dict[bytes, str]
+    ) -> List[Tuple[str, str, Optional[datetime], RedirectPolicy]]:
+        return [
+            (self.urls[digest], short_url, self.expires[digest], self.policies[digest])
+            for digest, short_url in short_urls.items()
+        ]
+
+    def created_rows(self) -> List[Any]:
+        return [row for row in self.rows.values() if row.created]
+
+    def response(self) -> URLBatchResponse:
+        results = []
+        for index, digest in enumerate(self.item_hashes):
+            if digest is None:
+                results.append(URLBatchItemResult(
+                    index=index, error=_batch_error(CommonErrorCode.INVALID_URL)
+                ))
+            elif digest not in self.rows:
+                results.append(URLBatchItemResult(
+                    index=index,
+                    error=_batch_error(
+                        CommonErrorCode.INTERNAL_SERVER_ERROR,
+                        "Could not allocate a unique short URL",
+                    ),
+                ))
+            else:
+                row = self.rows[digest]
+                results.append(URLBatchItemResult(
+                    index=index,
+                    result=UrlServices.build_url_response(
+                        db_obj=row, short_url_exists=not row.created
+                    ),
+                ))
+        return URLBatchResponse(results=results)
 
 
 class UrlServices:
@@ -22,48 +131,431 @@ class UrlServices:
         Returns:
             bool: True if the URL exists, False otherwise.
         """
-        return crud_url.get_url_by_original_url(db=db, original_url=url_in.original_url) is not None
+        if settings.DB_CORE_QUERIES_ENABLED:
+            url_obj = core_url_queries.get_url_by_original_url(
+                conn=db.connection(), original_url=url_in.original_url
+            )
+        else:
+            url_obj = crud_url.get_url_by_original_url(db=db, original_url=url_in.original_url)
+        return url_obj is not None
 
     @staticmethod
     def create_url_mapping(db: Session, url_in: URLCreate) -> URLResponse:
         """
-        Create a new URL mapping in the database.
+        Create a new URL mapping in the database, or return the existing one.
+
+        A single upsert statement both deduplicates by original URL and
+        inserts, so concurrent requests for the same URL cannot both insert.
+        With create coalescing enabled, concurrent calls are grouped and
+        written through `create_url_mappings` in one transaction instead.
+        A URL whose link has expired, but not been swept yet, gets a new one.
+        Concurrent calls for the same URL in this process share one write.
+        URLs are deduplicated by their canonical form (see
+        `URLUtils.canonicalize_url`).
 
         Args:
             db (Session): The database session.
             url_in (URLCreate): The URL creation schema containing the original URL.
 
         Returns:
-            UrlMapping: The created UrlMapping object.
+            URLResponse: The created or existing mapping.
+
+        Raises:
+            HTTPException: 400 `INVALID_URL` if the URL is not valid.
         """
-        short_url_exists = False
-        if UrlServices.check_if_url_exists(db=db, url_in=url_in):
-            db_obj = UrlServices.get_url_mapping_by_original_url(
-                db=db, original_url=url_in.original_url
+        UrlServices.check_url(url_in)
+        if create_flight is None:
+            return UrlServices.write_url_mapping(db=db, url_in=url_in)
+        response, joined = create_flight.do(
+            URLUtils.url_digest(url_in.original_url), lambda: UrlServices.write_url_mapping(db=db, url_in=url_in)
+        )
+        return UrlServices.joined_url_response(response) if joined else response
+
+    @staticmethod
+    def check_url(url_in: URLCreate) -> None:
+        """
+        Reject an invalid original URL with the error a batch item gets, before
+        single-flight or coalescing can pick the request up.
+
+        Args:
+            url_in (URLCreate): The URL creation schema containing the original URL.
+        """
+        if not URLUtils.is_valid_url(url_in.original_url):
+            raise error_manager.error_responder(
+                status_code=status.HTTP_400_BAD_REQUEST, error_code=CommonErrorCode.INVALID_URL
             )
-            short_url_exists = True
-        else:
-            while True:
-                short_url = URLUtils.generate_random_short_url()
-                existing_url = db.query(UrlMapping).filter(
-                    UrlMapping.short_url == short_url
-                ).first()
-                if not existing_url:
+
+    @staticmethod
+    def write_url_mapping(db: Session, url_in: URLCreate) -> URLResponse:
+        """
+        Create or return the mapping for one URL: `create_url_mapping`
+        without single-flight.
+
+        Args:
+            db (Session): The database session.
+            url_in (URLCreate): The URL creation schema containing the original URL.
+
+        Returns:
+            URLResponse: The created or existing mapping.
+        """
+        if create_coalescer is not None:
+            return create_coalescer.submit(db=db, url_in=url_in)
+        digest = URLUtils.url_digest(url_in.original_url)
+        expires_at = UrlServices.expires_at_for(url_in)
+        elsewhere = UrlServices.find_on_other_shards([digest])
+        if digest in elsewhere:
+            return UrlServices.build_url_response(db_obj=elsewhere[digest], short_url_exists=True)
+        with shard_router.write_session(db, shard_router.shard_for_hash(digest)) as shard_db:
+            for _ in range(MAX_CREATE_ATTEMPTS):
+                short_url = shard_router.prefix(digest, short_code_allocator.allocate(db=db))
+                row = crud_url.upsert_url_mapping(
+                    db=shard_db,
+                    original_url=URLUtils.stored_url(url_in.original_url),
+                    short_url=short_url,
+                    expires_at=expires_at,
+                    policy=UrlServices.redirect_policy_for(url_in),
+                )
+                if row is not None and is_expired(row.expires_at):
+                    # The URL's old link has expired but not been swept yet.
+                    crud_url.delete_expired_by_hashes(db=shard_db, hashes=[digest])
+                elif row is not None:
                     break
+            else:
+                raise RuntimeError("Could not allocate a unique short URL")
+        if row.created:
+            UrlServices.register_new_mapping(short_url=row.short_url)
+        return UrlServices.build_url_response(db_obj=row, short_url_exists=not row.created)
 
-            db_url = UrlMapping(
-                original_url=url_in.original_url,
-                short_url=short_url,
-                url_type=UrlType.RANDOM,
-            )
-            db_obj = crud_url.create_url_mapping(db=db, url_mapping=db_url)
+    @staticmethod
+    def create_url_mappings(db: Session, items: List[URLCreate]) -> URLBatchResponse:
+        """
+        Create URL mappings for a batch of URLs in one transaction, or one
+        per shard when sharding is on.
+
+        Existing mappings are resolved with one set-based query, codes for the
+        rest are allocated up front and inserted with a single multi-row
+        statement. Items that fail validation or allocation are reported
+        individually instead of failing the batch.
+
+        Args:
+            db (Session): The database session.
+            items (List[URLCreate]): The URLs to shorten.
+
+        Returns:
+            URLBatchResponse: One result per item, in input order.
+        """
+        plan = UrlBatchPlan(items)
+        plan.add_rows(UrlServices.find_on_other_shards(plan.urls))
+        for shard, urls in shard_router.group_by_shard(plan.pending()).items():
+            with shard_router.write_session(db, shard) as shard_db:
+                UrlServices.create_in_shard(db=db, shard_db=shard_db, plan=plan, urls=urls)
+        created = plan.created_rows()
+        crud_url.cache_url_mappings(created)
+        for row in created:
+            UrlServices.register_new_mapping(short_url=row.short_url)
+        return plan.response()
+
+    @staticmethod
+    def create_in_shard(db: Session, shard_db: Session, plan: UrlBatchPlan, urls: Dict[bytes, str]) -> None:
+        """
+        Resolve or insert the batch URLs that belong to one shard, and commit.
+
+        Args:
+            db (Session): The primary session, used for short code allocation.
+            shard_db (Session): The session the mappings are stored through;
+                the primary session itself when sharding is off.
+            plan (UrlBatchPlan): The batch, updated with the stored rows.
+            urls (Dict[bytes, str]): The digests and URLs of this shard.
+        """
+        expired = plan.add_existing_rows(crud_url.get_urls_by_hashes(db=shard_db, hashes=urls))
+        crud_url.delete_expired_by_hashes(db=shard_db, hashes=expired)
+        for _ in range(MAX_CREATE_ATTEMPTS):
+            pending = plan.pending(within=urls)
+            if not pending:
+                break
+            short_urls = {
+                digest: shard_router.prefix(digest, short_url)
+                for digest, short_url in zip(
+                    pending, short_code_allocator.allocate_many(db=db, count=len(pending))
+                )
+            }
+            inserted = crud_url.bulk_insert_url_mappings(db=shard_db, mappings=plan.new_mappings(short_urls))
+            plan.add_rows({row.original_url_hash: row for row in inserted})
+            if len(inserted) < len(pending):
+                # Lost a race on the original URL or collided on the short code.
+                plan.add_rows(crud_url.get_urls_by_hashes(db=shard_db, hashes=plan.pending(within=urls)))
+        shard_db.commit()
+
+    @staticmethod
+    def find_on_other_shards(hashes: Iterable[bytes]) -> Dict[bytes, Any]:
+        """
+        Look up digests on the shards other than the one their new mappings
+        are written to, so a URL stored off its digest's shard (see
+        `ShardRouter.other_shards`) is not created twice. Empty unless
+        sharding is on with several shards; expired rows are left out.
+
+        Args:
+            hashes (Iterable[bytes]): Digests from URLUtils.url_digest.
+
+        Returns:
+            Dict[bytes, Any]: Stored rows keyed by digest.
+        """
+        found = {}
+        for shard, shard_hashes in shard_router.other_shards(hashes).items():
+            with shard.session_scope() as db:
+                rows = crud_url.get_urls_by_hashes(db=db, hashes=shard_hashes)
+            found.update({digest: row for digest, row in rows.items() if not is_expired(row.expires_at)})
+        return found
+
+    @staticmethod
+    def expires_at_for(url_in: URLCreate) -> Optional[datetime]:
+        """
+        UTC expiry for a new link: `expires_in_seconds` from the request,
+        else `URL_DEFAULT_TTL_SECONDS`, else none.
+
+        Args:
+            url_in (URLCreate): The URL creation schema.
+
+        Returns:
+            Optional[datetime]: The expiry, or None for a link that never expires.
+        """
+        ttl = url_in.expires_in_seconds or settings.URL_DEFAULT_TTL_SECONDS
+        if ttl <= 0:
+            return None
+        return datetime.utcnow() + timedelta(seconds=ttl)
+
+    @staticmethod
+    def redirect_policy_for(url_in: URLCreate) -> RedirectPolicy:
+        """
+        Redirect policy overrides for a new link, from the request. Unset
+        fields follow the REDIRECT_* settings at redirect time.
+
+        Args:
+            url_in (URLCreate): The URL creation schema.
+
+        Returns:
+            RedirectPolicy: The overrides to store with the link.
+        """
+        return RedirectPolicy(url_in.redirect_status, url_in.cache_max_age, url_in.cache_stale_while_revalidate)
+
+    @staticmethod
+    def build_url_response(db_obj: Any, short_url_exists: bool) -> URLResponse:
+        """
+        Build the API response for a stored URL mapping.
+
+        Args:
+            db_obj (Any): The stored mapping, as a UrlMapping or upsert row.
+            short_url_exists (bool): Whether the mapping already existed.
+
+        Returns:
+            URLResponse: The response schema.
+        """
         return URLResponse(
-            short_url=f"http://localhost:{settings.BACKEND_PORT}/{db_obj.short_url}",
+            short_url=UrlServices.short_link(db_obj.short_url),
             original_url=db_obj.original_url,
             is_short_url_exists=short_url_exists,
             created_at=db_obj.created_at,
+            expires_at=db_obj.expires_at,
+            redirect_status=db_obj.redirect_status,
+            cache_max_age=db_obj.cache_max_age,
+            cache_stale_while_revalidate=db_obj.cache_stale_while_revalidate,
         )
 
+    @staticmethod
+    def short_link(short_url: str) -> str:
+        """
+        The public link for a short code.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            str: The link that redirects to the original URL.
+        """
+        return f"http://localhost:{settings.BACKEND_PORT}/{short_url}"
+
+    @staticmethod
+    def joined_url_response(response: URLResponse) -> URLResponse:
+        """
+        The response for a create that joined a concurrent one for the same
+        URL: the link exists by the time it is returned.
+
+        Args:
+            response (URLResponse): The response of the call that ran.
+
+        Returns:
+            URLResponse: The same mapping, marked as existing.
+        """
+        if response.is_short_url_exists:
+            return response
+        return response.model_copy(update={"is_short_url_exists": True})
+
+    @staticmethod
+    def resolve_original_url(short_url: str) -> Optional[str]:
+        """
+        Resolve a short code to its original URL, through `resolve_redirect`.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[str]: The original URL if found, else None.
+        """
+        redirect = UrlServices.resolve_redirect(short_url)
+        return redirect.url if redirect else None
+
+    @staticmethod
+    def resolve_redirect(short_url: str) -> Optional[Redirect]:
+        """
+        Resolve a short code to its redirect for the redirect path.
+
+        Reads through the per-worker cache, the redirect snapshot and then the
+        shared cache tier, and only opens a database session when all miss, on
+        a read replica when one is healthy. Unknown short codes are cached
+        negatively, and codes the short code filter has never seen are rejected
+        without a database session. Values carry the link's expiry and redirect
+        policy, so every tier rejects expired links and none needs the database
+        to pick the status and Cache-Control header.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[Redirect]: The redirect if found, else None.
+        """
+        cached = UrlServices.resolve_in_process(short_url)
+        if cached is MISSING:
+            if redirect_flight is None:
+                cached = UrlServices.load_cached_value(short_url)
+            else:
+                cached, _ = redirect_flight.do(short_url, lambda: UrlServices.load_cached_value(short_url))
+        return redirect_for(cached)
+
+    @staticmethod
+    def load_cached_value(short_url: str) -> Optional[str]:
+        """
+        Resolve a short code missing from the in-process tiers, through the
+        shared cache tier and the database, and cache the answer. With
+        single-flight on, one call per code runs at a time in this process.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[str]: The cached value, as written by `cache_value`,
+            or None if not found.
+        """
+        cached = shared_cache.get(short_url)
+        if cached is not MISSING:
+            url_cache.set(short_url, cached)
+            return cached
+        if not short_code_filter.might_contain(short_url):
+            return None
+        url_obj = UrlServices.find_by_short_url(short_url=short_url)
+        cached = mapping_cache_value(url_obj) if url_obj else None
+        url_cache.set(short_url, cached)
+        shared_cache.set(short_url, cached)
+        return cached
+
+    @staticmethod
+    def resolve_in_process(short_url: str) -> Any:
+        """
+        Look a short code up in the per-worker cache and the redirect
+        snapshot only, which never block.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            The cached value, None if the code is known not to resolve, or
+            `MISSING` when the shared tier or the database must be asked.
+            Expiry is checked by `redirect_for`.
+        """
+        cached = url_cache.get(short_url)
+        if cached is not MISSING:
+            return cached
+        cached = redirect_snapshot.get(short_url)
+        if cached is not None:
+            return cached
+        return MISSING
+
+    @staticmethod
+    def find_by_short_url(short_url: str) -> Optional[Any]:
+        """
+        Look up an unexpired short code in the database for the redirect path:
+        on its shard when sharding is on, else on a read replica when one is
+        healthy. With `DB_CORE_QUERIES_ENABLED` the lookup is a prebuilt Core
+        statement on a bare connection; otherwise an ORM query on a Session.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[Any]: A row or mapping with `original_url`,
+            `expires_at` and the redirect policy columns if found, else None.
+        """
+        core = settings.DB_CORE_QUERIES_ENABLED
+        if shard_router.enabled:
+            for shard in shard_router.shards_for_short_url(short_url):
+                with (shard.connection_scope() if core else shard.session_scope()) as db:
+                    url_obj = UrlServices.lookup_short_url(db, short_url)
+                if url_obj is not None:
+                    return url_obj
+            return None
+        with (read_connection_scope if core else read_session_scope)(short_url) as db:
+            url_obj = UrlServices.lookup_short_url(db, short_url)
+            from_replica = "replica" in db.info
+        if url_obj is None and from_replica:
+            # The replica may not have replayed the insert yet; confirm on the
+            # primary before caching the miss.
+            with (connection_scope if core else session_scope)() as db:
+                url_obj = UrlServices.lookup_short_url(db, short_url)
+        return url_obj
+
+    @staticmethod
+    def lookup_short_url(db: Any, short_url: str) -> Optional[Any]:
+        """
+        Run the short code lookup on a connection or a session, whichever
+        `find_by_short_url` opened. A code not found may be an alias left by
+        the canonicalization merge job, which lives on the same database as
+        its target; it resolves like the target.
+
+        Args:
+            db (Connection | Session): The connection or database session.
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[Any]: The row or mapping if found, else None.
+        """
+        if settings.DB_CORE_QUERIES_ENABLED:
+            url_obj = core_url_queries.get_url_by_short_url(conn=db, short_url=short_url)
+            if url_obj is None:
+                target = core_url_queries.get_alias_target(conn=db, short_url=short_url)
+                if target is not None:
+                    url_obj = core_url_queries.get_url_by_short_url(conn=db, short_url=target)
+            return url_obj
+        url_obj = crud_url.get_url_by_short_url(db=db, short_url=short_url)
+        if url_obj is None:
+            target = crud_url.get_alias_target(db=db, short_url=short_url)
+            if target is not None:
+                url_obj = crud_url.get_url_by_short_url(db=db, short_url=target)
+        return url_obj
+
+    @staticmethod
+    def register_new_mapping(short_url: str) -> None:
+        """
+        Update per-worker lookup state after a mapping is created: drop any
+        cached miss for the code, add it to the short code filter and pin its
+        reads to the primary while replicas catch up. The shared tier is kept
+        current by `CRUDUrl` write-through.
+
+        Args:
+            short_url (str): The short URL string.
+        """
+        url_cache.invalidate(short_url)
+        short_code_filter.add(short_url)
+        replica_set.mark_written(short_url)
+
     @staticmethod
     def get_url_mapping(db: Session, short_url: str) -> UrlMapping:
         """
@@ -92,4 +584,18 @@ class UrlServices:
         Returns:
             UrlMapping: The UrlMapping object if found, else None.
         """
-        return crud_url.get_url_by_original_url(db=db, original_url=original_url)
\ No newline at end of file
+        return crud_url.get_url_by_original_url(db=db, original_url=original_url)
+
+
+redirect_flight = SingleFlight("redirect") if settings.SINGLE_FLIGHT_ENABLED else None
+create_flight = SingleFlight("create") if settings.SINGLE_FLIGHT_ENABLED else None
+
+create_coalescer = (
+    CreateCoalescer(
+        max_wait_ms=settings.CREATE_COALESCING_MAX_WAIT_MS,
+        max_group_size=settings.CREATE_COALESCING_MAX_GROUP_SIZE,
+        write_group=lambda db, items: UrlServices.create_url_mappings(db=db, items=items),
+    )
+    if settings.CREATE_COALESCING_ENABLED
+    else None
+)
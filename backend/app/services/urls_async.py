@@ -0,0 +1,259 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.url import URLCreate
+from app.cache.backends import shared_cache
+from app.cache.bloom import short_code_filter
+from app.cache.local import MISSING, url_cache
+from app.db.replicas import async_read_connection_scope, async_read_session_scope
+from app.db.session import async_connection_scope, async_session_scope
+from app.db.shards import shard_router
+from app.services.short_codes import short_code_allocator
+from app.crud.url import is_expired, mapping_cache_value
+from app.crud.url_async import AsyncCRUDUrl
+from app.crud.url_core import AsyncCoreUrlQueries
+from app.schemas.url import URLBatchResponse, URLResponse
+from app.services.urls import MAX_CREATE_ATTEMPTS, UrlBatchPlan, UrlServices
+from app.services.coalescing import AsyncCreateCoalescer
+from app.services.redirect_policy import Redirect, redirect_for
+from app.services.single_flight import AsyncSingleFlight
+from app.utils.url_helpers import URLUtils
+from app.core.config import settings
+
+async_crud_url = AsyncCRUDUrl()
+async_core_url_queries = AsyncCoreUrlQueries()
+
+
+class AsyncUrlServices:
+    """
+    Async counterparts of `UrlServices`, used when `DB_ASYNC_ENABLED` is set.
+    """
+
+    @staticmethod
+    async def create_url_mapping(db: AsyncSession, url_in: URLCreate) -> URLResponse:
+        """
+        Create a new URL mapping in the database, or return the existing one.
+
+        Concurrent calls for the same URL share one write, which runs on its
+        own session so it outlives a caller that goes away.
+
+        Args:
+            db (AsyncSession): The async database session.
+            url_in (URLCreate): The URL creation schema containing the original URL.
+
+        Returns:
+            URLResponse: The created or existing mapping.
+
+        Raises:
+            HTTPException: 400 `INVALID_URL` if the URL is not valid.
+        """
+        UrlServices.check_url(url_in)
+        if async_create_flight is None:
+            return await AsyncUrlServices.write_url_mapping(db=db, url_in=url_in)
+        response, joined = await async_create_flight.do(URLUtils.url_digest(url_in.original_url), lambda: _write_url_mapping(url_in))
+        return UrlServices.joined_url_response(response) if joined else response
+
+    @staticmethod
+    async def write_url_mapping(db: AsyncSession, url_in: URLCreate) -> URLResponse:
+        """
+        See `UrlServices.write_url_mapping`.
+        """
+        if async_create_coalescer is not None:
+            return await async_create_coalescer.submit(url_in=url_in)
+        digest = URLUtils.url_digest(url_in.original_url)
+        expires_at = UrlServices.expires_at_for(url_in)
+        elsewhere = await AsyncUrlServices.find_on_other_shards([digest])
+        if digest in elsewhere:
+            return UrlServices.build_url_response(db_obj=elsewhere[digest], short_url_exists=True)
+        async with shard_router.async_write_session(db, shard_router.shard_for_hash(digest)) as shard_db:
+            for _ in range(MAX_CREATE_ATTEMPTS):
+                short_url = shard_router.prefix(digest, await short_code_allocator.allocate_async(db=db))
+                row = await async_crud_url.upsert_url_mapping(
+                    db=shard_db,
+                    original_url=URLUtils.stored_url(url_in.original_url),
+                    short_url=short_url,
+                    expires_at=expires_at,
+                    policy=UrlServices.redirect_policy_for(url_in),
+                )
+                if row is not None and is_expired(row.expires_at):
+                    await async_crud_url.delete_expired_by_hashes(db=shard_db, hashes=[digest])
+                elif row is not None:
+                    break
+            else:
+                raise RuntimeError("Could not allocate a unique short URL")
+        if row.created:
+            UrlServices.register_new_mapping(short_url=row.short_url)
+        return UrlServices.build_url_response(db_obj=row, short_url_exists=not row.created)
+
+    @staticmethod
+    async def create_url_mappings(db: AsyncSession, items: List[URLCreate]) -> URLBatchResponse:
+        """
+        Create URL mappings for a batch of URLs in one transaction, or one
+        per shard when sharding is on.
+
+        See `UrlServices.create_url_mappings`.
+        """
+        plan = UrlBatchPlan(items)
+        plan.add_rows(await AsyncUrlServices.find_on_other_shards(plan.urls))
+        for shard, urls in shard_router.group_by_shard(plan.pending()).items():
+            async with shard_router.async_write_session(db, shard) as shard_db:
+                await AsyncUrlServices.create_in_shard(db=db, shard_db=shard_db, plan=plan, urls=urls)
+        created = plan.created_rows()
+        await async_crud_url.cache_url_mappings(created)
+        for row in created:
+            UrlServices.register_new_mapping(short_url=row.short_url)
+        return plan.response()
+
+    @staticmethod
+    async def create_in_shard(
+        db: AsyncSession, shard_db: AsyncSession, plan: UrlBatchPlan, urls: Dict[bytes, str]
+    ) -> None:
+        """
+        See `UrlServices.create_in_shard`.
+        """
+        existing = await async_crud_url.get_urls_by_hashes(db=shard_db, hashes=urls)
+        expired = plan.add_existing_rows(existing)
+        await async_crud_url.delete_expired_by_hashes(db=shard_db, hashes=expired)
+        for _ in range(MAX_CREATE_ATTEMPTS):
+            pending = plan.pending(within=urls)
+            if not pending:
+                break
+            allocated = await short_code_allocator.allocate_many_async(db=db, count=len(pending))
+            short_urls = {
+                digest: shard_router.prefix(digest, short_url) for digest, short_url in zip(pending, allocated)
+            }
+            inserted = await async_crud_url.bulk_insert_url_mappings(
+                db=shard_db, mappings=plan.new_mappings(short_urls)
+            )
+            plan.add_rows({row.original_url_hash: row for row in inserted})
+            if len(inserted) < len(pending):
+                plan.add_rows(
+                    await async_crud_url.get_urls_by_hashes(db=shard_db, hashes=plan.pending(within=urls))
+                )
+        await shard_db.commit()
+
+    @staticmethod
+    async def find_on_other_shards(hashes: Iterable[bytes]) -> Dict[bytes, Any]:
+        """
+        See `UrlServices.find_on_other_shards`.
+        """
+        found = {}
+        for shard, shard_hashes in shard_router.other_shards(hashes).items():
+            async with shard.async_session_scope() as db:
+                rows = await async_crud_url.get_urls_by_hashes(db=db, hashes=shard_hashes)
+            found.update({digest: row for digest, row in rows.items() if not is_expired(row.expires_at)})
+        return found
+
+    @staticmethod
+    async def find_by_short_url(short_url: str) -> Optional[Any]:
+        """
+        See `UrlServices.find_by_short_url`.
+        """
+        core = settings.DB_CORE_QUERIES_ENABLED
+        if shard_router.enabled:
+            for shard in shard_router.shards_for_short_url(short_url):
+                async with (shard.async_connection_scope() if core else shard.async_session_scope()) as db:
+                    url_obj = await AsyncUrlServices.lookup_short_url(db, short_url)
+                if url_obj is not None:
+                    return url_obj
+            return None
+        async with (async_read_connection_scope if core else async_read_session_scope)(short_url) as db:
+            url_obj = await AsyncUrlServices.lookup_short_url(db, short_url)
+            from_replica = "replica" in db.info
+        if url_obj is None and from_replica:
+            async with (async_connection_scope if core else async_session_scope)() as db:
+                url_obj = await AsyncUrlServices.lookup_short_url(db, short_url)
+        return url_obj
+
+    @staticmethod
+    async def lookup_short_url(db: Any, short_url: str) -> Optional[Any]:
+        """
+        See `UrlServices.lookup_short_url`.
+        """
+        if settings.DB_CORE_QUERIES_ENABLED:
+            url_obj = await async_core_url_queries.get_url_by_short_url(conn=db, short_url=short_url)
+            if url_obj is None:
+                target = await async_core_url_queries.get_alias_target(conn=db, short_url=short_url)
+                if target is not None:
+                    url_obj = await async_core_url_queries.get_url_by_short_url(conn=db, short_url=target)
+            return url_obj
+        url_obj = await async_crud_url.get_url_by_short_url(db=db, short_url=short_url)
+        if url_obj is None:
+            target = await async_crud_url.get_alias_target(db=db, short_url=short_url)
+            if target is not None:
+                url_obj = await async_crud_url.get_url_by_short_url(db=db, short_url=target)
+        return url_obj
+
+    @staticmethod
+    async def resolve_original_url(short_url: str) -> Optional[str]:
+        """
+        See `UrlServices.resolve_original_url`.
+        """
+        redirect = await AsyncUrlServices.resolve_redirect(short_url)
+        return redirect.url if redirect else None
+
+    @staticmethod
+    async def resolve_redirect(short_url: str) -> Optional[Redirect]:
+        """
+        Resolve a short code to its redirect for the redirect path.
+
+        Same tiers and routing as `UrlServices.resolve_redirect`, without
+        blocking the event loop on the shared tier or the database.
+
+        Args:
+            short_url (str): The short URL string.
+
+        Returns:
+            Optional[Redirect]: The redirect if found, else None.
+        """
+        cached = UrlServices.resolve_in_process(short_url)
+        if cached is MISSING:
+            if async_redirect_flight is None:
+                cached = await AsyncUrlServices.load_cached_value(short_url)
+            else:
+                cached, _ = await async_redirect_flight.do(
+                    short_url, lambda: AsyncUrlServices.load_cached_value(short_url)
+                )
+        return redirect_for(cached)
+
+    @staticmethod
+    async def load_cached_value(short_url: str) -> Optional[str]:
+        """
+        See `UrlServices.load_cached_value`.
+        """
+        cached = await shared_cache.aget(short_url)
+        if cached is not MISSING:
+            url_cache.set(short_url, cached)
+            return cached
+        if not short_code_filter.might_contain(short_url):
+            return None
+        url_obj = await AsyncUrlServices.find_by_short_url(short_url=short_url)
+        cached = mapping_cache_value(url_obj) if url_obj else None
+        url_cache.set(short_url, cached)
+        await shared_cache.aset(short_url, cached)
+        return cached
+
+
+async def _write_url_mapping(url_in: URLCreate) -> URLResponse:
+    async with async_session_scope() as db:
+        return await AsyncUrlServices.write_url_mapping(db=db, url_in=url_in)
+
+
+async def _write_create_group(items: List[URLCreate]) -> URLBatchResponse:
+    async with async_session_scope() as db:
+        return await AsyncUrlServices.create_url_mappings(db=db, items=items)
+
+
+async_redirect_flight = AsyncSingleFlight("redirect") if settings.SINGLE_FLIGHT_ENABLED else None
+async_create_flight = AsyncSingleFlight("create") if settings.SINGLE_FLIGHT_ENABLED else None
+
+async_create_coalescer = (
+    AsyncCreateCoalescer(
+        max_wait_ms=settings.CREATE_COALESCING_MAX_WAIT_MS,
+        max_group_size=settings.CREATE_COALESCING_MAX_GROUP_SIZE,
+        write_group=_write_create_group,
+    )
+    if settings.CREATE_COALESCING_ENABLED
+    else None
+)
@@ -1,7 +1,45 @@
+import hashlib
 import random
+import re
 import string
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
 from app.core.config import settings
 
+URL_DIGEST_SIZE = 16
+MAX_URL_LENGTH = 2048
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+# An escape, or a stray "%" that starts none.
+_PERCENT_ESCAPE = re.compile("%([0-9A-Fa-f]{2})?")
+# RFC 3986 unreserved characters, which mean the same percent-encoded or not.
+_UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+
+_TRACKING_PARAMETERS = [
+    name.strip().lower() for name in settings.URL_TRACKING_PARAMETERS.split(",") if name.strip()
+]
+_TRACKING_NAMES = frozenset(name for name in _TRACKING_PARAMETERS if not name.endswith("*"))
+_TRACKING_PREFIXES = tuple(name[:-1] for name in _TRACKING_PARAMETERS if name.endswith("*"))
+
+
+def _normalize_escape(match: "re.Match") -> str:
+    if match.group(1) is None:
+        # Encoded, or decoding the escape after it could make a new one.
+        return "%25"
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else "%" + match.group(1).upper()
+
+
+def _normalize_escapes(component: str) -> str:
+    return _PERCENT_ESCAPE.sub(_normalize_escape, component) if "%" in component else component
+
+
+def _is_tracking_parameter(pair: str) -> bool:
+    name = pair.partition("=")[0].lower()
+    return name in _TRACKING_NAMES or name.startswith(_TRACKING_PREFIXES)
+
 
 class URLUtils:
     @staticmethod
@@ -17,3 +55,141 @@ class URLUtils:
         """
         chars = string.ascii_letters + string.digits
         return ''.join(random.choices(chars, k=length))
+
+
+    @staticmethod
+    def encode_base62(number: int, length: int = settings.SHORT_URL_LENGTH) -> str:
+        """
+        Encode a non-negative integer as a fixed-width base62 string.
+
+        Parameters:
+            number (int): The value to encode. Must be below 62 ** length.
+            length (int): Width of the result, left-padded with "0". Defaults to settings.SHORT_URL_LENGTH.
+
+        Returns:
+            str: The base62 representation of the number.
+        """
+        if number < 0 or number >= 62 ** length:
+            raise ValueError(f"{number} does not fit in {length} base62 characters")
+        chars = []
+        while number:
+            number, remainder = divmod(number, 62)
+            chars.append(BASE62_ALPHABET[remainder])
+        return "".join(reversed(chars)).rjust(length, BASE62_ALPHABET[0])
+
+    @staticmethod
+    def canonicalize_url(url: str) -> str:
+        """
+        Rewrite an http(s) URL into the canonical form equivalent URLs share.
+
+        Lowercases the scheme and host, drops the scheme's default port and an
+        empty path's missing "/", decodes percent-encoded unreserved characters,
+        uppercases the other escapes and encodes stray "%"s, removes
+        `URL_TRACKING_PARAMETERS` and empty parameters, and sorts the query by
+        parameter name, keeping the order of repeated names. Idempotent;
+        anything else is returned as is.
+
+        Parameters:
+            url (str): The original URL.
+
+        Returns:
+            str: The canonical URL.
+        """
+        try:
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in _DEFAULT_PORTS or not parts.hostname:
+                return url
+            port = parts.port
+        except ValueError:
+            return url
+        host = parts.hostname
+        if ":" in host:
+            host = f"[{host}]"
+        if port is not None and port != _DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+        userinfo, at, _ = parts.netloc.rpartition("@")
+        netloc = f"{_normalize_escapes(userinfo)}{at}{host}"
+        path = _normalize_escapes(parts.path) or "/"
+        query = parts.query
+        if query:
+            # Escapes are normalized first, so an escaped tracking parameter
+            # name is recognized too.
+            pairs = [
+                pair
+                for pair in map(_normalize_escapes, query.split("&"))
+                if pair and not _is_tracking_parameter(pair)
+            ]
+            pairs.sort(key=lambda pair: pair.partition("=")[0])
+            query = "&".join(pairs)
+        return urlunsplit((scheme, netloc, path, query, _normalize_escapes(parts.fragment)))
+
+    @staticmethod
+    def stored_url(url: str) -> str:
+        """
+        The form of a submitted URL stored in `url_mappings.original_url` and
+        redirected to: canonical, unless canonicalization is off or
+        `URL_KEEP_ORIGINAL_FORM` is set.
+
+        Parameters:
+            url (str): The submitted URL.
+
+        Returns:
+            str: The URL to store.
+        """
+        if settings.URL_CANONICALIZATION_ENABLED and not settings.URL_KEEP_ORIGINAL_FORM:
+            return URLUtils.canonicalize_url(url)
+        return url
+
+    @staticmethod
+    def url_digest(url: str) -> bytes:
+        """
+        Compute the deduplication key stored in `url_mappings.original_url_hash`.
+
+        Parameters:
+            url (str): The URL, as submitted or as stored in `url_mappings.original_url`.
+
+        Returns:
+            bytes: The first 16 bytes of the SHA-256 of the UTF-8 canonical URL
+            (see `canonicalize_url`), or of the URL itself with
+            `URL_CANONICALIZATION_ENABLED` off, so equivalent URLs share one key.
+        """
+        if settings.URL_CANONICALIZATION_ENABLED:
+            url = URLUtils.canonicalize_url(url)
+        return hashlib.sha256(url.encode("utf-8")).digest()[:URL_DIGEST_SIZE]
+
+    @staticmethod
+    def url_host(url: str) -> Optional[str]:
+        """
+        Compute the host stored in `url_mappings.original_url_host`.
+
+        Parameters:
+            url (str): The URL as stored in `url_mappings.original_url`.
+
+        Returns:
+            Optional[str]: The lowercased host, without userinfo or port, or None
+            if the URL has none.
+        """
+        try:
+            return urlsplit(url).hostname
+        except ValueError:
+            return None
+
+    @staticmethod
+    def is_valid_url(url: str) -> bool:
+        """
+        Check that a URL can be stored and redirected to.
+
+        Parameters:
+            url (str): The original URL.
+
+        Returns:
+            bool: True for an absolute http(s) URL that fits `url_mappings.original_url`.
+        """
+        if not url or len(url) > MAX_URL_LENGTH:
+            return False
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return False
+        return parts.scheme.lower() in ("http", "https") and bool(parts.netloc)
@@ -0,0 +1,13 @@
+"""
+Offline load-test and micro-benchmark suite for the backend.
+
+The app is driven in-process over ASGI against a seeded SQLite database, so
+runs need no PostgreSQL, Redis or network. From `backend/`:
+
+    python -m benchmarks run --mappings 1000000 --output baseline.json
+    python -m benchmarks run --mappings 1000000 --output current.json
+    python -m benchmarks compare baseline.json current.json --threshold 0.1
+
+Settings are read from the environment as usual; `--set NAME=VALUE`
+overrides one for the run (e.g. `--set URL_CACHE_ENABLED=false`).
+"""
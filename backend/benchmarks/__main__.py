@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+
+
+def _setting_override(value: str):
+    name, sep, setting = value.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value!r}")
+    return name, setting
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Offline load tests and micro-benchmarks for the URL shortener backend.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Seed the database, run the scenarios and write JSON results.")
+    run.add_argument("--mappings", type=int, default=1_000_000, help="Seeded URL mappings.")
+    run.add_argument("--requests", type=int, default=20_000, help="Measured requests per scenario.")
+    run.add_argument("--warmup", type=int, default=1_000, help="Unmeasured requests per scenario.")
+    run.add_argument("--concurrency", type=int, default=32, help="Requests in flight for HTTP scenarios.")
+    run.add_argument("--batch-size", type=int, default=100, help="URLs per batch create request.")
+    run.add_argument("--zipf-exponent", type=float, default=1.1, help="Skew of the redirect key mix.")
+    run.add_argument("--miss-ratio", type=float, default=0.05, help="Fraction of redirects to unknown codes.")
+    run.add_argument("--seed", type=int, default=42, help="Random seed for the key mix.")
+    run.add_argument(
+        "--scenarios", default="redirect,create,batch,resolve,lookup,create-service",
+        help="Comma-separated scenarios to run.",
+    )
+    run.add_argument(
+        "--database", default=None,
+        help="SQLite file to seed and reuse (default: one per --mappings in the temp directory).",
+    )
+    run.add_argument(
+        "--set", dest="overrides", type=_setting_override, action="append", default=[],
+        metavar="NAME=VALUE", help="Override a setting for this run; repeatable.",
+    )
+    run.add_argument("--output", "-o", default="benchmark-results.json", help="Results file.")
+
+    compare = commands.add_parser("compare", help="Compare two results files and flag regressions.")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Allowed relative slowdown before a metric is flagged (default 0.1 = 10%%).",
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "compare":
+        from benchmarks.report import compare_results, format_comparison, load_results
+
+        rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+        print(format_comparison(rows))
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    database = args.database or os.path.join(
+        tempfile.gettempdir(), f"url-shortener-bench-{args.mappings}.sqlite3"
+    )
+    args.database = database
+    # Settings are read once at import time, so the environment has to be in
+    # place before anything under `app` is imported.
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    for name, value in args.overrides:
+        os.environ[name] = value
+
+    from benchmarks.report import write_results
+    from benchmarks.runner import SCENARIOS, BenchmarkSuite
+
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    results = asyncio.run(BenchmarkSuite(args).run(scenarios))
+    write_results(args.output, results)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
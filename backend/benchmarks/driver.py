@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message
+
+
+class AsgiClient:
+    """
+    Minimal in-process HTTP client that calls an ASGI app directly, so the
+    numbers measure the app rather than a socket or an HTTP library.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def request(self, method: str, path: str, json_body: Any = None) -> int:
+        """
+        Send one request and return the response status. The body is read
+        and discarded.
+        """
+        body = b"" if json_body is None else json.dumps(json_body).encode("utf-8")
+        headers = [(b"host", b"benchmark")]
+        if json_body is not None:
+            headers.append((b"content-type", b"application/json"))
+            headers.append((b"content-length", str(len(body)).encode("ascii")))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("benchmark", 80),
+        }
+        request_sent = False
+        status_code = 0
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if request_sent:
+                # Nothing more to read; behave like a client that keeps the
+                # connection open until the response is done.
+                await asyncio.Event().wait()
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        await self.app(scope, receive, send)
+        return status_code
+
+
+async def run_load(
+    call: Callable[[int], Awaitable[bool]],
+    total: int,
+    concurrency: int,
+) -> Tuple[List[float], int, float]:
+    """
+    Issue `total` calls from `concurrency` concurrent workers.
+
+    `call(i)` performs request number i and returns whether it succeeded.
+    Returns the per-call latencies in seconds, the error count and the wall
+    clock time of the whole run.
+    """
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            ok = await call(index)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    return latencies, errors, time.perf_counter() - started
+
+
+def run_sequential(call: Callable[[int], Optional[bool]], total: int) -> Tuple[List[float], int, float]:
+    """
+    Micro-benchmark counterpart of `run_load`: call `call(i)` in a plain
+    loop on the current thread.
+    """
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for index in range(total):
+        call_started = time.perf_counter()
+        ok = call(index)
+        latencies.append(time.perf_counter() - call_started)
+        if ok is False:
+            errors += 1
+    return latencies, errors, time.perf_counter() - started
+
+
+def measure_allocations(call: Callable[[int], Any], start: int, total: int) -> float:
+    """
+    Mean peak of memory allocated by one `call(i)` and not yet freed, in
+    bytes, traced over `total` extra calls from `start`. Run separately from
+    the timed loop, which tracing would slow down.
+    """
+    if total <= 0:
+        return 0.0
+    peaks = 0
+    tracemalloc.start()
+    try:
+        for index in range(start, start + total):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call(index)
+            peaks += tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return peaks / total
@@ -0,0 +1,112 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Lower is better for latencies and per-request costs, higher is better for
+# throughput. Costs missing from either run (older results, or allocations
+# for HTTP scenarios) are not compared.
+COMPARED_METRICS = (
+    ("throughput_rps", 1),
+    ("p50_ms", -1),
+    ("p95_ms", -1),
+    ("p99_ms", -1),
+    ("cpu_us_per_op", -1),
+    ("alloc_kib_per_op", -1),
+)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(
+    latencies: List[float],
+    errors: int,
+    elapsed: float,
+    items_per_request: int = 1,
+    cpu_seconds: Optional[float] = None,
+    alloc_bytes: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Reduce raw latencies (seconds) to the figures written to the results file,
+    with the process CPU time of the measured loop and the mean allocation
+    peak per request when given.
+    """
+    ordered = sorted(latencies)
+    count = len(ordered)
+    throughput = count / elapsed if elapsed else 0.0
+    summary = {
+        "requests": count,
+        "errors": errors,
+        "duration_seconds": round(elapsed, 4),
+        "throughput_rps": round(throughput, 2),
+        "items_per_second": round(throughput * items_per_request, 2),
+        "mean_ms": round(sum(ordered) / count * 1000, 4) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+    }
+    if cpu_seconds is not None:
+        summary["cpu_us_per_op"] = round(cpu_seconds / count * 1e6, 2) if count else 0.0
+    if alloc_bytes is not None:
+        summary["alloc_kib_per_op"] = round(alloc_bytes / 1024, 3)
+    return summary
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    with open(path, "w") as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare_results(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[Dict[str, Any]]:
+    """
+    Compare the scenarios present in both runs.
+
+    A metric regresses when it is worse than the baseline by more than
+    `threshold` (a fraction, e.g. 0.1 for 10%): throughput lower, or a
+    latency percentile higher.
+    """
+    rows = []
+    for name, base in baseline["scenarios"].items():
+        new = current["scenarios"].get(name)
+        if new is None:
+            continue
+        for metric, direction in COMPARED_METRICS:
+            if metric not in base or metric not in new:
+                continue
+            old_value, new_value = base[metric], new[metric]
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            rows.append({
+                "scenario": name,
+                "metric": metric,
+                "baseline": old_value,
+                "current": new_value,
+                "change": change,
+                "regression": change * direction < -threshold,
+            })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'scenario':<16} {'metric':<17} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['scenario']:<16} {row['metric']:<17} {row['baseline']:>12.3f} "
+            f"{row['current']:>12.3f} {row['change']:>+8.1%}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,166 @@
+import datetime
+import logging
+import platform
+import subprocess
+import time
+from typing import Any, Callable, Dict, List
+
+from app.cache.local import url_cache
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.schemas.url import URLCreate
+from app.services.urls import UrlServices
+from benchmarks.driver import AsgiClient, measure_allocations, run_load, run_sequential
+from benchmarks.report import summarize
+from benchmarks.seed import seed_mappings, seeded_short_url
+from benchmarks.workload import KeyMix
+
+logger = logging.getLogger(__name__)
+
+HTTP_SCENARIOS = ("redirect", "create", "batch")
+MICRO_SCENARIOS = ("resolve", "lookup", "create-service")
+# Extra calls traced for the allocation figure of micro scenarios.
+ALLOCATION_SAMPLES = 1000
+SCENARIOS = HTTP_SCENARIOS + MICRO_SCENARIOS
+
+
+def _new_url(scenario: str, index: int) -> str:
+    # Deterministic, and distinct from the seeded URLs; rows created by a run
+    # are removed again when the next run re-seeds.
+    return f"https://example.com/{scenario}/{index}"
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class BenchmarkSuite:
+    """
+    Runs the selected scenarios against the in-process app and collects
+    one summary per scenario.
+
+    HTTP scenarios go through the full ASGI stack with `concurrency`
+    requests in flight; micro scenarios call the service layer directly on
+    one thread. Every scenario starts with a cold per-worker cache and runs
+    `warmup` unmeasured iterations first.
+    """
+
+    def __init__(self, options: Any):
+        self.options = options
+        self.client = AsgiClient(app)
+        self.api = settings.API_V1_STR
+
+    def _key_mix(self, scenario: str) -> KeyMix:
+        # Same seed per scenario, so each run replays the same key sequence.
+        return KeyMix(
+            key_count=self.options.mappings,
+            exponent=self.options.zipf_exponent,
+            miss_ratio=self.options.miss_ratio,
+            seed=self.options.seed + SCENARIOS.index(scenario),
+        )
+
+    def _http_call(self, scenario: str) -> Callable[[int], Any]:
+        if scenario == "redirect":
+            keys = self._key_mix(scenario)
+
+            async def call(index: int) -> bool:
+                status = await self.client.request("GET", f"/{seeded_short_url(keys.next_id())}")
+                # Any redirect status: REDIRECT_STATUS_CODE and links may pick one.
+                return 300 <= status < 400 or status == 404
+        elif scenario == "create":
+            async def call(index: int) -> bool:
+                status = await self.client.request(
+                    "POST", f"{self.api}/generate", {"original_url": _new_url(scenario, index)}
+                )
+                return status == 201
+        else:
+            size = self.options.batch_size
+
+            async def call(index: int) -> bool:
+                body = [
+                    {"original_url": _new_url(scenario, index * size + offset)}
+                    for offset in range(size)
+                ]
+                status = await self.client.request("POST", f"{self.api}/generate/batch", body)
+                return status == 200
+        return call
+
+    def _micro_call(self, scenario: str) -> Callable[[int], Any]:
+        if scenario == "resolve":
+            keys = self._key_mix(scenario)
+
+            def call(index: int) -> None:
+                UrlServices.resolve_original_url(short_url=seeded_short_url(keys.next_id()))
+        elif scenario == "lookup":
+            # The database lookup behind a cache miss, without the cache tiers.
+            keys = self._key_mix(scenario)
+
+            def call(index: int) -> None:
+                UrlServices.find_by_short_url(short_url=seeded_short_url(keys.next_id()))
+        else:
+            def call(index: int) -> None:
+                db = SessionLocal()
+                try:
+                    UrlServices.create_url_mapping(
+                        db=db, url_in=URLCreate(original_url=_new_url(scenario, index))
+                    )
+                finally:
+                    db.close()
+        return call
+
+    async def run_scenario(self, scenario: str) -> Dict[str, Any]:
+        url_cache.clear()
+        warmup, total = self.options.warmup, self.options.requests
+        alloc_bytes = None
+        if scenario in HTTP_SCENARIOS:
+            call = self._http_call(scenario)
+
+            async def shifted(index: int) -> bool:
+                return await call(index + warmup)
+
+            await run_load(call, warmup, self.options.concurrency)
+            cpu_started = time.process_time()
+            latencies, errors, elapsed = await run_load(shifted, total, self.options.concurrency)
+            cpu_seconds = time.process_time() - cpu_started
+        else:
+            call = self._micro_call(scenario)
+            run_sequential(call, warmup)
+            cpu_started = time.process_time()
+            latencies, errors, elapsed = run_sequential(lambda index: call(index + warmup), total)
+            cpu_seconds = time.process_time() - cpu_started
+            alloc_bytes = measure_allocations(call, warmup + total, min(ALLOCATION_SAMPLES, total))
+        items = self.options.batch_size if scenario == "batch" else 1
+        return summarize(
+            latencies, errors, elapsed,
+            items_per_request=items, cpu_seconds=cpu_seconds, alloc_bytes=alloc_bytes,
+        )
+
+    async def run(self, scenarios: List[str]) -> Dict[str, Any]:
+        inserted = seed_mappings(engine, self.options.mappings)
+        logger.info("Seeded %d new mappings", inserted)
+        results = {}
+        async with app.router.lifespan_context(app):
+            for scenario in scenarios:
+                results[scenario] = await self.run_scenario(scenario)
+                logger.info("%s: %s", scenario, results[scenario])
+        return {
+            "meta": {
+                "started_at": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": engine.dialect.name,
+                "async": settings.DB_ASYNC_ENABLED,
+                "options": {
+                    key: value for key, value in vars(self.options).items()
+                    if key not in ("command", "output")
+                },
+            },
+            "scenarios": results,
+        }
@@ -0,0 +1,67 @@
+import datetime
+import logging
+
+from sqlalchemy import Engine, delete, func, insert, select
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.click import UrlClick
+from app.models.url import UrlMapping, UrlType
+from app.utils.url_helpers import URLUtils
+
+logger = logging.getLogger(__name__)
+
+SEED_CHUNK_SIZE = 10000
+SEED_CREATED_AT = datetime.datetime(2024, 1, 1)
+
+
+def seeded_short_url(key_id: int) -> str:
+    """
+    Short code of the seeded mapping with the given 0-based id. Ids past the
+    seeded range give codes that do not exist.
+    """
+    return URLUtils.encode_base62(key_id, length=settings.SHORT_URL_LENGTH)
+
+
+def seeded_original_url(key_id: int) -> str:
+    return f"https://example.com/seed/{key_id}"
+
+
+def seed_mappings(engine: Engine, count: int) -> int:
+    """
+    Make `url_mappings` hold exactly the `count` seeded rows.
+
+    Rows left behind by an earlier run's create scenarios are deleted, and a
+    database that already holds the seeded rows is reused, so repeated runs
+    against the same file start from the same state. Returns the number of
+    rows inserted.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    Base.metadata.create_all(engine)
+    table = UrlMapping.__table__
+    with engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.id > count))
+        conn.execute(delete(UrlClick.__table__))
+        existing = conn.scalar(select(func.count()).select_from(table))
+    if existing == count:
+        return 0
+    logger.info("Seeding %d mappings after the %d already present", count - existing, existing)
+    with engine.begin() as conn:
+        for start in range(existing, count, SEED_CHUNK_SIZE):
+            rows = []
+            for key_id in range(start, min(start + SEED_CHUNK_SIZE, count)):
+                original_url = seeded_original_url(key_id)
+                rows.append({
+                    "id": key_id + 1,
+                    "original_url": original_url,
+                    "original_url_hash": URLUtils.url_digest(original_url),
+                    "original_url_host": URLUtils.url_host(original_url),
+                    "short_url": seeded_short_url(key_id),
+                    "url_type": UrlType.RANDOM,
+                    "created_at": SEED_CREATED_AT,
+                    "updated_at": SEED_CREATED_AT,
+                })
+            conn.execute(insert(table), rows)
+    return count - existing
@@ -0,0 +1,73 @@
+import math
+import random
+
+# Multiplier used to scatter Zipf ranks over the seeded ids, so the hottest
+# keys are not all neighbours in the index. Prime, hence coprime with any
+# key count below it.
+_RANK_STRIDE = 2_147_483_647
+
+
+def _log1p_ratio(x: float) -> float:
+    return math.log1p(x) / x if abs(x) > 1e-8 else 1 - x * (0.5 - x * (1 / 3 - 0.25 * x))
+
+
+def _expm1_ratio(x: float) -> float:
+    return math.expm1(x) / x if abs(x) > 1e-8 else 1 + x * 0.5 * (1 + x / 3 * (1 + 0.25 * x))
+
+
+class ZipfSampler:
+    """
+    Draws ranks in [1, n] with P(k) proportional to 1 / k ** exponent.
+
+    Uses rejection-inversion sampling (Hormann & Derflinger), so memory and
+    set-up cost do not depend on `n` and millions of keys are cheap.
+    """
+
+    def __init__(self, n: int, exponent: float, rng: random.Random):
+        if n < 1 or exponent <= 0:
+            raise ValueError("n must be >= 1 and exponent > 0")
+        self.n = n
+        self.exponent = exponent
+        self.rng = rng
+        self._h_integral_x1 = self._h_integral(1.5) - 1
+        self._h_integral_n = self._h_integral(n + 0.5)
+        self._squeeze = 2 - self._h_integral_inverse(self._h_integral(2.5) - self._h(2))
+
+    def _h(self, x: float) -> float:
+        return math.exp(-self.exponent * math.log(x))
+
+    def _h_integral(self, x: float) -> float:
+        log_x = math.log(x)
+        return _expm1_ratio((1 - self.exponent) * log_x) * log_x
+
+    def _h_integral_inverse(self, x: float) -> float:
+        t = max(x * (1 - self.exponent), -1)
+        return math.exp(_log1p_ratio(t) * x)
+
+    def sample(self) -> int:
+        while True:
+            u = self._h_integral_n + self.rng.random() * (self._h_integral_x1 - self._h_integral_n)
+            x = self._h_integral_inverse(u)
+            k = min(max(int(x + 0.5), 1), self.n)
+            if k - x <= self._squeeze or u >= self._h_integral(k + 0.5) - self._h(k):
+                return k
+
+
+class KeyMix:
+    """
+    Picks seeded ids for the redirect scenarios: Zipf-distributed over the
+    seeded keys, with `miss_ratio` of draws going to ids that were never
+    seeded (unknown short codes).
+    """
+
+    def __init__(self, key_count: int, exponent: float, miss_ratio: float, seed: int):
+        self.key_count = key_count
+        self.miss_ratio = miss_ratio
+        self.rng = random.Random(seed)
+        self.sampler = ZipfSampler(key_count, exponent, self.rng)
+
+    def next_id(self) -> int:
+        if self.miss_ratio and self.rng.random() < self.miss_ratio:
+            return self.key_count + self.rng.randrange(self.key_count)
+        rank = self.sampler.sample() - 1
+        return rank * _RANK_STRIDE % self.key_count
@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point them at a scratch database first.
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{_db_dir}/test.db")
+
+import pytest  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import engine, session_scope  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db():
+    with session_scope() as session:
+        yield session
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api.api_v1.endpoints import admin
+from app.api.deps import require_admin_token
+from app.core.config import settings
+from app.error_code.common_errors import CommonErrorCode
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def test_admin_endpoints_are_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+    for credentials in (None, bearer("")):
+        with pytest.raises(HTTPException) as raised:
+            require_admin_token(credentials)
+        assert raised.value.status_code == 404
+        assert raised.value.detail[0]["error_code"] == CommonErrorCode.ADMIN_API_DISABLED
+
+
+def test_admin_endpoints_need_the_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "s3cret")
+    for credentials in (None, bearer("wrong")):
+        with pytest.raises(HTTPException) as raised:
+            require_admin_token(credentials)
+        assert raised.value.status_code == 401
+        assert raised.value.detail[0]["error_code"] == CommonErrorCode.ADMIN_TOKEN_INVALID
+    assert require_admin_token(bearer("s3cret")) is None
+
+
+def test_every_admin_route_is_guarded():
+    paths = {route.path for route in admin.router.routes}
+    assert paths == {"/admin/urls", "/admin/urls/export", "/admin/hot-keys"}
+    for route in admin.router.routes:
+        assert require_admin_token in [dependency.call for dependency in route.dependant.dependencies]
@@ -0,0 +1,218 @@
+import asyncio
+
+import pytest
+
+from app.api import admission as admission_middleware
+from app.api.admission import AdmissionControlMiddleware
+from app.core.config import settings
+from app.core.metrics import Counter
+from app.services import admission
+from app.services.admission import CREATE, REDIRECT, AdmissionController, TokenBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    buckets = TokenBuckets(rate=2, burst=3)
+    assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == pytest.approx(0.5)
+    # Refills stop at the burst size.
+    clock.now += 60
+    assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("a") > 0
+
+
+def test_clients_have_their_own_buckets(clock):
+    buckets = TokenBuckets(rate=1, burst=1)
+    assert buckets.take("a") == 0
+    assert buckets.take("a") > 0
+    assert buckets.take("b") == 0
+
+
+def test_least_recently_seen_clients_are_forgotten(clock):
+    buckets = TokenBuckets(rate=1, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        assert buckets.take(client) == 0
+    # "a" was dropped, so it starts again with a full bucket.
+    assert buckets.take("a") == 0
+    assert buckets.take("c") > 0
+
+
+def controller(max_concurrency=1, create_limit=1, queue_size=10, queue_timeout=5.0, redirect_limit=None):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        class_limits={REDIRECT: redirect_limit or max_concurrency, CREATE: create_limit},
+        queue_size=queue_size,
+        queue_timeout=queue_timeout,
+    )
+
+
+async def wait_in_queue(controller, name, admitted):
+    """Starts an `acquire` that has to queue, recording its class once admitted."""
+    task = asyncio.ensure_future(controller.acquire(name))
+    task.add_done_callback(lambda _: admitted.append(name))
+    await asyncio.sleep(0)
+    assert not task.done()
+    return task
+
+
+def test_queued_redirects_are_admitted_before_queued_creates():
+    async def scenario():
+        admission_controller, admitted = controller(), []
+        assert await admission_controller.acquire(REDIRECT) is None
+        waiting = [await wait_in_queue(admission_controller, name, admitted) for name in (CREATE, REDIRECT, REDIRECT)]
+        assert admission_controller.stats() == {
+            REDIRECT: {"in_flight": 1, "queued": 2},
+            CREATE: {"in_flight": 0, "queued": 1},
+        }
+        held = REDIRECT
+        for _ in waiting:
+            admission_controller.release(held)
+            await asyncio.sleep(0.01)
+            held = admitted[-1]
+        assert await asyncio.gather(*waiting) == [None, None, None]
+        return admitted
+
+    assert asyncio.run(scenario()) == [REDIRECT, REDIRECT, CREATE]
+
+
+def test_creates_wait_while_redirects_are_queued():
+    async def scenario():
+        admission_controller, admitted = controller(max_concurrency=2, create_limit=2, redirect_limit=1), []
+        assert await admission_controller.acquire(REDIRECT) is None
+        redirects = [await wait_in_queue(admission_controller, REDIRECT, admitted) for _ in range(2)]
+        # A worker slot is free, but redirects are queued ahead.
+        create = await wait_in_queue(admission_controller, CREATE, admitted)
+        admission_controller.release(REDIRECT)
+        await asyncio.sleep(0.01)
+        assert admitted == [REDIRECT] and not create.done()
+        admission_controller.release(REDIRECT)
+        assert await asyncio.gather(*redirects, create) == [None, None, None]
+        return admitted
+
+    assert asyncio.run(scenario()) == [REDIRECT, REDIRECT, CREATE]
+
+
+def test_creates_are_capped_below_the_worker_limit():
+    async def scenario():
+        admission_controller, admitted = controller(max_concurrency=4, create_limit=1), []
+        assert await admission_controller.acquire(CREATE) is None
+        create = await wait_in_queue(admission_controller, CREATE, admitted)
+        # Redirects still get the free slots, ahead of the queued create.
+        assert await admission_controller.acquire(REDIRECT) is None
+        admission_controller.release(CREATE)
+        assert await create is None
+        return admission_controller.stats()
+
+    assert asyncio.run(scenario()) == {
+        REDIRECT: {"in_flight": 1, "queued": 0},
+        CREATE: {"in_flight": 1, "queued": 0},
+    }
+
+
+def test_requests_are_shed_when_the_queue_is_full():
+    async def scenario():
+        admission_controller = controller(queue_size=1)
+        assert await admission_controller.acquire(REDIRECT) is None
+        waiting = await wait_in_queue(admission_controller, REDIRECT, [])
+        shed = await admission_controller.acquire(REDIRECT)
+        admission_controller.release(REDIRECT)
+        assert await waiting is None
+        return shed
+
+    assert asyncio.run(scenario()) == "queue_full"
+
+
+def test_requests_are_shed_when_the_wait_times_out():
+    async def scenario():
+        admission_controller = controller(queue_timeout=0.01)
+        assert await admission_controller.acquire(REDIRECT) is None
+        shed = await admission_controller.acquire(CREATE)
+        return shed, admission_controller.stats()
+
+    shed, stats = asyncio.run(scenario())
+    assert shed == "timeout"
+    assert stats[CREATE] == {"in_flight": 0, "queued": 0}
+
+
+def test_release_when_a_queued_request_is_cancelled():
+    async def scenario():
+        admission_controller = controller()
+        assert await admission_controller.acquire(REDIRECT) is None
+        gone = await wait_in_queue(admission_controller, REDIRECT, [])
+        gone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        assert admission_controller.stats()[REDIRECT] == {"in_flight": 1, "queued": 0}
+
+        # Cancelled after its slot was handed over, but before it ran.
+        admitted_late = await wait_in_queue(admission_controller, REDIRECT, [])
+        admission_controller.release(REDIRECT)
+        admitted_late.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await admitted_late
+        return admission_controller
+
+    admission_controller = asyncio.run(scenario())
+    assert admission_controller.active == 0
+    assert admission_controller.stats()[REDIRECT] == {"in_flight": 0, "queued": 0}
+
+
+def test_middleware_sheds_with_503_and_counts_the_reason(monkeypatch):
+    shed = Counter("admission_shed_total", "", ("route_class", "reason"))
+    monkeypatch.setattr(admission_middleware, "admission_shed_total", shed)
+    monkeypatch.setattr(admission_middleware, "create_rate_limiter", None)
+    monkeypatch.setattr(admission_middleware, "admission_controller", controller(queue_size=1, queue_timeout=0.05))
+
+    async def scenario():
+        finish = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await finish.wait()
+            await send({"type": "http.response.start", "status": 201, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = AdmissionControlMiddleware(app)
+        scope = {"type": "http", "method": "POST", "path": f"{settings.API_V1_STR}/generate", "client": ("1.2.3.4", 1)}
+
+        async def request():
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            await middleware(scope, None, send)
+            return sent[0]["status"], dict(sent[0]["headers"]).get(b"retry-after")
+
+        requests = []
+        for _ in range(3):
+            requests.append(asyncio.ensure_future(request()))
+            await asyncio.sleep(0)
+        timed_out = await asyncio.wait_for(requests[1], timeout=5)
+        finish.set()
+        return [await requests[0], timed_out, await requests[2]]
+
+    admitted, timed_out, queue_full = asyncio.run(scenario())
+    assert admitted == (201, None)
+    retry_after = str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()
+    assert timed_out == queue_full == (503, retry_after)
+    assert sorted(shed.render()) == [
+        'admission_shed_total{route_class="create",reason="queue_full"} 1',
+        'admission_shed_total{route_class="create",reason="timeout"} 1',
+    ]
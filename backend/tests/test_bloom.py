@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.cache import bloom as bloom_module
+from app.cache.bloom import BloomFilter, ShortCodeFilter
+from app.core.metrics import Counter
+from app.db.shards import url_mapping_sources
+from app.models.url import UrlMapping
+from app.services.urls import UrlServices
+from app.utils.url_helpers import URLUtils
+
+
+def add_mappings(db, codes):
+    db.execute(insert(UrlMapping), [
+        dict(
+            original_url=f"https://example.com/{code}",
+            original_url_hash=URLUtils.url_digest(f"https://example.com/{code}"),
+            short_url=code,
+            created_at=datetime(2026, 1, 1),
+        )
+        for code in codes
+    ])
+    db.commit()
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10000, 0.01)
+    for index in range(10000):
+        bloom.add(f"k{index}")
+    assert all(f"k{index}" in bloom for index in range(10000))
+    false_positives = sum(f"other{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+def test_short_code_filter_rejects_misses_without_the_database(db, monkeypatch):
+    rejected = Counter("short_code_filter_rejected_total", "")
+    monkeypatch.setattr(bloom_module, "short_code_filter_rejected_total", rejected)
+    add_mappings(db, ["old1", "old2"])
+    short_codes = ShortCodeFilter(capacity=1000, fp_rate=0.001, page_size=1, sources=url_mapping_sources)
+    assert short_codes.might_contain("unknown")  # not built yet
+    short_codes.rebuild()
+    assert short_codes.might_contain("old2")
+
+    # Created by another worker after the build: rejected until a catch-up.
+    add_mappings(db, ["new1"])
+    assert not short_codes.might_contain("new1")
+    short_codes.catch_up()
+    assert short_codes.might_contain("new1")
+
+    # Created by this worker: added straight away.
+    short_codes.add("new2")
+    assert short_codes.might_contain("new2")
+
+    assert not short_codes.might_contain("unknown")
+    assert list(rejected.render()) == ["short_code_filter_rejected_total 2"]
+
+
+def test_redirect_miss_rejected_by_the_filter_skips_the_database(db, monkeypatch):
+    short_codes = ShortCodeFilter(capacity=1000, fp_rate=0.001, page_size=100, sources=url_mapping_sources)
+    short_codes.rebuild()
+    monkeypatch.setattr("app.services.urls.short_code_filter", short_codes)
+
+    def no_lookup(short_url):
+        raise AssertionError("looked up in the database")
+
+    monkeypatch.setattr(UrlServices, "find_by_short_url", staticmethod(no_lookup))
+    assert UrlServices.load_cached_value("unknown") is None
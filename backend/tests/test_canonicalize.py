@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from app.cache.hot_keys import preload
+from app.cache.local import url_cache
+from app.models.url import UrlAlias, UrlMapping, UrlType
+from app.schemas.url import URLCreate
+from app.services.canonicalize import merge_duplicates
+from app.services.redirect_policy import redirect_for
+from app.services.urls import UrlServices
+from app.utils.url_helpers import URLUtils
+
+
+def legacy_rows(db, urls, overrides=None):
+    """Insert rows keyed by the digest of the raw URL, as before canonicalization."""
+    db.execute(insert(UrlMapping), [
+        dict(
+            original_url=url,
+            original_url_hash=hashlib.sha256(url.encode("utf-8")).digest()[:16],
+            original_url_host=URLUtils.url_host(url),
+            short_url=f"L{index}",
+            url_type=UrlType.RANDOM,
+            created_at=datetime(2026, 1, 1),
+            **(overrides or {}).get(index, {}),
+        )
+        for index, url in enumerate(urls)
+    ])
+    db.commit()
+
+
+def test_merge_duplicates_merges_then_is_a_no_op(db):
+    legacy_rows(db, [
+        "HTTP://Example.COM:80/a?b=2&a=1&utm_source=x",
+        "http://example.com/a?a=1&b=2&fbclid=1",
+        "http://other.com/x?utm%5Fsource=1",
+        "http://example.com/a?b=2&a=1",
+    ])
+    first = merge_duplicates(batch_size=2)
+    assert (first.rekeyed, first.merged, first.kept) == (2, 2, 0)
+    assert dict(db.execute(select(UrlAlias.short_url, UrlAlias.target_short_url)).all()) == {"L1": "L0", "L3": "L0"}
+
+    second = merge_duplicates(batch_size=2)
+    assert (second.rekeyed, second.merged, second.kept, second.skipped) == (0, 0, 0, 0)
+
+    # Resubmitting a merged URL finds the surviving row instead of creating one.
+    response = UrlServices.create_url_mapping(db, URLCreate(original_url="http://other.com/x?utm%5Fsource=1"))
+    assert response.short_url.endswith("/L2")
+    assert db.scalar(select(UrlMapping.original_url).where(UrlMapping.short_url == "L2")) == "http://other.com/x"
+
+
+def test_merge_duplicates_keeps_rows_with_another_policy(db):
+    legacy_rows(db, ["http://example.com/?a=1", "HTTP://EXAMPLE.com/?a=1"], {1: {"redirect_status": 301}})
+    result = merge_duplicates()
+    assert (result.rekeyed, result.merged, result.kept) == (0, 0, 1)
+    assert db.scalar(select(UrlAlias.short_url)) is None
+
+
+def test_alias_resolves_like_its_target(db):
+    legacy_rows(db, ["http://example.com/p", "http://Example.com:80/p"])
+    merge_duplicates()
+    assert UrlServices.find_by_short_url("L1").original_url == "http://example.com/p"
+
+
+def test_preload_resolves_aliases(db):
+    legacy_rows(db, ["http://example.com/hot", "http://Example.com:80/hot"])
+    merge_duplicates()
+    assert preload(["L0", "L1", "missing"]) == 2
+    assert redirect_for(url_cache.get("L1")).url == "http://example.com/hot"
@@ -0,0 +1,43 @@
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.models.click import UrlClick
+from app.services import clicks as clicks_module
+from app.services.clicks import ClickBuffer, ClickFlusher
+
+
+def total_clicks(db):
+    return db.scalar(select(func.coalesce(func.sum(UrlClick.click_count), 0)))
+
+
+def test_flush_writes_a_full_buffer_in_chunks(db):
+    buffer = ClickBuffer(max_keys=100000)
+    for index in range(100000):
+        buffer.record(f"c{index}")
+    buffer.record("c0")
+    assert ClickFlusher(buffer, interval=60).flush()
+    assert total_clicks(db) == 100001
+    assert db.scalar(select(UrlClick.click_count).where(UrlClick.short_url == "c0")) == 2
+
+
+def test_failed_chunk_is_requeued(db, monkeypatch):
+    buffer = ClickBuffer(max_keys=10000)
+    for index in range(2500):
+        buffer.record(f"c{index:05d}")
+    write = clicks_module.crud_click.bulk_increment
+    calls = []
+
+    def fail_second_chunk(db, clicks):
+        calls.append(len(clicks))
+        if len(calls) == 2:
+            raise OperationalError("upsert", {}, Exception("database is locked"))
+        write(db=db, clicks=clicks)
+
+    monkeypatch.setattr(clicks_module.crud_click, "bulk_increment", fail_second_chunk)
+    flusher = ClickFlusher(buffer, interval=60)
+    assert not flusher.flush()
+    assert total_clicks(db) == 1000
+
+    buffer.record("c02499")
+    assert flusher.flush()
+    assert total_clicks(db) == 2501
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.error_code.common_errors import CommonErrorCode
+from app.models.url import UrlMapping
+from app.schemas.url import URLCreate
+from app.services.coalescing import AsyncCreateCoalescer
+from app.services.urls import UrlServices
+from app.services.urls_async import AsyncUrlServices
+
+
+@pytest.mark.parametrize("url", ["not a url", "javascript:alert(1)"])
+def test_invalid_url_is_rejected_on_every_create_path(db, url):
+    with pytest.raises(HTTPException) as raised:
+        UrlServices.create_url_mapping(db, URLCreate(original_url=url))
+    assert raised.value.status_code == 400
+    assert raised.value.detail[0]["error_code"] == CommonErrorCode.INVALID_URL
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(AsyncUrlServices.create_url_mapping(db=None, url_in=URLCreate(original_url=url)))
+    assert raised.value.status_code == 400
+    assert db.scalar(select(func.count()).select_from(UrlMapping)) == 0
+
+
+def blocking_coalescer(leaders: list, started: asyncio.Event) -> AsyncCreateCoalescer:
+    async def write_group(items):
+        leaders.append(asyncio.current_task())
+        started.set()
+        await asyncio.sleep(60)
+
+    return AsyncCreateCoalescer(max_wait_ms=1, max_group_size=10, write_group=write_group)
+
+
+def test_cancelled_group_fails_its_callers_instead_of_hanging():
+    async def scenario():
+        leaders, started = [], asyncio.Event()
+        coalescer = blocking_coalescer(leaders, started)
+        callers = [
+            asyncio.ensure_future(coalescer.submit(URLCreate(original_url=f"https://a.com/{i}"))) for i in range(3)
+        ]
+        await started.wait()
+        leaders[0].cancel()
+        return await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), timeout=5)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_group_cancelled_while_waiting_does_not_strand_the_queue():
+    async def scenario():
+        coalescer = AsyncCreateCoalescer(max_wait_ms=60000, max_group_size=10, write_group=None)
+        caller = asyncio.ensure_future(coalescer.submit(URLCreate(original_url="https://a.com/")))
+        await asyncio.sleep(0.01)
+        coalescer._flush_task.cancel()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(caller, timeout=5)
+        return coalescer
+
+    coalescer = asyncio.run(scenario())
+    assert coalescer._pending == [] and coalescer._flush_task is None
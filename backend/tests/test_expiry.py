@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import MAX_URL_TTL_SECONDS
+from app.schemas.url import URLCreate
+from app.services.urls import UrlServices
+
+
+def test_expires_in_seconds_is_bounded():
+    with pytest.raises(ValidationError):
+        URLCreate(original_url="https://example.com/", expires_in_seconds=10**12)
+
+
+def test_longest_ttl_gives_an_expiry():
+    url_in = URLCreate(original_url="https://example.com/", expires_in_seconds=MAX_URL_TTL_SECONDS)
+    expires_at = UrlServices.expires_at_for(url_in)
+    assert expires_at - datetime.utcnow() > timedelta(seconds=MAX_URL_TTL_SECONDS - 60)
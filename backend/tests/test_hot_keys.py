@@ -0,0 +1,40 @@
+import random
+from collections import Counter
+
+from app.cache.hot_keys import CountMinSketch, HotKeyTracker
+
+
+def test_sketch_never_undercounts():
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = Counter()
+    rng = random.Random(7)
+    for _ in range(5000):
+        key = f"k{rng.randrange(500)}"
+        counts[key] += 1
+        assert sketch.add(key) >= counts[key]
+
+
+def test_sketch_decay_halves_counts():
+    sketch = CountMinSketch(width=1024, depth=4)
+    for _ in range(10):
+        sketch.add("a")
+    sketch.decay()
+    assert sketch.add("a") == 6
+
+
+def test_tracker_keeps_the_hottest_codes(tmp_path):
+    tracker = HotKeyTracker(k=3, width=4096, depth=4, interval=60, path=str(tmp_path / "hot.json"))
+    rng = random.Random(7)
+    traffic = [f"cold{i}" for i in range(300)] + ["hot1"] * 50 + ["hot2"] * 40 + ["hot3"] * 30
+    rng.shuffle(traffic)
+    for code in traffic:
+        tracker.record(code)
+    assert [code for code, _ in tracker.top()] == ["hot1", "hot2", "hot3"]
+    assert tracker.top(1) == [("hot1", 50)]
+
+    tracker.decay()
+    assert tracker.top(1) == [("hot1", 25)]
+    # Newer traffic overtakes the decayed counts.
+    for _ in range(40):
+        tracker.record("new")
+    assert tracker.top(1)[0][0] == "new"
@@ -0,0 +1,30 @@
+from app.crud.url import UrlListFilter
+from app.schemas.url import URLCreate
+from app.services.listing import UrlListServices
+from app.services.urls import UrlServices
+
+ALL = UrlListFilter(url_type=None, created_after=None, created_before=None, host=None, include_expired=False)
+
+
+def walk(limit):
+    codes, cursor, pages = [], None, 0
+    while True:
+        page = UrlListServices.list_urls(ALL, limit, cursor)
+        pages += 1
+        assert pages < 100, "pagination did not terminate"
+        codes.extend(item.short_url for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return codes
+
+
+def test_pagination_walks_rows_created_through_the_api(db):
+    created = [UrlServices.create_url_mapping(db, URLCreate(original_url=f"https://a.com/{i}")) for i in range(5)]
+    # One statement, so every row ties on created_at.
+    batch = UrlServices.create_url_mappings(db, [URLCreate(original_url=f"https://b.com/{i}") for i in range(7)])
+    expected = {url.short_url for url in created} | {item.result.short_url for item in batch.results}
+
+    for limit in (1, 2, 5, 100):
+        codes = walk(limit)
+        assert len(codes) == len(expected)
+        assert set(codes) == expected
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from app.api.api_v1.endpoints.redirect import _redirect_response, router
+from app.cache.local import cache_value, parse_value
+from app.core.config import Settings, settings
+from app.services.redirect_policy import cache_control_for, redirect_for
+
+
+@pytest.mark.parametrize("policy", [(), (301,), (None, 60), (308, 3600, 30), (None, None, 5)])
+def test_cache_value_round_trips(policy):
+    expires_at = datetime(2030, 1, 2, 3, 4, 5)
+    value = cache_value("https://example.com/a b?c=1", expires_at, policy)
+    original_url, expiry, parsed = parse_value(value)
+    assert original_url == "https://example.com/a b?c=1"
+    assert expiry == int((expires_at - datetime(1970, 1, 1)).total_seconds())
+    assert parsed + (None,) * (len(policy) - len(parsed)) == tuple(policy)
+
+
+def test_cache_value_without_expiry_or_policy_is_the_url():
+    assert cache_value("https://example.com/", None) == "https://example.com/"
+    assert parse_value("https://example.com/") == ("https://example.com/", None, ())
+    assert cache_value(None, None) is None
+
+
+def test_redirect_for_uses_overrides_then_settings():
+    redirect = redirect_for(cache_value("https://example.com/", None, (301, 600, 60)))
+    assert redirect == ("https://example.com/", 301, "public, max-age=600, stale-while-revalidate=60")
+    redirect = redirect_for(cache_value("https://example.com/", None))
+    assert redirect.status_code == settings.REDIRECT_STATUS_CODE
+
+
+def test_redirect_for_expired_link_is_a_miss():
+    expired = datetime.utcnow() - timedelta(seconds=5)
+    assert redirect_for(cache_value("https://example.com/", expired)) is None
+    assert redirect_for(None) is None
+
+
+def test_expiring_permanent_redirect_is_not_stored():
+    assert cache_control_for(308, 600, 0, True) == "no-store"
+    assert cache_control_for(307, 600, 0, True) is None
+    assert cache_control_for(301, 0, 0, False) == "no-store"
+
+
+def test_redirect_status_code_is_validated():
+    with pytest.raises(ValidationError):
+        Settings(REDIRECT_STATUS_CODE=200)
+    assert Settings(REDIRECT_STATUS_CODE=308).REDIRECT_STATUS_CODE == 308
+
+
+def test_redirect_is_sent_with_the_link_status():
+    # The route declares no status of its own; each response carries the link's.
+    assert [route.status_code for route in router.routes] == [None]
+    redirect = redirect_for(cache_value("https://example.com/", None, (301,)))
+    response = _redirect_response("abc", redirect)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://example.com/"
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from app.db.base import Base
+from app.db.rebalance import BucketMover
+from app.db.shards import ShardRouter, bucket_for_hash
+from app.models.shard import ShardBucket
+from app.models.url import UrlAlias, UrlMapping
+from app.schemas.url import URLCreate
+from app.services import urls
+from app.services.urls import UrlServices
+from app.utils.url_helpers import BASE62_ALPHABET, URLUtils
+
+
+@pytest.fixture
+def router(db, tmp_path, monkeypatch):
+    router = ShardRouter([f"sqlite:///{tmp_path}/a.db", f"sqlite:///{tmp_path}/b.db"], refresh_interval=0)
+    for shard in router.shards:
+        Base.metadata.create_all(shard.engine)
+    router.refresh()
+    db.execute(update(ShardBucket).where(ShardBucket.bucket >= 31).values(shard=1))
+    db.commit()
+    router.refresh()
+    monkeypatch.setattr(urls, "shard_router", router)
+    return router
+
+
+def misplaced(router, url):
+    """A code on shard 0 for a URL whose digest is on shard 1, as left by sharding an existing database."""
+    digest = URLUtils.url_digest(url)
+    assert router.shard_for_hash(digest) is router.shards[1]
+    code = BASE62_ALPHABET[0] + "legacy"
+    with router.shards[0].session_scope() as shard_db:
+        shard_db.execute(insert(UrlMapping), [dict(
+            original_url=url, original_url_hash=digest, short_url=code, created_at=datetime(2026, 1, 1),
+        )])
+        shard_db.commit()
+    return code
+
+
+def url_on_shard_1(prefix):
+    return next(
+        url for url in (f"https://{prefix}.com/{i}" for i in range(1000))
+        if bucket_for_hash(URLUtils.url_digest(url)) >= 31
+    )
+
+
+def test_create_finds_a_url_stored_off_its_digest_shard(db, router):
+    url = url_on_shard_1("old")
+    code = misplaced(router, url)
+
+    response = UrlServices.create_url_mapping(db, URLCreate(original_url=url))
+    assert response.short_url.endswith("/" + code)
+    batch = UrlServices.create_url_mappings(db, [URLCreate(original_url=url)])
+    assert batch.results[0].result.short_url.endswith("/" + code)
+    with router.shards[1].session_scope() as shard_db:
+        assert shard_db.scalars(select(UrlMapping.short_url)).all() == []
+
+
+def test_move_keeps_a_duplicate_url_as_an_alias(db, router):
+    url = url_on_shard_1("dup")
+    code = misplaced(router, url)
+    digest = URLUtils.url_digest(url)
+    # A duplicate created on the digest's shard before creates checked every shard.
+    with router.shards[1].session_scope() as shard_db:
+        shard_db.execute(insert(UrlMapping), [dict(
+            original_url=url, original_url_hash=digest, short_url="zsurvivor", created_at=datetime(2026, 1, 1),
+        )])
+        shard_db.commit()
+    with router.shards[0].session_scope() as shard_db:
+        shard_db.execute(insert(UrlAlias), [dict(short_url=BASE62_ALPHABET[0] + "alias", target_short_url=code)])
+        shard_db.commit()
+
+    BucketMover(router, settle_seconds=0).move(0, 1)
+
+    with router.shards[1].session_scope() as shard_db:
+        aliases = dict(shard_db.execute(select(UrlAlias.short_url, UrlAlias.target_short_url)).all())
+        assert aliases == {code: "zsurvivor", BASE62_ALPHABET[0] + "alias": "zsurvivor"}
+    with router.shards[0].session_scope() as shard_db:
+        assert shard_db.scalars(select(UrlMapping.short_url)).all() == []
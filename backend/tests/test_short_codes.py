@@ -0,0 +1,78 @@
+import itertools
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.services.short_codes import FeistelScrambler, SequenceCodeAllocator
+from app.utils.url_helpers import BASE62_ALPHABET, URLUtils
+
+
+class BlockSequence:
+    """Hands out block numbers like `nextval('short_code_block_seq')`."""
+
+    def __init__(self):
+        self.blocks = itertools.count()
+        self.calls = 0
+
+    def scalar(self, statement):
+        self.calls += 1
+        return next(self.blocks)
+
+
+def decode_base62(code: str) -> int:
+    value = 0
+    for char in code:
+        value = value * 62 + BASE62_ALPHABET.index(char)
+    return value
+
+
+@pytest.mark.parametrize("number", [0, 1, 61, 62, 3843, 62 ** 4 - 1])
+def test_encode_base62_round_trips_at_fixed_width(number):
+    code = URLUtils.encode_base62(number, length=4)
+    assert len(code) == 4
+    assert decode_base62(code) == number
+
+
+@pytest.mark.parametrize("number", [-1, 62 ** 4])
+def test_encode_base62_rejects_values_out_of_range(number):
+    with pytest.raises(ValueError):
+        URLUtils.encode_base62(number, length=4)
+
+
+@pytest.mark.parametrize("domain", [2, 62, 1000, 62 ** 2 + 1])
+def test_scrambler_is_a_permutation_of_its_domain(domain):
+    scrambler = FeistelScrambler(domain=domain, key="secret")
+    assert sorted(scrambler.scramble(value) for value in range(domain)) == list(range(domain))
+
+
+def test_scrambler_depends_on_its_key():
+    values = range(1000)
+    first = [FeistelScrambler(domain=62 ** 3, key="one").scramble(value) for value in values]
+    second = [FeistelScrambler(domain=62 ** 3, key="two").scramble(value) for value in values]
+    assert first != second
+    assert first != list(values)
+
+
+def test_sequence_allocator_leases_blocks():
+    db = BlockSequence()
+    allocator = SequenceCodeAllocator(length=3, block_size=10, scrambler=FeistelScrambler(62 ** 3, "secret"))
+    codes = allocator.allocate_many(db, 25)
+    assert len(set(codes)) == 25
+    assert all(len(code) == 3 for code in codes)
+    assert db.calls == 3
+
+
+def test_sequence_allocator_stops_at_the_end_of_the_code_space():
+    allocator = SequenceCodeAllocator(length=1, block_size=62)
+    db = BlockSequence()
+    assert sorted(allocator.allocate_many(db, 62)) == sorted(BASE62_ALPHABET)
+    with pytest.raises(RuntimeError):
+        allocator.allocate(db)
+
+
+def test_sequence_allocator_needs_postgresql():
+    with pytest.raises(ValidationError):
+        Settings(SQLALCHEMY_DATABASE_URI="sqlite:///urls.db", SHORT_CODE_ALLOCATOR="sequence")
+    settings = Settings(SQLALCHEMY_DATABASE_URI="postgresql://u:p@db/urls", SHORT_CODE_ALLOCATOR="sequence")
+    assert settings.SHORT_CODE_ALLOCATOR == "sequence"
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", load)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", load))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("value", False)] + [("value", True)] * 4
+    # Nothing is kept once the call returns.
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_exception_reaches_every_caller():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def load():
+        started.set()
+        release.wait(5)
+        raise KeyError("boom")
+
+    def call():
+        try:
+            flight.do("key", load)
+        except KeyError as exc:
+            errors.append(exc)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.coalesced < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2
+
+
+def test_async_callers_share_one_call_and_survive_cancellation():
+    async def scenario():
+        flight = AsyncSingleFlight("test")
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        cancelled = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do("key", load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return calls, results, flight
+
+    calls, results, flight = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [("value", True)] * 3
+    assert flight._calls == {}
@@ -0,0 +1,31 @@
+import threading
+
+from app.cache import snapshot as snapshot_module
+from app.cache.snapshot import SnapshotStore, export_snapshot
+from app.core.metrics import Counter
+from app.schemas.url import URLCreate
+from app.services.urls import UrlServices
+
+
+def test_hits_are_counted_across_threads(db, tmp_path, monkeypatch):
+    hits = Counter("redirect_snapshot_hits_total", "")
+    monkeypatch.setattr(snapshot_module, "redirect_snapshot_hits_total", hits)
+    created = [UrlServices.create_url_mapping(db, URLCreate(original_url=f"https://a.com/{i}")) for i in range(3)]
+    codes = [url.short_url.rsplit("/", 1)[-1] for url in created]
+    path = str(tmp_path / "redirects.snapshot")
+    assert export_snapshot(path) == 3
+    store = SnapshotStore(path, delta_max_keys=100)
+    assert store.reload()
+
+    def lookups():
+        for _ in range(2000):
+            for code in codes:
+                assert store.get(code) is not None
+            assert store.get("missing") is None
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert list(hits.render()) == [f"redirect_snapshot_hits_total {8 * 2000 * 3}"]
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from app.db.base import Base
+from app.db.shards import ShardRouter
+from app.models.shard import ShardBucket
+from app.models.url import UrlMapping
+from app.services import transfer
+from app.services.transfer import import_mappings
+from app.utils.url_helpers import BASE62_ALPHABET, URLUtils
+
+
+def mapping(url, short_url, **values):
+    return dict(
+        original_url=url,
+        original_url_hash=URLUtils.url_digest(url),
+        short_url=short_url,
+        created_at=datetime(2026, 1, 1),
+        **values,
+    )
+
+
+def test_import_gives_expired_links_new_ones(db):
+    db.execute(insert(UrlMapping), [
+        mapping("https://expired.com/", "old", expires_at=datetime.utcnow() - timedelta(days=1)),
+    ])
+    db.commit()
+    progress = import_mappings([{"original_url": "https://expired.com/"}])
+    assert (progress.written, progress.duplicates) == (1, 0)
+    row = db.execute(select(UrlMapping.short_url, UrlMapping.expires_at)).one()
+    assert row.short_url != "old" and row.expires_at is None
+
+
+def test_import_skips_kept_codes_whose_url_is_on_the_digest_shard(db, tmp_path, monkeypatch):
+    router = ShardRouter([f"sqlite:///{tmp_path}/a.db", f"sqlite:///{tmp_path}/b.db"], refresh_interval=0)
+    for shard in router.shards:
+        Base.metadata.create_all(shard.engine)
+    router.refresh()
+    db.execute(update(ShardBucket).where(ShardBucket.bucket >= 31).values(shard=1))
+    db.commit()
+    router.refresh()
+    monkeypatch.setattr(transfer, "shard_router", router)
+
+    url = "https://dup.com/"
+    digest_shard = router.shard_for_hash(URLUtils.url_digest(url))
+    with digest_shard.session_scope() as shard_db:
+        shard_db.execute(insert(UrlMapping), [mapping(url, "stored")])
+        shard_db.commit()
+    other_bucket = next(b for b in range(62) if router.shard_for_bucket(b) is not digest_shard)
+
+    progress = import_mappings([
+        {"original_url": url, "short_url": BASE62_ALPHABET[other_bucket] + "kept"},
+        {"original_url": "https://new.com/", "short_url": BASE62_ALPHABET[other_bucket] + "new"},
+        {"original_url": "https://new.com/"},
+    ])
+    assert (progress.written, progress.duplicates) == (1, 2)
+    with router.shard_for_bucket(other_bucket).session_scope() as shard_db:
+        assert shard_db.scalars(select(UrlMapping.original_url)).all() == ["https://new.com/"]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.utils.url_helpers import URLUtils
+
+
+@pytest.mark.parametrize(
+    "url, canonical",
+    [
+        ("HTTP://Example.COM:80/a?b=2&a=1&utm_source=x", "http://example.com/a?a=1&b=2"),
+        ("https://example.com:443", "https://example.com/"),
+        ("https://example.com:8443/%7euser/%2f", "https://example.com:8443/~user/%2F"),
+        ("http://other.com/x?utm%5Fsource=1", "http://other.com/x"),
+        ("http://other.com/x?%75tm_medium=1&q=%41", "http://other.com/x?q=A"),
+        ("http://other.com/x?b=2&a=3&b=1&fbclid=z", "http://other.com/x?a=3&b=2&b=1"),
+        ("http://other.com/%%41", "http://other.com/%25A"),
+        ("mailto:someone@example.com", "mailto:someone@example.com"),
+    ],
+)
+def test_canonicalize_url(url, canonical):
+    assert URLUtils.canonicalize_url(url) == canonical
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://other.com/x?utm%5Fsource=1",
+        "http://other.com/x?%5Fga=1&%67clid=2&keep=3",
+        "http://other.com/%%41a?a%%41=%",
+        "HTTPS://[::1]:443/%7e?%7E=%7e#%7e",
+        "http://us%65r@Example.com:/?&&=",
+    ],
+)
+def test_canonicalize_url_is_idempotent(url):
+    canonical = URLUtils.canonicalize_url(url)
+    assert URLUtils.canonicalize_url(canonical) == canonical
+
+
+def test_url_digest_is_shared_by_equivalent_urls():
+    assert URLUtils.url_digest("HTTP://Example.COM:80/?utm_source=a") == URLUtils.url_digest("http://example.com/")
+    assert URLUtils.url_digest("http://example.com/a") != URLUtils.url_digest("http://example.com/b")